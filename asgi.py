@@ -0,0 +1,7 @@
+# /asgi.py
+# ASGI entry point, e.g. `uvicorn asgi:app --host 0.0.0.0 --port 8080`.
+# Report uploads on /register stream to disk on the event loop; every other
+# route is served by the same Flask app as app.py.
+from backend.asgi import create_asgi_app
+
+app = create_asgi_app()
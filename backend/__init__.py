@@ -1,11 +1,21 @@
 # backend/__init__.py
-from flask import Flask, g, session, request
+import time
+
+from flask import Flask, g, render_template, session, request
+from markupsafe import Markup
 from config import settings
 
 from backend.routes.main_routes import main_bp
 from backend.routes.api_routes import api_bp
 from backend.routes.lang_routes import lang_bp
-from backend.utils.i18n import translate
+from backend.routes.metrics_routes import metrics_bp
+from backend.services.page_cache import cached_page
+from backend.services.snapshots import registry
+from backend.utils.i18n import get_catalog
+from backend.utils.metrics import REQUEST_SECONDS, begin_breakdown, end_breakdown
+from backend.utils.slow_log import log_slow_request
+from backend.utils.startup import schedule_warm_up
+from backend.cli import register_commands
 
 
 def create_app():
@@ -21,6 +31,30 @@ def create_app():
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix="/api")
     app.register_blueprint(lang_bp)
+    app.register_blueprint(metrics_bp)
+    register_commands(app)
+
+    # Compile the translation catalogs now rather than on the first request.
+    registry.get("translations")
+    app.extensions["warm_up"] = schedule_warm_up(app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.stage_token = begin_breakdown()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        seconds = time.perf_counter() - started
+        stages = end_breakdown(g.pop("stage_token"))
+        # The URL rule, not the path, keeps label cardinality bounded.
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        REQUEST_SECONDS.observe(seconds, request.method, route, str(response.status_code))
+        log_slow_request(request.method, request.path, route, response.status_code, seconds, stages)
+        return response
 
     @app.before_request
     def set_language():
@@ -31,12 +65,19 @@ def create_app():
 
     @app.context_processor
     def inject_globals():
+        lang = getattr(g, "lang", settings.DEFAULT_LANGUAGE)
+        catalog = get_catalog(lang)
+
         def t(key: str):
-            lang = getattr(g, "lang", settings.DEFAULT_LANGUAGE)
-            return translate(key, lang)
+            return catalog.get(key, key)
+
+        def fragment(name: str):
+            # Language-only partials render once per language and catalog version.
+            return Markup(cached_page(f"fragment:{name}", lang, lambda: render_template(f"partials/{name}.html")))
 
         return {
             "t": t,
+            "fragment": fragment,
             "current_language": getattr(g, "lang", settings.DEFAULT_LANGUAGE),
             "supported_languages": settings.SUPPORTED_LANGUAGES,
             "app_name": settings.APP_NAME,
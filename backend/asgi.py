@@ -0,0 +1,332 @@
+# backend/asgi.py
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import BadRequest, HTTPException, RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Epilogue, Field, File, MultipartDecoder, NeedData
+from werkzeug.utils import redirect
+from werkzeug.wrappers import Request, Response
+
+from backend.services.data_loader import allocate_patient_id
+from backend.services.registration import build_patient, save_registration, upload_target
+from backend.utils.lazy import optional_import
+from backend.utils.metrics import REQUEST_SECONDS, begin_breakdown, end_breakdown, observe_stage
+from backend.utils.slow_log import log_slow_request
+from config import settings
+
+aiofiles = optional_import("aiofiles")
+
+
+class AsgiApp:
+    """
+    ASGI front for the Flask app.
+
+    Uploading registrations (multipart POST /register) are handled on the
+    event loop: the body is parsed incrementally as it arrives and the report
+    is streamed to UPLOAD_DIR in ASGI_UPLOAD_CHUNK writes, so a slow client
+    holds a coroutine rather than a thread. ID allocation, history
+    generation, the duplicate check and the storage writes run in a thread
+    pool once the body is complete.
+
+    Every other request goes to the Flask app unchanged, in the same pool,
+    with its body received asynchronously first (spooled to disk past
+    ASGI_SPOOL_SIZE), so reads behave exactly as under WSGI.
+    """
+
+    def __init__(self, flask_app, threads: int = None):
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(threads or settings.ASGI_THREADS, thread_name_prefix="asgi")
+        self.routes: Dict[Tuple[str, str], Callable[..., Awaitable]] = {
+            ("POST", "/register"): self._register,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"unsupported ASGI scope type {scope['type']!r}")
+        handler = self.routes.get((scope["method"], scope["path"]))
+        if handler is None or not _is_multipart(scope):
+            # Form posts without a file are small; Flask handles them as before.
+            handler = self._wsgi
+        try:
+            await handler(scope, receive, send)
+        except ConnectionError:
+            pass  # the client went away; there is no one to respond to
+
+    def _run(self, func, *args, **kwargs):
+        """
+        Run blocking work in the pool, in the caller's context so stage
+        timings land in the current request's breakdown.
+        """
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ---------------------------------------------------
+    # Async registration with a streamed report upload
+    # ---------------------------------------------------
+    async def _register(self, scope, receive, send):
+        started = time.perf_counter()
+        token = begin_breakdown()
+        try:
+            response = await self._register_response(scope, receive)
+        except HTTPException as e:
+            response = e.get_response()
+        seconds = time.perf_counter() - started
+        REQUEST_SECONDS.observe(seconds, "POST", "/register", str(response.status_code))
+        log_slow_request("POST", "/register", "/register", response.status_code, seconds, end_breakdown(token))
+        await _send_response(send, response)
+
+    async def _register_response(self, scope, receive) -> Response:
+        headers = _headers(scope)
+        if int(headers.get("content-length") or 0) > settings.MAX_CONTENT_LENGTH:
+            raise RequestEntityTooLarge()
+        boundary = parse_options_header(headers.get("content-type", ""))[1].get("boundary")
+        if not boundary:
+            raise BadRequest("Missing multipart boundary")
+
+        decoder = MultipartDecoder(boundary.encode("latin-1"), Request.max_form_memory_size)
+        form = MultiDict()
+        field: Optional[Tuple[str, bytearray]] = None
+        filename: Optional[str] = None
+        part: Optional[Path] = None
+        writer: Optional[_UploadWriter] = None
+
+        async def drain():
+            nonlocal field, filename, part, writer
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, Field):
+                    field = (event.name, bytearray())
+                elif isinstance(event, File):
+                    field = None
+                    if event.name == "report_file" and filename is None:
+                        filename = event.filename
+                        if upload_target(0, filename):
+                            # Streamed under a temporary name: the stored file is
+                            # named after the patient, whose ID is only allocated
+                            # once the whole body has arrived.
+                            part = Path(settings.UPLOAD_DIR) / f".{uuid.uuid4().hex}.part"
+                            writer = await _UploadWriter.open(part, self._run)
+                elif field is not None:
+                    field[1].extend(event.data)
+                    if not event.more_data:
+                        form.add(field[0], field[1].decode("utf-8", "replace"))
+                        field = None
+                elif writer is not None:
+                    await writer.write(event.data)
+                    if not event.more_data:
+                        await writer.close()
+                        writer = None
+                event = decoder.next_event()
+
+        upload: Optional[Tuple[Path, str]] = None
+        try:
+            received = 0
+            try:
+                async for chunk in _body(receive):
+                    received += len(chunk)
+                    if received > settings.MAX_CONTENT_LENGTH:
+                        raise RequestEntityTooLarge()
+                    if chunk:
+                        decoder.receive_data(chunk)
+                        await drain()
+                decoder.receive_data(None)
+                await drain()
+            except ValueError as e:
+                raise BadRequest(str(e)) from None
+
+            patient_id = await self._run(allocate_patient_id)
+            if part is not None:
+                upload = upload_target(patient_id, filename)
+                await self._run(os.replace, part, upload[0])
+                part = None
+            row, auto_history = await self._run(build_patient, patient_id, form)
+        except BaseException:
+            # Oversized body, malformed multipart, disconnect: nothing of the
+            # upload outlives the failed request, finished or not.
+            if writer is not None:
+                await writer.close()
+            for path in (part, upload and upload[0]):
+                if path is not None:
+                    await self._run(path.unlink, missing_ok=True)
+            raise
+        registration = await self._run(save_registration, row, auto_history, upload)
+
+        urls = self.flask_app.url_map.bind("", script_name=scope.get("root_path") or "/")
+        location = urls.build("main.patient_view", {"patient_id": patient_id})
+        if registration.duplicates:
+            location += "#duplicates"
+        return redirect(location)
+
+    # ---------------------------------------------------
+    # Everything else: the Flask app in the thread pool
+    # ---------------------------------------------------
+    async def _wsgi(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(max_size=settings.ASGI_SPOOL_SIZE)
+        try:
+            async for chunk in _body(receive):
+                body.write(chunk)
+            size = body.tell()
+            body.seek(0)
+            environ = _environ(scope, body, size)
+
+            started = {}
+
+            def start_response(status, headers, exc_info=None):
+                started["status"] = int(status.split(" ", 1)[0])
+                started["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+            iterable = await self._run(self.flask_app, environ, start_response)
+            try:
+                chunks = iter(iterable)
+                done = object()
+                chunk = await self._run(next, chunks, done)
+                await send({"type": "http.response.start", "status": started["status"], "headers": started["headers"]})
+                while chunk is not done:
+                    if chunk:
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                    chunk = await self._run(next, chunks, done)
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            finally:
+                if hasattr(iterable, "close"):
+                    await self._run(iterable.close)
+        finally:
+            body.close()
+
+
+class _UploadWriter:
+    """
+    Buffered async writer for one upload: aiofiles when installed, the
+    ASGI thread pool otherwise.
+    """
+
+    def __init__(self, handle, run):
+        self._handle = handle
+        self._run = run
+        self._buffer = bytearray()
+        self._seconds = 0.0
+
+    @classmethod
+    async def open(cls, path: Path, run) -> "_UploadWriter":
+        await run(path.parent.mkdir, parents=True, exist_ok=True)
+        handle = await aiofiles.open(path, "wb") if aiofiles is not None else await run(open, path, "wb")
+        return cls(handle, run)
+
+    async def write(self, data: bytes):
+        self._buffer.extend(data)
+        if len(self._buffer) >= settings.ASGI_UPLOAD_CHUNK:
+            await self._flush()
+
+    async def _flush(self):
+        if not self._buffer:
+            return
+        data, self._buffer = bytes(self._buffer), bytearray()
+        t0 = time.perf_counter()
+        if aiofiles is not None:
+            await self._handle.write(data)
+        else:
+            await self._run(self._handle.write, data)
+        self._seconds += time.perf_counter() - t0
+
+    async def close(self):
+        await self._flush()
+        if aiofiles is not None:
+            await self._handle.close()
+        else:
+            await self._run(self._handle.close)
+        observe_stage("upload_save", self._seconds)
+
+
+async def _body(receive):
+    """
+    Request body chunks as the client sends them.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("client disconnected")
+        yield message.get("body", b"")
+        if not message.get("more_body"):
+            return
+
+
+def _headers(scope) -> Dict[str, str]:
+    headers = {}
+    for name, value in scope.get("headers", ()):
+        name, value = name.decode("latin-1").lower(), value.decode("latin-1")
+        headers[name] = f"{headers[name]},{value}" if name in headers else value
+    return headers
+
+
+def _is_multipart(scope) -> bool:
+    return _headers(scope).get("content-type", "").lower().startswith("multipart/form-data")
+
+
+def _environ(scope, body, size: int) -> Dict:
+    """
+    The WSGI environ of an ASGI HTTP scope (PEP 3333 strings are latin-1).
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": str(client[0]),
+        "CONTENT_LENGTH": str(size),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in _headers(scope).items():
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+        elif name != "content-length":
+            environ["HTTP_" + name.upper().replace("-", "_")] = value
+    return environ
+
+
+async def _send_response(send, response: Response):
+    body = response.get_data()
+    headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.to_wsgi_list()]
+    await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+def create_asgi_app(flask_app=None) -> AsgiApp:
+    if flask_app is None:
+        from backend import create_app
+
+        flask_app = create_app()
+    return AsgiApp(flask_app)
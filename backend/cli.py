@@ -0,0 +1,115 @@
+# backend/cli.py
+import io
+import sys
+
+import click
+
+from backend.services.importer import FORMATS, InvalidImportFile, format_for, import_patients
+from backend.services.linkage import get_linkage_index
+from backend.services.reference_bundle import ReferenceBundle, build_bundle, write_bundle
+from backend.services.storage import get_backend, migrate
+from backend.utils.startup import format_import_report, import_profile, warm_up
+from config import settings
+
+
+@click.command("migrate-storage")
+@click.option("--source", default="file", show_default=True, help="Backend to copy from.")
+@click.option("--target", default="sqlite", show_default=True, help="Backend to copy into.")
+def migrate_storage_command(source, target):
+    """Copy patients and history from one storage backend into another."""
+    if source == target:
+        raise click.BadParameter("source and target must differ", param_hint="--target")
+    counts = migrate(get_backend(source), get_backend(target))
+    click.echo(
+        f"Migrated {counts['patients']} patients and {counts['history']} history entries "
+        f"from {source} to {target}."
+    )
+
+
+@click.command("import-patients")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option("--format", "fmt", type=click.Choice(FORMATS), help="Input format (default: from the file name).")
+@click.option("--batch-size", type=int, default=None, help="Rows per ID block and write (IMPORT_BATCH_SIZE).")
+@click.option("--workers", type=int, default=None, help="Auto-history processes (IMPORT_WORKERS; 1 = inline).")
+@click.option("--show-errors", type=int, default=20, show_default=True, help="Row errors to print.")
+def import_patients_command(source, fmt, batch_size, workers, show_errors):
+    """Stream patients from a CSV or NDJSON file ("-" for stdin) into storage."""
+    fmt = fmt or format_for(source)
+
+    def progress(report):
+        click.echo(
+            f"  {report['imported']} imported, {report['failed']} failed "
+            f"({report['rows_per_second']:.0f} rows/s)",
+            err=True,
+        )
+
+    if source == "-":
+        lines = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    else:
+        lines = open(source, encoding="utf-8-sig", newline="")
+    try:
+        with lines:
+            report = import_patients(lines, fmt=fmt, batch_size=batch_size, workers=workers, on_batch=progress)
+    except InvalidImportFile as e:
+        raise click.BadParameter(str(e), param_hint="SOURCE")
+
+    for error in report["errors"][:show_errors]:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    if report["failed"] > show_errors:
+        click.echo(f"... and {report['failed'] - show_errors} more row errors", err=True)
+    ids = f" (IDs {report['first_id']}-{report['last_id']})" if report["imported"] else ""
+    click.echo(
+        f"Imported {report['imported']} patients{ids}, {report['failed']} rows rejected, "
+        f"in {report['seconds']:.2f}s ({report['rows_per_second']:.0f} rows/s)."
+    )
+
+
+@click.command("dedupe-patients")
+@click.option("--show", type=int, default=20, show_default=True, help="Pairs to print.")
+def dedupe_patients_command(show):
+    """Scan every patient for likely duplicates (blocked record linkage)."""
+    result = get_linkage_index().dedupe()
+    for pair in result["pairs"][:show]:
+        click.echo(f"{pair['patient_id']} ~ {pair['duplicate_of']}  score {pair['score']:.2f}  {pair['status']}")
+    click.echo(
+        f"{result['matches']} likely and {result['possible']} possible duplicate pairs among "
+        f"{result['patients']} patients ({result['compared']} comparisons, "
+        f"{result['skipped_blocks']} oversized blocks skipped) in {result['seconds']:.2f}s."
+    )
+
+
+@click.command("import-profile")
+@click.option("--top", type=int, default=20, show_default=True, help="Packages and modules to list.")
+@click.option("--statement", default="import backend; backend.create_app()", show_default=True)
+def import_profile_command(top, statement):
+    """Import-time profile of app startup in a fresh interpreter (-X importtime)."""
+    click.echo(format_import_report(import_profile(statement), top))
+
+
+@click.command("warm-up")
+def warm_up_command():
+    """Load every lazily deferred module and dataset; print seconds per step."""
+    for step, seconds in warm_up().items():
+        click.echo(f"{step:16} {'failed' if seconds < 0 else f'{seconds:.3f}s'}")
+
+
+@click.command("compile-reference")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Bundle path (REFERENCE_BUNDLE).")
+def compile_reference_command(output):
+    """Compile the reference data files into the shared binary bundle."""
+    data = build_bundle()
+    write_bundle(output or settings.REFERENCE_BUNDLE, data)
+    stats = ReferenceBundle(data).stats()
+    click.echo(
+        f"Wrote {output or settings.REFERENCE_BUNDLE}: {stats['diseases']} diseases, "
+        f"{stats['relations']} relations, {stats['bytes']} bytes (version {stats['version']})."
+    )
+
+
+def register_commands(app):
+    app.cli.add_command(migrate_storage_command)
+    app.cli.add_command(import_patients_command)
+    app.cli.add_command(dedupe_patients_command)
+    app.cli.add_command(import_profile_command)
+    app.cli.add_command(warm_up_command)
+    app.cli.add_command(compile_reference_command)
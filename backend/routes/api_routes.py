@@ -1,41 +1,434 @@
-from flask import Blueprint, jsonify
-from backend.services.data_loader import load_patients, load_relations, load_diseases
+import base64
+import hashlib
+import io
+import json
+import time
+
+from flask import Blueprint, Response, jsonify, request
+from backend.services import data_loader
+from backend.services.cooccurrence import get_cooccurrence
+from backend.services.importer import FORMATS, InvalidImportFile, format_for, import_patients
+from backend.services.interactions import SORT_KEYS, get_interaction_index
+from backend.services.jobs import QueueFull, get_job_queue
+from backend.services.linkage import get_linkage_index
+from backend.services.patient_store import PATIENT_FIELDS
+from backend.services.relation_service import get_relation_index, relation_cache_stats
+from backend.services.search_index import get_search_index
+from backend.services.scoring import score_patient_ids, score_patients
+from backend.services.snapshots import get_data
+from backend.utils.metrics import stage
 from config import settings
 
 # Create blueprint
 api_bp = Blueprint("api", __name__)
 
-# Preload mock data
-patients = load_patients()
-relations = load_relations()
-diseases = load_diseases()
+
+class _BadRequest(ValueError):
+    pass
+
+
+def _encode_cursor(position) -> str:
+    raw = json.dumps({"p": position}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded))["p"]
+        if not isinstance(position, int) or position < 0:
+            raise ValueError
+        return position
+    except Exception:
+        raise _BadRequest("Invalid cursor")
+
+
+def _parse_limit(raw):
+    if raw is None or raw == "":
+        return None
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise _BadRequest("limit must be an integer")
+    if limit < 1:
+        raise _BadRequest("limit must be positive")
+    return min(limit, settings.API_MAX_PAGE_SIZE)
+
+
+def _parse_offset(raw) -> int:
+    try:
+        offset = int(raw or 0)
+    except (TypeError, ValueError):
+        raise _BadRequest("offset must be an integer")
+    if offset < 0:
+        raise _BadRequest("offset must not be negative")
+    return offset
+
+
+def _parse_min_count(raw) -> int:
+    if raw is None or raw == "":
+        return 1
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise _BadRequest("min_count must be an integer")
+
+
+def _parse_fields(raw):
+    if not raw:
+        return None
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in PATIENT_FIELDS]
+    if unknown:
+        raise _BadRequest(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def _etag_for(*parts) -> str:
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def _not_modified(etag: str):
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+    return None
+
+
+def _stream_json(rows, fields, next_cursor):
+    """Serialise a page in chunks so large pages never build one big string."""
+    yield '{"patients":['
+    chunk = []
+    for i, p in enumerate(rows):
+        item = {f: p[f] for f in fields} if fields else p
+        chunk.append(("," if i else "") + json.dumps(item, ensure_ascii=False))
+        if len(chunk) >= 500:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+    yield '],"count":%d,"next_cursor":%s}' % (len(rows), json.dumps(next_cursor))
+
+
+def _stream_ndjson(rows, fields):
+    for p in rows:
+        item = {f: p[f] for f in fields} if fields else p
+        yield json.dumps(item, ensure_ascii=False) + "\n"
 
 
 @api_bp.route("/patients", methods=["GET"])
 def get_patients():
-    """Return list of all patients."""
-    return jsonify({"patients": patients})
+    """
+    Return patients, optionally paginated and projected.
+
+    Query params: limit, cursor, fields (comma separated), state, disease,
+    format=json|ndjson. Responses carry a strong ETag derived from the
+    patient data version; If-None-Match gets a 304.
+    """
+    args = request.args
+    try:
+        limit = _parse_limit(args.get("limit"))
+        start = _decode_cursor(args["cursor"]) if args.get("cursor") else 0
+        fields = _parse_fields(args.get("fields"))
+    except _BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    fmt = args.get("format", "json").lower()
+    if fmt not in ("json", "ndjson"):
+        return jsonify({"error": "format must be json or ndjson"}), 400
+
+    state = args.get("state", "").strip() or None
+    disease = args.get("disease", "").strip() or None
+
+    etag = _etag_for(
+        data_loader.patients_version(), limit, start, ",".join(fields or []), state, disease, fmt
+    )
+    cached = _not_modified(etag)
+    if cached is not None:
+        return cached
+
+    rows, next_start = data_loader.page_patients(
+        start=start, limit=limit, state=state, present_disease=disease
+    )
+    next_cursor = _encode_cursor(next_start) if next_start is not None else None
+
+    if fmt == "ndjson":
+        resp = Response(_stream_ndjson(rows, fields), mimetype="application/x-ndjson")
+        if next_cursor:
+            resp.headers["X-Next-Cursor"] = next_cursor
+    else:
+        resp = Response(_stream_json(rows, fields, next_cursor), mimetype="application/json")
+
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 
 @api_bp.route("/patients/<patient_id>", methods=["GET"])
 def get_patient(patient_id):
     """Return single patient details."""
-    for p in patients:
-        if p["patient_id"] == patient_id:
-            return jsonify({"patient": p})
-    return jsonify({"error": "Patient not found"}), 404
+    etag = _etag_for(data_loader.patients_version(), "patient", patient_id)
+    cached = _not_modified(etag)
+    if cached is not None:
+        return cached
+
+    patient = data_loader.get_patient(patient_id)
+    if not patient:
+        return jsonify({"error": "Patient not found"}), 404
+
+    resp = jsonify({"patient": patient})
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@api_bp.route("/patients/bulk", methods=["POST"])
+def bulk_import_patients():
+    """
+    Import many patients from a CSV or NDJSON body (or a multipart `file`),
+    streamed rather than buffered. `?format=csv|ndjson` overrides the
+    Content-Type / file name. Returns the import report with per-row errors.
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        stream, fmt = upload.stream, format_for(upload.filename, upload.mimetype)
+    else:
+        stream, fmt = request.stream, format_for("", request.mimetype)
+    fmt = request.args.get("format", fmt)
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(FORMATS)}"}), 400
+    try:
+        batch_size = int(request.args["batch_size"]) if request.args.get("batch_size") else None
+    except ValueError:
+        return jsonify({"error": "batch_size must be an integer"}), 400
+
+    lines = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        report = import_patients(lines, fmt=fmt, batch_size=batch_size)
+    except InvalidImportFile as e:
+        return jsonify({"error": str(e)}), 400
+    except UnicodeDecodeError:
+        return jsonify({"error": "Input must be UTF-8 encoded"}), 400
+    return jsonify(report)
+
+
+@api_bp.route("/scores", methods=["GET", "POST"])
+def get_scores():
+    """
+    Relation, state and vitals scores for many patients in one batch.
+
+    Either explicit IDs (`ids=1,2,3` or JSON {"patient_ids": [...]}) or a
+    filtered page of the census (state, disease, limit, cursor - as query
+    params or JSON body keys).
+    """
+    params = dict(request.args)
+    if request.method == "POST":
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({"error": "Expected a JSON object"}), 400
+        params.update(body)
+
+    ids = params.get("patient_ids", params.get("ids"))
+    if isinstance(ids, str):
+        ids = [i.strip() for i in ids.split(",") if i.strip()]
+
+    if ids is not None:
+        if not isinstance(ids, list):
+            return jsonify({"error": "patient_ids must be a list"}), 400
+        if len(ids) > settings.API_MAX_PAGE_SIZE:
+            return jsonify({"error": f"At most {settings.API_MAX_PAGE_SIZE} patient_ids per request"}), 400
+        with stage("scoring"):
+            result = score_patient_ids(ids)
+        return jsonify({**result, "count": len(result["scores"])})
+
+    try:
+        limit = _parse_limit(params.get("limit")) or settings.API_MAX_PAGE_SIZE
+        cursor = params.get("cursor")
+        start = _decode_cursor(cursor) if cursor else 0
+        state, disease = params.get("state") or "", params.get("disease") or ""
+        if not isinstance(state, str) or not isinstance(disease, str):
+            raise _BadRequest("state and disease must be strings")
+    except _BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows, next_start = data_loader.page_patients(
+        start=start,
+        limit=limit,
+        state=state.strip() or None,
+        present_disease=disease.strip() or None,
+    )
+    with stage("scoring"):
+        result = score_patients(rows)
+    return jsonify({
+        **result,
+        "count": len(result["scores"]),
+        "next_cursor": _encode_cursor(next_start) if next_start is not None else None,
+    })
+
+
+@api_bp.route("/analytics/cooccurrence", methods=["GET"])
+def get_cooccurrence_stats():
+    """
+    Empirical present/previous disease co-occurrence among registered
+    patients: counts, P(previous | present) and lift.
+
+    Query params: present, previous, state (default: all states),
+    min_count, sort=count|probability|lift, limit.
+    """
+    args = request.args
+    sort = args.get("sort", "count")
+    if sort not in ("count", "probability", "lift"):
+        return jsonify({"error": "sort must be count, probability or lift"}), 400
+    try:
+        limit = _parse_limit(args.get("limit")) or 100
+        min_count = _parse_min_count(args.get("min_count"))
+    except _BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    matrix = get_cooccurrence()
+    state = args.get("state", "").strip() or None
+    pairs = matrix.stats(
+        state=state,
+        present=args.get("present", "").strip() or None,
+        previous=args.get("previous", "").strip() or None,
+        min_count=min_count,
+    )
+    pairs.sort(key=lambda r: (-r[sort], r["present"], r["previous"]))
+    sid = matrix.scope_id(state)
+    return jsonify({
+        "state": matrix.scopes[sid] if sid else None,
+        "patients": matrix.patient_counts[sid] if sid is not None else 0,
+        "count": len(pairs[:limit]),
+        "total_pairs": len(pairs),
+        "pairs": pairs[:limit],
+    })
+
+
+def _interaction_params(args):
+    sort = args.get("sort", "lift")
+    if sort not in SORT_KEYS:
+        raise _BadRequest(f"sort must be one of {', '.join(SORT_KEYS)}")
+    try:
+        params = {
+            "k": int(args.get("k", 10)),
+            "min_support": int(args["min_support"]) if args.get("min_support") else None,
+            "max_order": int(args["max_order"]) if args.get("max_order") else None,
+            "min_order": int(args.get("min_order", 2)),
+            "sort": sort,
+        }
+    except ValueError:
+        raise _BadRequest("k, min_support, max_order and min_order must be integers")
+    params["k"] = max(1, min(params["k"], settings.API_MAX_PAGE_SIZE))
+    return params
+
+
+@api_bp.route("/analytics/interactions", methods=["GET"])
+def get_interactions():
+    """
+    Top-k higher-order interaction scores S(present; B, C, ...) mined from
+    registered patients. Query params: present (required), k, min_support,
+    max_order, min_order, sort=lift|interaction|support|confidence.
+    """
+    present = request.args.get("present", "").strip()
+    if not present:
+        return jsonify({"error": "present is required"}), 400
+    try:
+        params = _interaction_params(request.args)
+    except _BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+    rows = get_interaction_index().top(present, **params)
+    return jsonify({"present": present, "count": len(rows), "interactions": rows})
+
+
+@api_bp.route("/patients/<patient_id>/interactions", methods=["GET"])
+def get_patient_interactions(patient_id):
+    """Interactions whose diseases are all in this patient's history."""
+    patient = data_loader.get_patient(patient_id)
+    if not patient:
+        return jsonify({"error": "Patient not found"}), 404
+    try:
+        params = _interaction_params(request.args)
+    except _BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+    rows = get_interaction_index().for_patient(patient, **params)
+    return jsonify({
+        "patient_id": patient["patient_id"],
+        "present": patient.get("present_disease", ""),
+        "count": len(rows),
+        "interactions": rows,
+    })
+
+
+@api_bp.route("/patients/<patient_id>/duplicates", methods=["GET"])
+def get_patient_duplicates(patient_id):
+    """Other patients likely to be the same person, scored by record linkage."""
+    patient = data_loader.get_patient(patient_id)
+    if not patient:
+        return jsonify({"error": "Patient not found"}), 404
+    try:
+        limit = _parse_limit(request.args.get("limit")) or 5
+    except _BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+    duplicates = get_linkage_index().find_duplicates(patient, limit=limit)
+    return jsonify({"patient_id": patient["patient_id"], "count": len(duplicates), "duplicates": duplicates})
+
+
+@api_bp.route("/dedupe", methods=["POST"])
+def start_dedupe():
+    """Queue a batch duplicate scan; poll /api/jobs/<job_id> for the pairs."""
+    try:
+        job_id = get_job_queue().enqueue("dedupe", {})
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify({"job_id": job_id}), 202
+
+
+@api_bp.route("/search", methods=["GET"])
+def search_patients():
+    """
+    Dashboard typeahead: patients whose name, city, state or diseases have
+    a word starting with every query word, plus completions of the last
+    word. Query params: q, limit, offset.
+    """
+    args = request.args
+    q = args.get("q", "")
+    try:
+        limit = min(_parse_limit(args.get("limit")) or 10, settings.SEARCH_MAX_RESULTS)
+        offset = _parse_offset(args.get("offset"))
+    except _BadRequest as e:
+        return jsonify({"error": str(e)}), 400
+
+    started = time.perf_counter()
+    index = get_search_index()
+    found = index.search(q, offset=offset, limit=limit)
+    suggestions = index.suggest(q, settings.SEARCH_SUGGESTIONS) if q and not q[-1].isspace() else []
+    results = []
+    for patient_id in found.patient_ids:
+        p = data_loader.get_patient(patient_id)
+        if p is not None:
+            results.append({k: p.get(k, "") for k in ("patient_id", "name", "city", "state", "present_disease")})
+    return jsonify({
+        "query": q,
+        "total": found.total,
+        "offset": offset,
+        "results": results,
+        "suggestions": suggestions,
+        "took_ms": round((time.perf_counter() - started) * 1e3, 3),
+    })
 
 
 @api_bp.route("/diseases", methods=["GET"])
 def get_diseases():
     """Return all predefined diseases and their symptoms."""
-    return jsonify({"diseases": diseases})
+    return jsonify({"diseases": list(get_data("diseases"))})
 
 
 @api_bp.route("/relations/<present>/<previous>", methods=["GET"])
 def get_relation(present, previous):
-    """Return relation probability and report between diseases."""
-    rel = relations.get(present, {}).get(previous)
+    """Return relation probability and report between diseases (names or aliases, any case)."""
+    index = get_relation_index()
+    rel = index.relation(present, previous)
     if not rel:
         return jsonify({
             "present_disease": present,
@@ -45,13 +438,28 @@ def get_relation(present, previous):
         }), 404
 
     return jsonify({
-        "present_disease": present,
-        "previous_disease": previous,
-        "probability": rel.get("probability"),
-        "report": rel.get("report")
+        "present_disease": index.canonical(present),
+        "previous_disease": index.canonical(previous),
+        "probability": rel[0],
+        "report": rel[1]
     })
 
 
+@api_bp.route("/stats/relations", methods=["GET"])
+def get_relation_stats():
+    """Hit rates of the relation lookup and probability caches."""
+    return jsonify({"caches": relation_cache_stats()})
+
+
+@api_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Return status and progress of a background job."""
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"job": job})
+
+
 @api_bp.route("/meta", methods=["GET"])
 def get_meta():
     """App metadata."""
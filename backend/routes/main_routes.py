@@ -1,29 +1,22 @@
 # backend/routes/main_routes.py
-from pathlib import Path
-
-from flask import Blueprint, render_template, request, redirect, url_for, abort
-from werkzeug.utils import secure_filename
-from PyPDF2 import PdfReader
+from flask import Blueprint, Response, g, make_response, render_template, request, redirect, url_for, abort
 
 from backend.services.data_loader import (
-    load_patients,
-    load_state_diseases,
-    append_patient,
-    load_mock_history_diseases,
-    load_patient_history,
-    save_patient_history,
-)
-from backend.services.relation_service import (
-    get_all_relations_for_disease,
-    build_state_causal_context,
-    build_mock_causal_probability,
+    get_patient,
+    allocate_patient_id,
+    get_patient_history,
 )
-from backend.utils.helpers import (
-    get_next_patient_id,
-    generate_mock_vitals,
-    vitals_to_scores,
-    generate_auto_history,
+from backend.services.jobs import FAILED, QUEUED, RUNNING, get_job_queue
+from backend.services.page_cache import cached_page
+from backend.services.registration import build_patient, save_registration, upload_target
+from backend.services.search_index import get_search_index
+from backend.services.report_cache import (
+    cached_report_context,
+    cached_report_page,
+    report_etag,
+    report_version,
 )
+from backend.utils.metrics import stage
 from config import settings
 
 main_bp = Blueprint("main", __name__, template_folder="../../frontend/templates")
@@ -31,205 +24,84 @@ main_bp = Blueprint("main", __name__, template_folder="../../frontend/templates"
 
 @main_bp.route("/")
 def home():
-    patients = load_patients()
-    return render_template("index.html", patients=patients)
+    q = request.args.get("q", "").strip()
+    try:
+        page = max(1, int(request.args.get("page", 1)))
+    except ValueError:
+        page = 1
+    size = settings.DASHBOARD_PAGE_SIZE
+    found = get_search_index().search(q, offset=(page - 1) * size, limit=size)
+    patients = [p for p in map(get_patient, found.patient_ids) if p is not None]
+    pages = max(1, -(-found.total // size))
+    return render_template(
+        "index.html", patients=patients, q=q, page=page, pages=pages, total=found.total
+    )
 
 
 @main_bp.route("/register", methods=["GET", "POST"])
 def register_patient():
     if request.method == "POST":
-        patients = load_patients()
-        new_id = get_next_patient_id(patients)
-
-        name = request.form.get("name", "").strip()
-        city = request.form.get("city", "").strip()
-        state = request.form.get("state", "").strip()
-        present_disease = request.form.get("present_disease", "").strip()
-        last_visit = request.form.get("last_visit", "").strip() or "2025-01-01"
-        age = request.form.get("age", "").strip()
-        gender = request.form.get("gender", "").strip()
-
-        # Auto history from mock 50+ diseases
-        master_diseases = load_mock_history_diseases()
-        auto_history = generate_auto_history(
-            patient_id=str(new_id),
-            present_disease=present_disease,
-            last_visit_str=last_visit,
-            master_diseases=master_diseases,
-            count=5,
-        )
+        new_id = allocate_patient_id()
 
-        # Upload parsing: store temporary file in writable UPLOAD_DIR (/tmp on Vercel)
+        # Upload: store the file in writable UPLOAD_DIR (/tmp on Vercel) and
+        # parse it in the background once the patient is persisted.
         report_file = request.files.get("report_file")
-        report_history = []
-
-        if report_file and report_file.filename:
-            filename = secure_filename(report_file.filename)
-            ext = filename.lower().rsplit(".", 1)[-1]
-
-            if ext in settings.ALLOWED_EXTENSIONS:
-                upload_path = Path(settings.UPLOAD_DIR) / f"{new_id}_{filename}"
-                report_file.save(upload_path)
-
-                if ext == "pdf":
-                    try:
-                        reader = PdfReader(str(upload_path))
-                        text = ""
-                        for page in reader.pages:
-                            text += "\n" + (page.extract_text() or "")
-
-                        lower_text = text.lower()
-                        for d in master_diseases:
-                            if d.lower() in lower_text:
-                                report_history.append(
-                                    {
-                                        "disease": d,
-                                        "diagnosed_on": last_visit,
-                                        "source": "upload",
-                                    }
-                                )
-                    except Exception:
-                        pass
-
-                elif ext in ("jpg", "jpeg", "png"):
-                    # OCR intentionally skipped in this lightweight Vercel-safe patch.
-                    # You can add OCR later using an external service or /tmp flow.
-                    pass
-
-        previous_disease_names = [h["disease"] for h in auto_history + report_history]
-
-        row = {
-            "patient_id": str(new_id),
-            "name": name,
-            "age": age,
-            "gender": gender,
-            "city": city,
-            "state": state,
-            "last_visit": last_visit,
-            "present_disease": present_disease,
-            "previous_diseases": "|".join(previous_disease_names),
-        }
-
-        append_patient(row)
-
-        history_all = load_patient_history()
-        history_all[str(new_id)] = {
-            "auto_history": auto_history,
-            "report_history": report_history,
-        }
-        save_patient_history(history_all)
+        upload = upload_target(new_id, report_file.filename) if report_file else None
+        if upload:
+            with stage("upload_save"):
+                upload[0].parent.mkdir(parents=True, exist_ok=True)
+                report_file.save(upload[0])
 
+        row, auto_history = build_patient(new_id, request.form)
+        registration = save_registration(row, auto_history, upload)
+
+        if registration.duplicates:
+            return redirect(url_for("main.patient_view", patient_id=new_id, _anchor="duplicates"))
         return redirect(url_for("main.patient_view", patient_id=new_id))
 
-    return render_template("register.html")
+    lang = getattr(g, "lang", settings.DEFAULT_LANGUAGE)
+    return cached_page("register", lang, lambda: render_template("register.html"))
+
+
+def _render_report(context, report_jobs) -> str:
+    with stage("render"):
+        return render_template("report.html", report_jobs=report_jobs, **context)
 
 
 @main_bp.route("/patient/<patient_id>")
 def patient_view(patient_id):
-    patients = load_patients()
-    patient = next((p for p in patients if str(p.get("patient_id")) == str(patient_id)), None)
-    if not patient:
-        abort(404)
-
-    present = patient.get("present_disease", "")
-    prev_list = [
-        d.strip()
-        for d in (patient.get("previous_diseases") or "").split("|")
-        if d.strip()
+    with stage("data_load"):
+        patient = get_patient(patient_id)
+        if not patient:
+            abort(404)
+        history = get_patient_history(patient_id)
+
+    report_jobs = [
+        job for job in get_job_queue().for_patient(patient_id)
+        if job["status"] in (QUEUED, RUNNING) or (job["status"] == FAILED and job["kind"] == "report_parse")
     ]
-
-    all_rel = get_all_relations_for_disease(present)
-    relation_data = {}
-
-    for prev in prev_list:
-        key = prev.title()
-        rel = all_rel.get(key)
-        if rel:
-            relation_data[key] = rel
-        else:
-            relation_data[key] = {
-                "probability": 0.0,
-                "report": "No data available for this pair in base dataset.",
-            }
-
-    history_all = load_patient_history()
-    history_info = history_all.get(str(patient_id), {})
-    auto_history = history_info.get("auto_history", [])
-    report_history = history_info.get("report_history", [])
-
-    auto_context = []
-    for h in auto_history:
-        dname = h["disease"]
-        prob = build_mock_causal_probability(
-            present_disease=present,
-            previous_disease=dname,
-            patient_id=str(patient_id),
-            extra_key=h.get("diagnosed_on", ""),
-        )
-        auto_context.append(
-            {
-                "disease": dname,
-                "diagnosed_on": h.get("diagnosed_on"),
-                "probability": prob,
-                "source": "auto",
-                "report": f"Previously recorded {dname} on {h.get('diagnosed_on')} may influence the current {present} (mock).",
-            }
+    if report_jobs:
+        # The progress block changes while a parse runs and a failed parse
+        # shows its error; never cache those pages.
+        context = cached_report_context(patient, history)
+        return _render_report(context, report_jobs)
+
+    lang = getattr(g, "lang", settings.DEFAULT_LANGUAGE)
+    version = report_version(patient, history)
+    etag = report_etag(patient_id, lang, version)
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        page = cached_report_page(
+            patient,
+            history,
+            lang,
+            lambda context: _render_report(context, []),
+            version=version,
         )
-        relation_data[dname.title()] = {
-            "probability": prob,
-            "report": f"Auto-history linkage: {dname} on {h.get('diagnosed_on')} → {present}.",
-        }
-
-    report_context = []
-    for h in report_history:
-        dname = h["disease"]
-        prob = build_mock_causal_probability(
-            present_disease=present,
-            previous_disease=dname,
-            patient_id=str(patient_id),
-            extra_key=f"report-{h.get('diagnosed_on', '')}",
-        )
-        report_context.append(
-            {
-                "disease": dname,
-                "diagnosed_on": h.get("diagnosed_on"),
-                "probability": prob,
-                "source": "upload",
-                "report": f"Disease {dname} from uploaded report dated {h.get('diagnosed_on')} may still contribute to {present} (mock).",
-            }
-        )
-        relation_data[dname.title()] = {
-            "probability": prob,
-            "report": f"Report-derived linkage: {dname} ({h.get('diagnosed_on')}) → {present}.",
-        }
-
-    state_map = load_state_diseases()
-    state_raw = (patient.get("state") or "").strip()
-    state_diseases = state_map.get(state_raw) or state_map.get(state_raw.title()) or []
-    state_context = build_state_causal_context(
-        present_disease=present,
-        state=state_raw or "Unknown",
-        state_diseases=state_diseases,
-        patient_id=str(patient_id),
-    )
-
-    vitals = generate_mock_vitals(str(patient_id))
-    vital_scores = vitals_to_scores(vitals)
-
-    chart_values = (
-        [c["probability"] for c in auto_context]
-        + [c["probability"] for c in report_context]
-        + [c["probability"] for c in state_context]
-        + vital_scores
-    )
-
-    return render_template(
-        "report.html",
-        patient=patient,
-        relation_data=relation_data,
-        state_context=state_context,
-        vitals=vitals,
-        auto_history=auto_context,
-        report_history=report_context,
-        chart_values=chart_values,
-    )
+        resp = make_response(page.html)
+        resp.last_modified = page.last_modified
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.vary.add("Cookie")  # the language lives in the session
+    return resp.make_conditional(request)
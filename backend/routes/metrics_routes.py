@@ -0,0 +1,31 @@
+# backend/routes/metrics_routes.py
+import hmac
+import ipaddress
+
+from flask import Blueprint, Response, abort, request
+
+from backend.utils.metrics import REGISTRY
+from config import settings
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics")
+def metrics():
+    """Request, stage, cache and file-read metrics of this worker process."""
+    if not settings.METRICS_ENABLED:
+        abort(404)
+    if not _authorized():
+        abort(403)
+    return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _authorized() -> bool:
+    token = settings.METRICS_TOKEN
+    if token:
+        sent = request.headers.get("Authorization", "")
+        return hmac.compare_digest(sent.encode("utf-8"), f"Bearer {token}".encode("utf-8"))
+    try:
+        return ipaddress.ip_address(request.remote_addr or "").is_loopback
+    except ValueError:
+        return False
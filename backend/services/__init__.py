@@ -0,0 +1,37 @@
+# backend/services/__init__.py
+
+
+def reset_runtime_caches():
+    """
+    Drop every module-level store, index, cache and queue so the next use
+    rebuilds it from the current settings (tests, benchmark scales). New
+    shared state gets its clear_x() call here.
+    """
+    # Imported here: importing backend.services must not load every service.
+    from backend.services import (
+        cooccurrence,
+        history_log,
+        interactions,
+        jobs,
+        linkage,
+        page_cache,
+        patient_store,
+        relation_service,
+        report_cache,
+        search_index,
+        snapshots,
+        storage,
+    )
+
+    patient_store.clear_patient_stores()
+    history_log.clear_history_logs()
+    storage.clear_backends()
+    snapshots.registry.clear()
+    jobs.clear_job_queues()
+    linkage.clear_linkage_index()
+    page_cache.clear_page_cache()
+    relation_service.clear_relation_caches()
+    report_cache.clear_report_caches()
+    cooccurrence.clear_cooccurrence()
+    interactions.clear_interaction_index()
+    search_index.clear_search_index()
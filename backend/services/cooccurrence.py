@@ -0,0 +1,307 @@
+# backend/services/cooccurrence.py
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.services import data_loader
+from backend.services.relation_service import get_relation_index
+from backend.services.report_service import previous_disease_list
+from backend.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+ALL_STATES = ""  # scope key of the population-wide matrix
+
+
+def _state_key(state) -> str:
+    return " ".join((state or "").split()).lower()
+
+
+class CooccurrenceMatrix:
+    """
+    Sparse present x previous disease counts over the registered patients,
+    population-wide and per state.
+
+    Diseases are canonicalised through the relation index (so aliases count
+    as one disease) and interned to integer IDs. New patients are folded in
+    incrementally from the storage backend's append position; if rows were
+    rewritten instead of appended, or the reference data changed, the matrix
+    is rebuilt from scratch in one vectorised pass.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._index = None
+        self._listeners = []
+        self._reset()
+
+    def _reset(self):
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._canonical_cache: Dict[str, int] = {}
+        self.scopes: List[str] = []  # display name per scope ID; 0 = all states
+        self._scope_ids: Dict[str, int] = {}
+        # Per scope: present_id -> {previous_id: patients}
+        self.pairs: List[Dict[int, Counter]] = []
+        self.present_counts: List[Counter] = []
+        self.previous_counts: List[Counter] = []
+        self.patient_counts: List[int] = []
+        self._position = 0
+        self._epoch = None
+        self._rows = 0
+        self._index_version = None
+        self._scope(ALL_STATES, "All states")
+
+    # ---------------------------------------------------
+    # Interning
+    # ---------------------------------------------------
+    def _disease(self, name: str) -> int:
+        did = self._canonical_cache.get(name)
+        if did is None:
+            canonical = self._index.canonical(name)
+            key = canonical.lower()
+            did = self._ids.get(key)
+            if did is None:
+                did = len(self.names)
+                self.names.append(canonical)
+                self._ids[key] = did
+            self._canonical_cache[name] = did
+        return did
+
+    def _scope(self, key: str, display: str) -> int:
+        sid = self._scope_ids.get(key)
+        if sid is None:
+            sid = len(self.scopes)
+            self.scopes.append(display)
+            self._scope_ids[key] = sid
+            self.pairs.append({})
+            self.present_counts.append(Counter())
+            self.previous_counts.append(Counter())
+            self.patient_counts.append(0)
+        return sid
+
+    def encode(self, rows: Iterable) -> List[Tuple[int, int, List[int]]]:
+        """
+        (state scope, present ID or -1, distinct previous IDs) per patient.
+        """
+        if self._index is None:
+            self._index = get_relation_index()
+        out = []
+        disease = self._disease
+        scopes: Dict[str, int] = {}
+        for p in rows:
+            state = p.get("state") or ""
+            sid = scopes.get(state)
+            if sid is None:
+                clean = state.strip()
+                sid = scopes[state] = self._scope(_state_key(clean), clean) if clean else 0
+            present = (p.get("present_disease") or "").strip()
+            pid = disease(present) if present else -1
+            prev = list(dict.fromkeys([disease(d) for d in previous_disease_list(p)]))
+            out.append((sid, pid, prev))
+        return out
+
+    # ---------------------------------------------------
+    # Maintenance
+    # ---------------------------------------------------
+    def refresh(self):
+        """
+        Fold in patients appended since the last call.
+        """
+        with self._lock:
+            self._index = get_relation_index()
+            if self._index.version != self._index_version:
+                self.rebuild()
+                return
+            changes = data_loader.patients_since(self._position)
+            if changes.epoch != self._epoch or changes.total != self._rows + len(changes.rows):
+                self.rebuild()
+                return
+            encoded = self.encode(changes.rows)
+            self.fold(encoded)
+            self._position = changes.position
+            self._rows += len(changes.rows)
+            self._publish(encoded, reset=False)
+
+    def fold(self, encoded):
+        """
+        Add encoded patients one at a time (the incremental path).
+        """
+        with self._lock:
+            for sid, pid, prev in encoded:
+                for scope in {0, sid}:
+                    self.patient_counts[scope] += 1
+                    self.previous_counts[scope].update(prev)
+                    if pid >= 0:
+                        self.present_counts[scope][pid] += 1
+                        if prev:
+                            self.pairs[scope].setdefault(pid, Counter()).update(prev)
+
+    def rebuild(self):
+        """
+        Recount everything. Counting runs as NumPy aggregations over flat
+        (scope, present, previous) code arrays rather than per-row updates.
+        """
+        with self._lock:
+            self._reset()
+            self._index = get_relation_index()
+            self._index_version = self._index.version
+            changes = data_loader.patients_since(0)
+            encoded = self.encode(changes.rows)
+            self._position, self._epoch, self._rows = changes.position, changes.epoch, len(changes.rows)
+            self.count(encoded)
+            self._publish(encoded, reset=True)
+
+    def subscribe(self, listener):
+        """
+        `listener(encoded, reset)` receives every batch of encoded patients
+        (same disease IDs as the matrix); reset=True starts over from scratch.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _publish(self, encoded, reset: bool):
+        for listener in self._listeners:
+            listener(encoded, reset)
+
+    def count(self, encoded):
+        """
+        Add encoded patients to an empty matrix in one vectorised pass.
+        """
+        with self._lock:
+            if not encoded:
+                return
+            d = max(len(self.names), 1)
+            scope = np.fromiter((e[0] for e in encoded), dtype=np.int64, count=len(encoded))
+            present = np.fromiter((e[1] for e in encoded), dtype=np.int64, count=len(encoded))
+            n_prev = np.fromiter((len(e[2]) for e in encoded), dtype=np.int64, count=len(encoded))
+            prev = np.fromiter((q for e in encoded for q in e[2]), dtype=np.int64, count=int(n_prev.sum()))
+            prev_scope = np.repeat(scope, n_prev)
+            prev_present = np.repeat(present, n_prev)
+            has_present = present >= 0
+            has_pair = prev_present >= 0
+
+            # Every count is one np.unique over integer codes: once for the
+            # whole population and once with the state scope folded in.
+            for sid, count in _grouped(scope):
+                self.patient_counts[sid] = count
+            self.patient_counts[0] = len(encoded)
+
+            for code, count in _grouped(present[has_present]):
+                self.present_counts[0][code] = count
+            for code, count in _grouped(scope[has_present] * d + present[has_present]):
+                if code >= d:
+                    self.present_counts[code // d][code % d] = count
+
+            for code, count in _grouped(prev):
+                self.previous_counts[0][code] = count
+            for code, count in _grouped(prev_scope * d + prev):
+                if code >= d:
+                    self.previous_counts[code // d][code % d] = count
+
+            pair_codes = prev_present[has_pair] * d + prev[has_pair]
+            for code, count in _grouped(pair_codes):
+                self.pairs[0].setdefault(code // d, Counter())[code % d] = count
+            for code, count in _grouped(prev_scope[has_pair] * d * d + pair_codes):
+                sid, code = divmod(code, d * d)
+                if sid:
+                    self.pairs[sid].setdefault(code // d, Counter())[code % d] = count
+
+    # ---------------------------------------------------
+    # Queries
+    # ---------------------------------------------------
+    def scope_id(self, state: Optional[str]) -> Optional[int]:
+        if not state:
+            return 0
+        return self._scope_ids.get(_state_key(state))
+
+    def disease_id(self, name: str) -> Optional[int]:
+        return self._ids.get(self._index.canonical(name).lower())
+
+    def stats(self, state: Optional[str] = None, present: Optional[str] = None,
+              previous: Optional[str] = None, min_count: int = 1) -> List[Dict]:
+        """
+        Observed pairs with P(previous | present) and lift, i.e. that
+        probability over the overall P(previous) in the same scope.
+        """
+        self.refresh()
+        with self._lock:
+            sid = self.scope_id(state)
+            if sid is None:
+                return []
+            total = self.patient_counts[sid]
+            present_ids = list(self.pairs[sid])
+            if present:
+                pid = self.disease_id(present)
+                present_ids = [pid] if pid in self.pairs[sid] else []
+            want_prev = self.disease_id(previous) if previous else None
+            if previous and want_prev is None:
+                return []
+
+            out = []
+            for pid in present_ids:
+                n_present = self.present_counts[sid][pid]
+                for qid, count in self.pairs[sid][pid].items():
+                    if count < min_count or (want_prev is not None and qid != want_prev):
+                        continue
+                    n_prev = self.previous_counts[sid][qid]
+                    conditional = count / n_present
+                    out.append(
+                        {
+                            "present": self.names[pid],
+                            "previous": self.names[qid],
+                            "count": count,
+                            "present_count": n_present,
+                            "previous_count": n_prev,
+                            "probability": conditional,
+                            "lift": conditional / (n_prev / total),
+                        }
+                    )
+            return out
+
+    def summary(self) -> Dict:
+        self.refresh()
+        with self._lock:
+            return {
+                "patients": self.patient_counts[0],
+                "diseases": len(self.names),
+                "states": [s for s in self.scopes[1:]],
+                "pairs": sum(len(c) for c in self.pairs[0].values()),
+            }
+
+
+def _grouped(codes: np.ndarray):
+    """
+    (code, occurrences) for every distinct code.
+    """
+    uniq, counts = np.unique(codes, return_counts=True)
+    return zip(uniq.tolist(), counts.tolist())
+
+
+_matrix: Optional[CooccurrenceMatrix] = None
+_matrix_lock = threading.Lock()
+
+
+def get_cooccurrence() -> CooccurrenceMatrix:
+    """
+    Shared matrix; subscribes to data_loader appends on first use.
+    """
+    global _matrix
+    with _matrix_lock:
+        if _matrix is None:
+            _matrix = CooccurrenceMatrix()
+            data_loader.add_append_listener(_on_append)
+        return _matrix
+
+
+def _on_append():
+    if _matrix is not None:
+        _matrix.refresh()
+
+
+def clear_cooccurrence():
+    global _matrix
+    with _matrix_lock:
+        _matrix = None
@@ -1,103 +1,108 @@
 # backend/services/data_loader.py
 import csv
 import json
-import shutil
 from pathlib import Path
 from config import settings
+from backend.services.storage import get_backend
+from backend.utils.metrics import file_read
 
 
-def _ensure_seed_file(source_path: Path, writable_path: Path, empty_default: str = "") -> Path:
+def load_patients():
     """
-    Ensure a writable runtime copy exists.
-    If not present, copy from bundled read-only source.
-    If source is missing, create empty_default.
+    Load all patients from the configured storage backend.
+    With the file backend this is the runtime CSV, seeded from data/patients.csv
+    and served from the shared in-memory store.
     """
-    writable_path.parent.mkdir(parents=True, exist_ok=True)
-
-    if writable_path.exists():
-        return writable_path
+    return get_backend().load_patients()
 
-    if source_path.exists():
-        shutil.copyfile(source_path, writable_path)
-        return writable_path
 
-    writable_path.write_text(empty_default, encoding="utf-8")
-    return writable_path
+def get_patient(patient_id):
+    """
+    Look up a single patient by ID through the backend index.
+    """
+    return get_backend().get_patient(patient_id)
 
 
-def _patients_runtime_path() -> Path:
-    return _ensure_seed_file(
-        source_path=settings.PATIENTS_CSV,
-        writable_path=settings.WRITABLE_PATIENTS_CSV,
-        empty_default=(
-            "patient_id,name,age,gender,city,state,last_visit,present_disease,previous_diseases\n"
-        ),
+def find_patients(state=None, present_disease=None, last_visit_from=None, last_visit_to=None):
+    """
+    Filtered patient read (exact state / present disease, last_visit range).
+    """
+    return get_backend().find_patients(
+        state=state,
+        present_disease=present_disease,
+        last_visit_from=last_visit_from,
+        last_visit_to=last_visit_to,
     )
 
 
-def _patient_history_runtime_path() -> Path:
-    return _ensure_seed_file(
-        source_path=settings.PATIENT_HISTORY_JSON,
-        writable_path=settings.WRITABLE_PATIENT_HISTORY_JSON,
-        empty_default="{}",
-    )
+def page_patients(start: int = 0, limit=None, state=None, present_disease=None):
+    """
+    One page of patients in insertion order: (rows, next_start).
+    """
+    return get_backend().page_patients(start=start, limit=limit, state=state, present_disease=present_disease)
 
 
-def load_patients():
+def patients_version() -> str:
     """
-    Load patients from writable runtime CSV.
-    On first run, this is seeded from data/patients.csv.
+    Version token of the patient data, for cache keys and ETags.
     """
-    patients = []
-    path = _patients_runtime_path()
+    return get_backend().data_version()
 
-    with open(path, encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            patients.append(
-                {
-                    "patient_id": row.get("patient_id", "").strip(),
-                    "name": row.get("name", "").strip(),
-                    "age": row.get("age", "").strip(),
-                    "gender": row.get("gender", "").strip(),
-                    "city": row.get("city", "").strip(),
-                    "state": row.get("state", "").strip(),
-                    "last_visit": row.get("last_visit", "").strip(),
-                    "present_disease": row.get("present_disease", "").strip(),
-                    "previous_diseases": row.get("previous_diseases", "").strip(),
-                }
-            )
-    return patients
 
+def allocate_patient_id() -> int:
+    """
+    Reserve the next patient ID; safe across threads and worker processes.
+    """
+    return allocate_patient_ids(1)[0]
 
-def append_patient(patient: dict):
+
+def allocate_patient_ids(count: int) -> range:
     """
-    Append a new patient row to the writable runtime CSV.
+    Reserve a block of `count` consecutive patient IDs.
     """
-    path = _patients_runtime_path()
+    return get_backend().allocate_patient_ids(count)
 
-    with open(path, encoding="utf-8") as f:
-        reader = csv.reader(f)
+
+def patients_since(position: int = 0):
+    """
+    Patients appended after a position returned by an earlier call.
+    """
+    return get_backend().patients_since(position)
+
+
+# Callables run after every append in this process (e.g. analytics that
+# fold new rows in incrementally).
+_append_listeners = []
+
+
+def add_append_listener(listener):
+    if listener not in _append_listeners:
+        _append_listeners.append(listener)
+
+
+def _notify_append():
+    for listener in list(_append_listeners):
         try:
-            header = next(reader)
-        except StopIteration:
-            header = [
-                "patient_id",
-                "name",
-                "age",
-                "gender",
-                "city",
-                "state",
-                "last_visit",
-                "present_disease",
-                "previous_diseases",
-            ]
-
-    row = [patient.get(col, "") for col in header]
-
-    with open(path, "a", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(row)
+            listener()
+        except Exception:
+            # Derived data catches up on its next read; never fail the write.
+            pass
+
+
+def append_patient(patient: dict):
+    """
+    Persist a new patient row.
+    """
+    get_backend().append_patient(patient)
+    _notify_append()
+
+
+def append_patients(patients):
+    """
+    Persist a batch of patient rows in a single write.
+    """
+    get_backend().append_patients(patients)
+    _notify_append()
 
 
 def load_diseases():
@@ -106,6 +111,7 @@ def load_diseases():
     """
     diseases = []
     path = Path(settings.DISEASES_CSV)
+    file_read("diseases")
 
     with open(path, encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -126,6 +132,7 @@ def load_relations():
     Load bundled read-only relations JSON.
     """
     path = Path(settings.RELATIONS_JSON)
+    file_read("relations")
     try:
         with open(path, encoding="utf-8") as f:
             return json.load(f)
@@ -138,6 +145,7 @@ def load_state_diseases():
     Load bundled read-only state disease JSON.
     """
     path = Path(settings.STATE_DISEASES_JSON)
+    file_read("state_diseases")
     try:
         with open(path, encoding="utf-8") as f:
             return json.load(f)
@@ -150,6 +158,7 @@ def load_mock_history_diseases():
     Load bundled read-only 50+ disease pool.
     """
     path = Path(settings.MOCK_HISTORY_DISEASES_JSON)
+    file_read("mock_history_diseases")
     try:
         with open(path, encoding="utf-8") as f:
             data = json.load(f)
@@ -158,11 +167,12 @@ def load_mock_history_diseases():
         return []
 
 
-def load_patient_history():
+def load_disease_aliases():
     """
-    Load writable runtime patient history JSON.
+    Load bundled read-only synonym table: {canonical name: [aliases]}.
     """
-    path = _patient_history_runtime_path()
+    path = Path(settings.DISEASE_ALIASES_JSON)
+    file_read("disease_aliases")
     try:
         with open(path, encoding="utf-8") as f:
             return json.load(f)
@@ -170,10 +180,36 @@ def load_patient_history():
         return {}
 
 
+def load_patient_history():
+    """
+    Load the full patient history as {patient_id: history}.
+    """
+    return get_backend().load_patient_history()
+
+
+def get_patient_history(patient_id) -> dict:
+    """
+    Point lookup of one patient's history.
+    """
+    return get_backend().get_patient_history(patient_id) or {}
+
+
+def append_patient_history(patient_id, history: dict):
+    """
+    Record one patient's history without rewriting anyone else's.
+    """
+    get_backend().append_patient_history(patient_id, history)
+
+
+def append_patient_histories(histories: dict):
+    """
+    Record several patients' histories in one write.
+    """
+    get_backend().append_patient_histories(histories)
+
+
 def save_patient_history(history: dict):
     """
-    Save patient history to writable runtime JSON.
+    Replace the whole patient history.
     """
-    path = _patient_history_runtime_path()
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+    get_backend().save_patient_history(history)
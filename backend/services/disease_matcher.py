@@ -0,0 +1,169 @@
+# backend/services/disease_matcher.py
+import re
+from collections import Counter, deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Union
+
+from backend.services.snapshots import get_snapshot
+
+
+class Match(NamedTuple):
+    disease: str  # canonical disease name
+    term: str  # vocabulary term that matched (disease or synonym)
+    start: int  # offsets into the original text
+    end: int
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+def _tokenize(term: str) -> Tuple[str, ...]:
+    return tuple(_TOKEN.findall(term.lower()))
+
+
+class DiseaseMatcher:
+    """
+    Aho-Corasick automaton over a disease vocabulary, built on word tokens.
+
+    The regex engine splits the text into word tokens and the automaton walks
+    tokens rather than characters, so one pass finds every vocabulary term
+    case-insensitively, matches are word-bounded by construction ("Stroke"
+    does not fire inside "Heatstroke") and any whitespace or punctuation
+    between the words of a term is tolerated (line breaks in PDF text).
+    """
+
+    def __init__(self, vocabulary: Union[Iterable[str], Dict[str, str]]):
+        if isinstance(vocabulary, dict):
+            items = vocabulary.items()
+        else:
+            items = ((term, term) for term in vocabulary)
+
+        self._terms: List[str] = []
+        self._canonical: List[str] = []
+        self._lengths: List[int] = []
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        seen = set()
+        for term, canonical in items:
+            tokens = _tokenize(term)
+            if not tokens or tokens in seen:
+                continue
+            seen.add(tokens)
+            self._add(tokens, term, canonical)
+        self._build_failure_links()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def _add(self, tokens: Tuple[str, ...], term: str, canonical: str):
+        idx = len(self._terms)
+        self._terms.append(term)
+        self._canonical.append(canonical)
+        self._lengths.append(len(tokens))
+
+        state = 0
+        for tok in tokens:
+            nxt = self._goto[state].get(tok)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][tok] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(idx)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for tok, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and tok not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(tok, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> List[Match]:
+        """
+        Return every match, in order of end position.
+        """
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        matches: List[Match] = []
+        starts: List[int] = []
+        state = 0
+
+        lowered = text.lower()
+        # str.lower() keeps offsets for all but a handful of code points;
+        # when it does not, lower token by token against the original text.
+        same_offsets = len(lowered) == len(text)
+        source = lowered if same_offsets else text
+
+        for m in _TOKEN.finditer(source):
+            tok = m.group() if same_offsets else m.group().lower()
+            starts.append(m.start())
+            while state and tok not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(tok, 0)
+            for idx in out[state]:
+                matches.append(
+                    Match(self._canonical[idx], self._terms[idx], starts[-lengths[idx]], m.end())
+                )
+        return matches
+
+    def count(self, text: str) -> Counter:
+        """
+        Number of mentions per canonical disease.
+        """
+        return Counter(m.disease for m in self.find(text))
+
+    def diseases_in(self, text: str) -> List[str]:
+        """
+        Distinct canonical diseases mentioned, in order of first mention.
+        """
+        return list(dict.fromkeys(m.disease for m in self.find(text)))
+
+
+# Single-word aliases this short ("MI", "TB", "CAD", "Covid") are names
+# still resolved from form fields, but as free-text words they mostly match
+# initials, units and unrelated abbreviations.
+_MIN_SINGLE_WORD_ALIAS = 6
+
+
+def _is_short_abbreviation(alias: str) -> bool:
+    tokens = _tokenize(alias)
+    return len(tokens) == 1 and len(tokens[0]) < _MIN_SINGLE_WORD_ALIAS
+
+
+_cache: Dict[str, DiseaseMatcher] = {}
+
+
+def get_disease_matcher() -> DiseaseMatcher:
+    """
+    Matcher over the current mock history disease pool plus the synonyms from
+    disease_aliases.json, rebuilt only when either snapshot changes.
+    """
+    pool = get_snapshot("mock_history_diseases")
+    aliases = get_snapshot("disease_aliases")
+    version = f"{pool.version}|{aliases.version}"
+    matcher = _cache.get(version)
+    if matcher is None:
+        vocabulary = {term: term for term in pool.data}
+        known = {term.lower(): term for term in pool.data}
+        for canonical, alias_list in aliases.data.items():
+            # Only diseases the pool knows about; report history stays
+            # within the pool's vocabulary.
+            target = known.get(canonical.lower())
+            if target is None:
+                continue
+            for alias in alias_list:
+                if _is_short_abbreviation(alias):
+                    continue
+                vocabulary.setdefault(alias, target)
+        matcher = DiseaseMatcher(vocabulary)
+        _cache.clear()
+        _cache[version] = matcher
+    return matcher
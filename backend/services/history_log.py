@@ -0,0 +1,276 @@
+# backend/services/history_log.py
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from backend.utils.locks import file_lock
+from backend.utils.metrics import file_read
+
+
+def _fsync_dir(path: Path):
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class HistoryLog:
+    """
+    Append-only JSONL log of per-patient history records.
+
+    Each line is {"patient_id": ..., "history": {...}}; the latest line for a
+    patient wins. An in-memory index maps patient_id -> (offset, length) so a
+    single patient can be read with one seek. Superseded lines are dropped by
+    compaction, which rewrites the log atomically.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._records = 0
+        self._offset = 0
+        self._signature = None
+        self._last_compaction = time.monotonic()
+        self._compacting = False
+
+    # ---------------------------------------------------
+    # Index maintenance
+    # ---------------------------------------------------
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def refresh(self):
+        with self._lock:
+            try:
+                sig = self._stat_signature()
+            except FileNotFoundError:
+                self._reset()
+                return
+            if sig == self._signature:
+                return
+            same_file = self._signature is not None and sig[0] == self._signature[0]
+            if not same_file or sig[1] < self._offset:
+                self._reset()
+            self._scan()
+            self._signature = sig
+
+    def _reset(self):
+        self._index = {}
+        self._records = 0
+        self._offset = 0
+        self._signature = None
+
+    def _scan(self):
+        file_read("history_log_scan")
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            offset = self._offset
+            for line in f:
+                # A line without its newline is a torn write still in flight
+                # (or left behind by a crash); stop before it.
+                if not line.endswith(b"\n"):
+                    break
+                length = len(line)
+                try:
+                    record = json.loads(line)
+                    pid = str(record["patient_id"])
+                except (ValueError, KeyError, TypeError):
+                    offset += length
+                    continue
+                self._index[pid] = (offset, length)
+                self._records += 1
+                offset += length
+            self._offset = offset
+
+    # ---------------------------------------------------
+    # Reads
+    # ---------------------------------------------------
+    def _open_indexed(self):
+        """
+        Refresh the index and open the file it describes, or None if there
+        is no log. Compaction in another worker can replace the file between
+        the two steps; the opened file's inode is checked against the index
+        and the index rebuilt until they agree.
+        """
+        while True:
+            self.refresh()
+            if self._signature is None:
+                return None
+            try:
+                f = open(self.path, "rb")
+            except FileNotFoundError:
+                continue
+            st = os.fstat(f.fileno())
+            if st.st_ino == self._signature[0] and st.st_size >= self._offset:
+                return f
+            f.close()
+
+    def get(self, patient_id) -> Optional[dict]:
+        with self._lock:
+            f = self._open_indexed()
+            if f is None:
+                return None
+            with f:
+                loc = self._index.get(str(patient_id))
+                if loc is None:
+                    return None
+                file_read("history_log")
+                f.seek(loc[0])
+                line = f.read(loc[1])
+        try:
+            return json.loads(line).get("history", {})
+        except ValueError:
+            return None
+
+    def all(self) -> Dict[str, dict]:
+        with self._lock:
+            f = self._open_indexed()
+            if f is None:
+                return {}
+            locations = sorted(self._index.items(), key=lambda kv: kv[1][0])
+            out = {}
+            file_read("history_log")
+            with f:
+                for pid, (offset, length) in locations:
+                    f.seek(offset)
+                    try:
+                        out[pid] = json.loads(f.read(length)).get("history", {})
+                    except ValueError:
+                        continue
+            return out
+
+    def garbage(self) -> int:
+        with self._lock:
+            self.refresh()
+            return self._records - len(self._index)
+
+    # ---------------------------------------------------
+    # Writes
+    # ---------------------------------------------------
+    @staticmethod
+    def _encode(patient_id, history: dict) -> bytes:
+        record = {"patient_id": str(patient_id), "history": history}
+        return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def ensure(self, seed: Callable[[], Dict[str, dict]]):
+        """
+        Create the log from `seed()` if it does not exist yet.
+        """
+        if self.path.exists():
+            return
+        with self._lock, file_lock(self.path):
+            if not self.path.exists():
+                self._write_all(seed())
+
+    def append(self, patient_id, history: dict):
+        self.append_many({patient_id: history})
+
+    def append_many(self, histories: Dict[str, dict]):
+        """
+        Append several records in one locked write.
+        """
+        data = b"".join(self._encode(pid, h) for pid, h in histories.items())
+        if not data:
+            return
+        with self._lock, file_lock(self.path):
+            with open(self.path, "a+b") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        # Fence off a torn line left by an interrupted writer.
+                        data = b"\n" + data
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.refresh()
+
+    def replace_all(self, history: Dict[str, dict]):
+        """
+        Atomically replace the whole log with one line per patient.
+        """
+        with self._lock, file_lock(self.path):
+            self._write_all(history)
+
+    def _write_all(self, history: Dict[str, dict]):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with self._lock:
+            with open(tmp, "wb") as f:
+                for pid, entry in history.items():
+                    f.write(self._encode(pid, entry))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            _fsync_dir(self.path.parent)
+            self._reset()
+            self.refresh()
+
+    # ---------------------------------------------------
+    # Compaction
+    # ---------------------------------------------------
+    def compact(self):
+        # Holding the file lock across read + rewrite keeps appends from other
+        # workers from landing in the old file and being lost.
+        with self._lock, file_lock(self.path):
+            self._write_all(self.all())
+            self._last_compaction = time.monotonic()
+
+    def maybe_compact(self, interval: float, min_garbage: int) -> bool:
+        """
+        Start a background compaction if enough superseded records piled up
+        and the last one ran at least `interval` seconds ago.
+
+        Only superseded lines count: a registration appends the first line
+        of a new patient, which compaction would rewrite unchanged, so a log
+        that only ever grows by registrations is never compacted.
+        """
+        with self._lock:
+            if self._compacting:
+                return False
+            if time.monotonic() - self._last_compaction < interval:
+                return False
+            if self.garbage() < min_garbage:
+                return False
+            self._compacting = True
+
+        def _run():
+            try:
+                self.compact()
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=_run, name="history-compaction", daemon=True).start()
+        return True
+
+
+_logs: Dict[Path, HistoryLog] = {}
+_logs_lock = threading.Lock()
+
+
+def get_history_log(path: Path) -> HistoryLog:
+    """
+    Return the shared history log for a path, creating it on first use.
+    """
+    path = Path(path)
+    with _logs_lock:
+        log = _logs.get(path)
+        if log is None:
+            log = HistoryLog(path)
+            _logs[path] = log
+        return log
+
+
+def clear_history_logs():
+    with _logs_lock:
+        _logs.clear()
@@ -0,0 +1,254 @@
+# backend/services/importer.py
+import csv
+import json
+import threading
+import time
+from concurrent.futures import Executor
+from datetime import date
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.services import data_loader
+from backend.services.snapshots import get_data
+from backend.utils.helpers import generate_auto_history
+from backend.utils.processes import spawn_pool
+from config import settings
+
+FORMATS = ("csv", "ndjson")
+
+# Columns an import may carry; patient_id is always allocated here, so an
+# incoming ID column is ignored rather than trusted.
+IMPORT_FIELDS = ("name", "age", "gender", "city", "state", "last_visit", "present_disease", "previous_diseases")
+REQUIRED_FIELDS = ("name", "present_disease")
+DEFAULT_LAST_VISIT = "2025-01-01"
+
+
+class InvalidImportFile(ValueError):
+    """The input as a whole is unusable (unknown format, missing columns)."""
+
+
+def format_for(filename: str, content_type: str = "") -> str:
+    """
+    Guess the input format from a file name or MIME type; CSV otherwise.
+    """
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    return "csv"
+
+
+# -------------------------------------------------------
+# READING + VALIDATION
+# -------------------------------------------------------
+def _read_rows(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Optional[dict], str]]:
+    """
+    (line number, raw row or None, parse error) for every input record.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        header = [(h or "").strip() for h in (reader.fieldnames or [])]
+        missing = [f for f in REQUIRED_FIELDS if f not in header]
+        if missing:
+            raise InvalidImportFile(f"CSV header is missing: {', '.join(missing)}")
+        reader.fieldnames = header
+        for raw in reader:
+            yield reader.line_num, raw, ""
+    elif fmt == "ndjson":
+        for line_no, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"invalid JSON: {e.msg}"
+                continue
+            if not isinstance(raw, dict):
+                yield line_no, None, "expected a JSON object"
+                continue
+            yield line_no, raw, ""
+    else:
+        raise InvalidImportFile(f"Unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+
+def _is_iso_date(value: str) -> bool:
+    # fromisoformat is ~50x faster than strptime but also takes "20250301".
+    if len(value) != 10 or value[4] != "-" or value[7] != "-":
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def validate_row(raw: dict) -> Tuple[Optional[dict], str]:
+    """
+    Clean one input record into a patient row without an ID, or explain why
+    it cannot be imported.
+    """
+    row = {}
+    for field in IMPORT_FIELDS:
+        value = raw.get(field)
+        if isinstance(value, list) and field == "previous_diseases":
+            value = "|".join(str(v) for v in value)
+        row[field] = "" if value is None else str(value).strip()
+
+    for field in REQUIRED_FIELDS:
+        if not row[field]:
+            return None, f"{field} is required"
+    if row["age"]:
+        try:
+            age = int(row["age"])
+        except ValueError:
+            return None, f"age must be a whole number, got {row['age']!r}"
+        if not 0 <= age <= 130:
+            return None, f"age out of range: {age}"
+        row["age"] = str(age)
+    if row["last_visit"]:
+        if not _is_iso_date(row["last_visit"]):
+            return None, f"last_visit must be YYYY-MM-DD, got {row['last_visit']!r}"
+    else:
+        row["last_visit"] = DEFAULT_LAST_VISIT
+    row["previous_diseases"] = "|".join(
+        d.strip() for d in row["previous_diseases"].split("|") if d.strip()
+    )
+    return row, ""
+
+
+# -------------------------------------------------------
+# AUTO HISTORY (process pool)
+# -------------------------------------------------------
+def _auto_histories(keys: List[Tuple[str, str, str]], master_diseases: List[str]) -> List[List[Dict]]:
+    """
+    Worker entry point: auto history for (patient_id, present, last_visit)
+    triples, exactly as /register generates it.
+    """
+    return [
+        generate_auto_history(
+            patient_id=pid,
+            present_disease=present,
+            last_visit_str=last_visit,
+            master_diseases=master_diseases,
+            count=5,
+        )
+        for pid, present, last_visit in keys
+    ]
+
+
+_pools: Dict[int, Executor] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> Optional[Executor]:
+    if workers <= 1:
+        return None
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = spawn_pool(workers)
+        return pool
+
+
+def _start_histories(pool, rows: List[dict], master: List[str], workers: int) -> Callable[[], List[List[Dict]]]:
+    """
+    Start generating auto history for a batch; returns a callable that
+    waits for and collects the results in row order.
+    """
+    keys = [(r["patient_id"], r["present_disease"], r["last_visit"]) for r in rows]
+    if pool is None:
+        histories = _auto_histories(keys, master)
+        return lambda: histories
+    step = max(1, -(-len(keys) // (workers * 2)))
+    futures = [pool.submit(_auto_histories, keys[i:i + step], master) for i in range(0, len(keys), step)]
+    return lambda: [h for f in futures for h in f.result()]
+
+
+# -------------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------------
+def import_patients(
+    lines: Iterable[str],
+    fmt: str = "csv",
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    on_batch: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """
+    Stream patients from CSV or NDJSON lines into storage.
+
+    Valid rows are grouped into batches; each batch gets one block of IDs,
+    its auto history is generated in the process pool while the previous
+    batch is written, and patients and histories are each written in one
+    call per batch. Invalid rows are skipped and reported by line number.
+    `on_batch(report)` is called after every written batch.
+    """
+    batch_size = max(1, batch_size or settings.IMPORT_BATCH_SIZE)
+    workers = settings.IMPORT_WORKERS if workers is None else workers
+    pool = _get_pool(workers)
+    master = list(get_data("mock_history_diseases"))
+
+    report = {
+        "format": fmt,
+        "imported": 0,
+        "failed": 0,
+        "batches": 0,
+        "first_id": None,
+        "last_id": None,
+        "errors": [],
+        "seconds": 0.0,
+        "rows_per_second": 0.0,
+    }
+    started = time.perf_counter()
+
+    def fail(line_no: int, error: str):
+        report["failed"] += 1
+        if len(report["errors"]) < settings.IMPORT_MAX_ERRORS:
+            report["errors"].append({"line": line_no, "error": error})
+
+    def write(rows: List[dict], collect):
+        histories = {}
+        for row, auto in zip(rows, collect()):
+            if not row["previous_diseases"]:
+                row["previous_diseases"] = "|".join(h["disease"] for h in auto)
+            histories[row["patient_id"]] = {"auto_history": auto, "report_history": []}
+        data_loader.append_patients(rows)
+        data_loader.append_patient_histories(histories)
+
+        report["imported"] += len(rows)
+        report["batches"] += 1
+        if report["first_id"] is None:
+            report["first_id"] = rows[0]["patient_id"]
+        report["last_id"] = rows[-1]["patient_id"]
+        report["seconds"] = round(time.perf_counter() - started, 3)
+        report["rows_per_second"] = round(report["imported"] / report["seconds"], 1) if report["seconds"] else 0.0
+        if on_batch is not None:
+            on_batch(report)
+
+    def flush(batch: List[dict], pending):
+        ids = data_loader.allocate_patient_ids(len(batch))
+        rows = [{"patient_id": str(pid), **row} for pid, row in zip(ids, batch)]
+        started_batch = (rows, _start_histories(pool, rows, master, workers))
+        if pending is not None:
+            write(*pending)
+        return started_batch
+
+    batch: List[dict] = []
+    pending = None
+    for line_no, raw, error in _read_rows(lines, fmt):
+        if raw is not None:
+            row, error = validate_row(raw)
+        if error:
+            fail(line_no, error)
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            pending = flush(batch, pending)
+            batch = []
+    if batch:
+        pending = flush(batch, pending)
+    if pending is not None:
+        write(*pending)
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    if report["seconds"]:
+        report["rows_per_second"] = round(report["imported"] / report["seconds"], 1)
+    return report
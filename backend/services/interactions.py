@@ -0,0 +1,270 @@
+# backend/services/interactions.py
+from __future__ import annotations
+
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from backend.services.cooccurrence import CooccurrenceMatrix, get_cooccurrence
+from backend.services.report_service import previous_disease_list
+from backend.utils.lazy import lazy_import
+from config import settings
+
+np = lazy_import("numpy")
+
+SORT_KEYS = ("lift", "interaction", "support", "confidence")
+
+
+def _popcount(packed: np.ndarray) -> np.ndarray:
+    """
+    Set bits per row of a packed uint8 bitmap (or in a 1-D bitmap).
+    """
+    return _popcount_table()[packed].sum(axis=-1)
+
+
+@lru_cache(maxsize=None)
+def _popcount_table() -> np.ndarray:
+    return np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+class InteractionIndex:
+    """
+    Higher-order interaction scores S(A; B, C, ...) mined from registered
+    patients.
+
+    Each patient's previous diseases are kept as a bitset over the integer
+    disease IDs of the co-occurrence matrix (uint64 words per patient), next
+    to per-disease bitmaps over patients for population-wide support counts.
+    Both are appended to as the matrix publishes new patients. Itemsets for
+    a present disease A are mined Apriori-style: only combinations whose
+    every subset reaches min_support among A's patients are counted, and
+    counting is an AND of packed bitmaps plus a popcount.
+    """
+
+    def __init__(self, matrix: CooccurrenceMatrix):
+        self.matrix = matrix
+        self._lock = threading.RLock()
+        self._reset()
+        matrix.subscribe(self._on_rows)
+        matrix.rebuild()
+
+    def _reset(self):
+        self._n = 0
+        self._words = np.zeros((0, 1), dtype=np.uint64)  # patient -> disease bitset
+        self._present = np.zeros(0, dtype=np.int32)  # patient -> present disease ID
+        self._columns = np.zeros((0, 0), dtype=np.uint8)  # disease -> packed patient bitmap
+        self._mined: Dict[Tuple, Tuple[int, list]] = {}
+
+    # ---------------------------------------------------
+    # Maintenance (called by the co-occurrence matrix)
+    # ---------------------------------------------------
+    def _on_rows(self, encoded, reset: bool):
+        with self._lock:
+            if reset:
+                self._reset()
+            if not encoded:
+                return
+            n_new = len(encoded)
+            n_diseases = len(self.matrix.names)
+            self._reserve(self._n + n_new, n_diseases)
+
+            pos = np.arange(self._n, self._n + n_new, dtype=np.int64)
+            self._present[pos] = [e[1] for e in encoded]
+            lengths = np.fromiter((len(e[2]) for e in encoded), dtype=np.int64, count=n_new)
+            items = np.fromiter((q for e in encoded for q in e[2]), dtype=np.int64, count=int(lengths.sum()))
+            rows = np.repeat(pos, lengths)
+
+            bits = np.left_shift(np.uint64(1), (items & 63).astype(np.uint64))
+            np.bitwise_or.at(self._words, (rows, items >> 6), bits)
+            np.bitwise_or.at(
+                self._columns, (items, rows >> 3), np.left_shift(1, rows & 7).astype(np.uint8)
+            )
+            self._n += n_new
+            self._mined.clear()
+
+    def _reserve(self, rows: int, diseases: int):
+        cap_rows, cap_words = self._words.shape
+        words = max(1, -(-diseases // 64))
+        if rows > cap_rows or words > cap_words:
+            new_rows = max(rows, cap_rows * 2, 1024)
+            grown = np.zeros((new_rows, max(words, cap_words)), dtype=np.uint64)
+            grown[: self._n, :cap_words] = self._words[: self._n]
+            self._words = grown
+            present = np.full(new_rows, -1, dtype=np.int32)
+            present[: self._n] = self._present[: self._n]
+            self._present = present
+        cap_diseases, cap_bytes = self._columns.shape
+        need_bytes = -(-self._words.shape[0] // 8)
+        if diseases > cap_diseases or need_bytes > cap_bytes:
+            grown = np.zeros((max(diseases, cap_diseases), max(need_bytes, cap_bytes)), dtype=np.uint8)
+            grown[:cap_diseases, :cap_bytes] = self._columns
+            self._columns = grown
+
+    # ---------------------------------------------------
+    # Mining
+    # ---------------------------------------------------
+    def _group_columns(self, present_id: int):
+        """
+        Per-disease packed bitmaps over just the patients whose present
+        disease is `present_id`.
+        """
+        group = np.flatnonzero(self._present[: self._n] == present_id)
+        words = np.ascontiguousarray(self._words[group]).astype("<u8", copy=False)
+        # (patients, 64 * words) bit matrix, transposed and re-packed per disease.
+        bits = np.unpackbits(words.view(np.uint8), axis=1, bitorder="little")
+        columns = np.packbits(bits.T[: len(self.matrix.names)], axis=1, bitorder="little")
+        return len(group), columns
+
+    def mine(self, present_id: int, min_support: int, max_order: int) -> list:
+        """
+        Frequent previous-disease itemsets for one present disease, with
+        support (patients with A and every item), confidence P(A | items),
+        lift and interaction, the lift over the best lift of its subsets one
+        item smaller (1.0 = nothing beyond the sub-combination).
+        """
+        key = (present_id, min_support, max_order)
+        cached = self._mined.get(key)
+        if cached is not None:
+            return cached
+
+        n_group, columns = self._group_columns(present_id)
+        if not n_group:
+            self._mined[key] = []
+            return []
+        base_rate = n_group / self._n
+        population = self._columns[:, : -(-self._n // 8)]
+
+        supports = _popcount(columns)
+        level = {(i,): columns[i] for i in np.flatnonzero(supports >= min_support).tolist()}
+        results = []
+        lifts: Dict[Tuple[int, ...], float] = {}
+        order = 1
+        budget = settings.INTERACTION_MAX_CANDIDATES
+        while level:
+            for items, tids in level.items():
+                support = int(_popcount(tids))
+                everyone = population[items[0]]
+                for i in items[1:]:
+                    everyone = everyone & population[i]
+                with_items = int(_popcount(everyone))
+                confidence = support / with_items
+                lift = confidence / base_rate
+                lifts[items] = lift
+                if order == 1:
+                    interaction = lift
+                else:
+                    best = max(lifts[items[:j] + items[j + 1:]] for j in range(order))
+                    interaction = lift / best
+                results.append((items, support, confidence, lift, interaction))
+
+            order += 1
+            if order > max_order:
+                break
+            level = self._next_level(level, columns, min_support, budget)
+            budget -= len(level)
+
+        self._mined[key] = results
+        return results
+
+    @staticmethod
+    def _next_level(level, columns, min_support: int, budget: int):
+        """
+        Join itemsets sharing all but their last item; drop candidates with
+        an infrequent subset before counting (the Apriori property).
+        """
+        by_prefix: Dict[Tuple[int, ...], List[int]] = {}
+        for items in sorted(level):
+            by_prefix.setdefault(items[:-1], []).append(items[-1])
+
+        nxt = {}
+        for prefix, lasts in by_prefix.items():
+            for a_idx, a in enumerate(lasts):
+                base = level[prefix + (a,)]
+                for b in lasts[a_idx + 1:]:
+                    cand = prefix + (a, b)
+                    if any(cand[:j] + cand[j + 1:] not in level for j in range(len(cand) - 2)):
+                        continue
+                    if len(nxt) >= budget:
+                        return nxt
+                    tids = base & columns[b]
+                    if _popcount(tids) >= min_support:
+                        nxt[cand] = tids
+        return nxt
+
+    # ---------------------------------------------------
+    # Queries
+    # ---------------------------------------------------
+    def _rows(self, results, min_order: int, sort: str, k: int, only=None) -> List[Dict]:
+        names = self.matrix.names
+        picked = [
+            r for r in results
+            if len(r[0]) >= min_order and (only is None or only.issuperset(r[0]))
+        ]
+        col = {"support": 1, "confidence": 2, "lift": 3, "interaction": 4}[sort]
+        picked.sort(key=lambda r: (-r[col], -r[1], r[0]))
+        return [
+            {
+                "diseases": [names[i] for i in items],
+                "order": len(items),
+                "support": support,
+                "confidence": confidence,
+                "lift": lift,
+                "interaction": interaction,
+            }
+            for items, support, confidence, lift, interaction in picked[:k]
+        ]
+
+    def top(self, present: str, k: int = 10, min_support: int = None, max_order: int = None,
+            min_order: int = 2, sort: str = "lift") -> List[Dict]:
+        """
+        Top-k interaction scores S(present; B, C, ...) over the population.
+        """
+        self.matrix.refresh()
+        min_support, max_order = _limits(min_support, max_order)
+        with self._lock:
+            pid = self.matrix.disease_id(present)
+            if pid is None:
+                return []
+            return self._rows(self.mine(pid, min_support, max_order), min_order, sort, k)
+
+    def for_patient(self, patient, k: int = 10, min_support: int = None, max_order: int = None,
+                    min_order: int = 2, sort: str = "lift") -> List[Dict]:
+        """
+        Top-k interactions whose diseases all appear in this patient's
+        previous diseases.
+        """
+        self.matrix.refresh()
+        min_support, max_order = _limits(min_support, max_order)
+        with self._lock:
+            pid = self.matrix.disease_id(patient.get("present_disease") or "")
+            if pid is None:
+                return []
+            own = {self.matrix.disease_id(d) for d in previous_disease_list(patient)}
+            own.discard(None)
+            results = self.mine(pid, min_support, max_order)
+            return self._rows(results, min_order, sort, k, only=own)
+
+
+def _limits(min_support, max_order):
+    min_support = max(1, min_support or settings.INTERACTION_MIN_SUPPORT)
+    max_order = min(max_order or settings.INTERACTION_MAX_ORDER, settings.INTERACTION_MAX_ORDER_LIMIT)
+    return min_support, max_order
+
+
+_index: Optional[InteractionIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_interaction_index() -> InteractionIndex:
+    global _index
+    matrix = get_cooccurrence()
+    with _index_lock:
+        if _index is None or _index.matrix is not matrix:
+            _index = InteractionIndex(matrix)
+        return _index
+
+
+def clear_interaction_index():
+    global _index
+    with _index_lock:
+        _index = None
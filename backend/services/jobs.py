@@ -0,0 +1,375 @@
+# backend/services/jobs.py
+import importlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from backend.utils.metrics import observe_stage, stage
+from backend.utils.processes import spawn_pool
+from config import settings
+
+# Job kinds -> "module:function" run inside the worker. Handlers receive
+# (payload, progress) and return a JSON-serialisable result.
+HANDLERS = {
+    "report_parse": "backend.services.report_parser:run_report_job",
+    "dedupe": "backend.services.linkage:run_dedupe_job",
+}
+# Stage each job kind is timed under in the web process's metrics.
+JOB_STAGES = {
+    "report_parse": "upload_parse",
+    "dedupe": "dedupe_scan",
+}
+
+_logger = logging.getLogger("neural_health_link.jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    patient_id TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    result TEXT,
+    error TEXT,
+    owner TEXT NOT NULL DEFAULT '',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_patient ON jobs (patient_id);
+"""
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+def _owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _row_to_job(row) -> Dict:
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "patient_id": row["patient_id"],
+        "status": row["status"],
+        "progress": row["progress"],
+        "message": row["message"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "attempts": row["attempts"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+# -------------------------------------------------------
+# WORKER SIDE (runs in the pool process)
+# -------------------------------------------------------
+def _resolve_handler(kind: str):
+    module_name, func_name = HANDLERS[kind].split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def execute_job(db_path: str, job_id: str):
+    """
+    Run one claimed job to completion and record the outcome in the table.
+    """
+    conn = _connect(Path(db_path))
+    try:
+        row = conn.execute("SELECT kind, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return
+        last_write = [0.0]
+
+        def progress(fraction: float, message: str = ""):
+            now = time.monotonic()
+            if fraction < 1.0 and now - last_write[0] < 0.2:
+                return
+            last_write[0] = now
+            conn.execute(
+                "UPDATE jobs SET progress = ?, message = ?, updated_at = ? WHERE id = ?",
+                (max(0.0, min(1.0, fraction)), message, time.time(), job_id),
+            )
+
+        try:
+            result = _resolve_handler(row["kind"])(json.loads(row["payload"]), progress)
+        except Exception as e:
+            _logger.exception("%s job %s failed", row["kind"], job_id)
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (FAILED, f"{type(e).__name__}: {e}", time.time(), job_id),
+            )
+            return
+        conn.execute(
+            "UPDATE jobs SET status = ?, progress = 1, result = ?, updated_at = ? WHERE id = ?",
+            (DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id),
+        )
+    finally:
+        conn.close()
+
+
+# -------------------------------------------------------
+# QUEUE (runs in the web process)
+# -------------------------------------------------------
+class JobQueue:
+    """
+    Bounded background job queue backed by an on-disk SQLite table.
+
+    Jobs are written to the table first and then claimed by a dispatcher
+    thread, which hands at most `workers` of them at a time to the executor.
+    Because the table is the source of truth, jobs that were queued or
+    running in a web worker that died are picked up again the next time any
+    worker starts its queue.
+    """
+
+    def __init__(self, db_path: Path, executor: str, workers: int, max_pending: int):
+        self.db_path = Path(db_path)
+        self.mode = executor
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.owner = _owner_id()
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._executor = None
+        self._dispatcher = None
+        self._stopped = False
+        self._recover()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    # ---------------------------------------------------
+    # Recovery after restarts
+    # ---------------------------------------------------
+    def _recover(self):
+        """
+        Requeue jobs left running by processes on this host that no longer exist.
+        """
+        host = socket.gethostname()
+        conn = self._conn()
+        rows = conn.execute("SELECT id, owner FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+        for row in rows:
+            owner_host, _, pid = row["owner"].rpartition(":")
+            if owner_host != host or not pid.isdigit() or _pid_alive(int(pid)):
+                continue
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = '', updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, time.time(), row["id"], RUNNING),
+            )
+
+    # ---------------------------------------------------
+    # Public API
+    # ---------------------------------------------------
+    def enqueue(self, kind: str, payload: dict, patient_id: str = "") -> str:
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        conn = self._conn()
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+        ).fetchone()[0]
+        if pending >= self.max_pending:
+            raise QueueFull(f"{pending} jobs pending (limit {self.max_pending})")
+
+        job_id = self._insert(kind, payload, patient_id)
+        if self.mode == "inline":
+            self._run_here(job_id, kind)
+        else:
+            self._ensure_dispatcher()
+            with self._cond:
+                self._cond.notify()
+        return job_id
+
+    def run_now(self, kind: str, payload: dict, patient_id: str = "") -> str:
+        """
+        Record a job and run it in the calling thread, regardless of the
+        pending limit: the fallback when enqueue() raises QueueFull. The
+        outcome lands in the table like any other job's.
+        """
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = self._insert(kind, payload, patient_id)
+        self._run_here(job_id, kind)
+        return job_id
+
+    def _insert(self, kind: str, payload: dict, patient_id: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, patient_id, payload, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, str(patient_id), json.dumps(payload, ensure_ascii=False), QUEUED, now, now),
+        )
+        return job_id
+
+    def _run_here(self, job_id: str, kind: str):
+        self._claim(job_id)
+        with stage(JOB_STAGES.get(kind, kind)):
+            execute_job(str(self.db_path), job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        self.ensure_running()
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def for_patient(self, patient_id, active_only: bool = False) -> List[Dict]:
+        sql = "SELECT * FROM jobs WHERE patient_id = ?"
+        params = [str(patient_id)]
+        if active_only:
+            sql += " AND status IN (?, ?)"
+            params += [QUEUED, RUNNING]
+        rows = self._conn().execute(sql + " ORDER BY created_at", params).fetchall()
+        return [_row_to_job(r) for r in rows]
+
+    def ensure_running(self):
+        """
+        Start the dispatcher if jobs are waiting (e.g. after a restart).
+        """
+        if self.mode != "inline" and self._dispatcher is None:
+            waiting = self._conn().execute(
+                "SELECT 1 FROM jobs WHERE status = ? LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if waiting:
+                self._ensure_dispatcher()
+
+    def shutdown(self, wait: bool = True):
+        self._stopped = True
+        with self._cond:
+            self._cond.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    # ---------------------------------------------------
+    # Dispatching
+    # ---------------------------------------------------
+    def _claim(self, job_id: str) -> bool:
+        cur = self._conn().execute(
+            "UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE id = ? AND status = ?",
+            (RUNNING, self.owner, time.time(), job_id, QUEUED),
+        )
+        return cur.rowcount == 1
+
+    def _ensure_dispatcher(self):
+        with self._cond:
+            if self._dispatcher is not None:
+                return
+            if self.mode == "process":
+                self._executor = spawn_pool(self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        while not self._stopped:
+            with self._cond:
+                while self._in_flight >= self.workers and not self._stopped:
+                    self._cond.wait()
+                free = self.workers - self._in_flight
+            if self._stopped:
+                return
+
+            rows = self._conn().execute(
+                "SELECT id, kind FROM jobs WHERE status = ? ORDER BY created_at LIMIT ?", (QUEUED, free)
+            ).fetchall()
+            submitted = 0
+            for row in rows:
+                if not self._claim(row["id"]):
+                    continue  # another web worker got it first
+                with self._cond:
+                    self._in_flight += 1
+                started = time.perf_counter()
+                future = self._executor.submit(execute_job, str(self.db_path), row["id"])
+                future.add_done_callback(
+                    lambda f, job_id=row["id"], kind=row["kind"], t0=started: self._finished(f, job_id, kind, t0)
+                )
+                submitted += 1
+
+            if not submitted:
+                with self._cond:
+                    self._cond.wait(timeout=settings.JOB_POLL_INTERVAL)
+
+    def _finished(self, future, job_id: str, kind: str, started: float):
+        observe_stage(JOB_STAGES.get(kind, kind), time.perf_counter() - started)
+        exc = future.exception()
+        if exc is not None:
+            # The worker process itself died (e.g. BrokenProcessPool).
+            self._conn().execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (FAILED, f"{type(exc).__name__}: {exc}", time.time(), job_id, RUNNING),
+            )
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_queues: Dict[str, JobQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Shared job queue for the configured JOBS_DB / JOB_EXECUTOR.
+    """
+    key = f"{settings.JOBS_DB}|{settings.JOB_EXECUTOR}"
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = JobQueue(
+                settings.JOBS_DB,
+                executor=settings.JOB_EXECUTOR,
+                workers=settings.JOB_WORKERS,
+                max_pending=settings.JOB_QUEUE_MAX,
+            )
+            _queues[key] = queue
+        return queue
+
+
+def clear_job_queues():
+    with _queues_lock:
+        for queue in _queues.values():
+            queue.shutdown(wait=True)
+        _queues.clear()
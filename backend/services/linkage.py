@@ -0,0 +1,414 @@
+# backend/services/linkage.py
+import math
+import re
+import threading
+import time
+from array import array
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.services import data_loader
+from config import settings
+
+# Fellegi-Sunter m/u probabilities: P(field agrees | same person) and
+# P(field agrees | different people). Agreement adds log2(m/u) to a pair's
+# score, disagreement log2((1-m)/(1-u)); empty fields add nothing.
+FIELD_PROBABILITIES = {
+    "name": (0.95, 0.0005),
+    "age": (0.90, 0.02),
+    "gender": (0.98, 0.5),
+    "city": (0.85, 0.05),
+    "state": (0.97, 0.04),
+}
+# Jaro-Winkler similarity from which names / cities count as agreeing;
+# between the floor and this, the weight is interpolated.
+SIMILARITY_AGREE = 0.95
+SIMILARITY_FLOOR = 0.80
+AGE_TOLERANCE = 1  # years either way (birthday between visits)
+
+MATCH = "match"
+POSSIBLE = "possible"
+
+_NON_ALPHA = re.compile(r"[^a-z ]+")
+_SOUNDEX = {c: str(d) for d, letters in enumerate(("", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r")) for c in letters}
+
+
+def _weights(m: float, u: float) -> Tuple[float, float]:
+    return math.log2(m / u), math.log2((1 - m) / (1 - u))
+
+
+WEIGHTS = {field: _weights(m, u) for field, (m, u) in FIELD_PROBABILITIES.items()}
+
+
+# -------------------------------------------------------
+# COMPARATORS
+# -------------------------------------------------------
+def normalize_name(name: str) -> str:
+    return " ".join(_NON_ALPHA.sub(" ", (name or "").lower()).split())
+
+
+def soundex(word: str) -> str:
+    """
+    American Soundex code ("Robert" -> "R163"); "" for a word without letters.
+    """
+    word = _NON_ALPHA.sub("", (word or "").lower()).replace(" ", "")
+    if not word:
+        return ""
+    code, last = word[0].upper(), _SOUNDEX.get(word[0], "")
+    for c in word[1:]:
+        digit = _SOUNDEX.get(c, "")
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in "hw":
+            last = digit
+    return code.ljust(4, "0")
+
+
+def jaro_winkler(a: str, b: str) -> float:
+    if a == b:
+        return 1.0 if a else 0.0
+    if not a or not b:
+        return 0.0
+    window = max(0, max(len(a), len(b)) // 2 - 1)
+    used = [False] * len(b)
+    matched_a = []
+    for i, c in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not used[j] and b[j] == c:
+                used[j] = True
+                matched_a.append(c)
+                break
+    m = len(matched_a)
+    if not m:
+        return 0.0
+    matched_b = [c for c, u in zip(b, used) if u]
+    transpositions = sum(x != y for x, y in zip(matched_a, matched_b)) / 2
+    jaro = (m / len(a) + m / len(b) + (m - transpositions) / m) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def _sorted_tokens(name: str) -> str:
+    return " ".join(sorted(name.split()))
+
+
+def _age(value) -> Optional[int]:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def _similarity_weight(field: str, similarity: float) -> float:
+    agree, disagree = WEIGHTS[field]
+    if similarity >= SIMILARITY_AGREE:
+        return agree
+    if similarity <= SIMILARITY_FLOOR:
+        return disagree
+    return disagree + (agree - disagree) * (similarity - SIMILARITY_FLOOR) / (SIMILARITY_AGREE - SIMILARITY_FLOOR)
+
+
+def compare(a: Dict, b: Dict) -> Dict[str, float]:
+    """
+    Per-field Fellegi-Sunter weights of two patient rows.
+    """
+    weights = {}
+    name_a, name_b = normalize_name(a.get("name")), normalize_name(b.get("name"))
+    if name_a and name_b:
+        similarity = jaro_winkler(name_a, name_b)
+        if similarity < SIMILARITY_AGREE:
+            # Token order is often swapped between registrations.
+            similarity = max(similarity, jaro_winkler(_sorted_tokens(name_a), _sorted_tokens(name_b)))
+        weights["name"] = _similarity_weight("name", similarity)
+    age_a, age_b = _age(a.get("age")), _age(b.get("age"))
+    if age_a is not None and age_b is not None:
+        weights["age"] = WEIGHTS["age"][0 if abs(age_a - age_b) <= AGE_TOLERANCE else 1]
+    for field in ("gender", "state"):
+        x, y = (a.get(field) or "").strip().lower(), (b.get(field) or "").strip().lower()
+        if x and y:
+            weights[field] = WEIGHTS[field][0 if x == y else 1]
+    city_a, city_b = normalize_name(a.get("city")), normalize_name(b.get("city"))
+    if city_a and city_b:
+        weights["city"] = _similarity_weight("city", jaro_winkler(city_a, city_b))
+    return weights
+
+
+def score_pair(a: Dict, b: Dict) -> float:
+    return sum(compare(a, b).values())
+
+
+def classify(score: float) -> Optional[str]:
+    if score >= settings.LINKAGE_MATCH_SCORE:
+        return MATCH
+    if score >= settings.LINKAGE_POSSIBLE_SCORE:
+        return POSSIBLE
+    return None
+
+
+# -------------------------------------------------------
+# BLOCKING
+# -------------------------------------------------------
+def _age_bands(age: Optional[int], spread: int = 0) -> Set[str]:
+    if age is None:
+        return {""}
+    width = settings.LINKAGE_AGE_BAND
+    return {str((age + d) // width) for d in (-spread, 0, spread)}
+
+
+@lru_cache(maxsize=65536)
+def _name_features(raw_name: str) -> Tuple[str, str, Tuple[str, ...]]:
+    """
+    (Soundex of the first token, Soundex of the last token, trigrams) of a
+    name; names repeat a lot, so this is memoised.
+    """
+    name = normalize_name(raw_name)
+    if not name:
+        return "", "", ()
+    tokens = name.split()
+    padded = f" {name} "
+    grams = tuple(sorted({padded[i:i + 3] for i in range(len(padded) - 2)}))
+    return soundex(tokens[0]), soundex(tokens[-1]), grams
+
+
+def blocking_keys(row: Dict, query: bool = False) -> Set[Tuple[str, ...]]:
+    """
+    Blocks a row is filed under (or, with query=True, looked up in): the
+    Soundex of the first and of the last name token within state and age
+    band, and both codes together within state regardless of age. Queries
+    also look in the neighbouring age band so 39 still meets 40.
+    """
+    first, last, grams = _name_features(row.get("name") or "")
+    if not grams:
+        return set()
+    state = (row.get("state") or "").strip().lower()
+    bands = _age_bands(_age(row.get("age")), AGE_TOLERANCE if query else 0)
+    keys = {("f", first, state, band) for band in bands} | {("l", last, state, band) for band in bands}
+    keys.add(("fl", *sorted((first, last)), state))
+    return keys
+
+
+def name_grams(row: Dict) -> Tuple[str, ...]:
+    return _name_features(row.get("name") or "")[2]
+
+
+class LinkageIndex:
+    """
+    Candidate generation for duplicate detection without comparing against
+    every patient.
+
+    Patients are numbered by insertion order and filed under their blocking
+    keys and, per state, under the character trigrams of their name. A
+    query takes everyone sharing a block plus, by prefix filtering, anyone
+    sharing enough trigrams to reach LINKAGE_NGRAM_OVERLAP: a candidate
+    must contain at least one of the (1 - overlap) rarest query trigrams, so
+    only those short posting lists are read. Candidates are then scored
+    with Fellegi-Sunter weights. Maintained from the storage append position
+    like the search index.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.patient_ids: List[str] = []
+        self._blocks: Dict[Tuple[str, ...], array] = {}
+        self._grams: Dict[str, Dict[str, array]] = {}  # state -> trigram -> docs
+        self._position = 0
+        self._epoch = None
+
+    # ---------------------------------------------------
+    # Maintenance
+    # ---------------------------------------------------
+    def refresh(self):
+        """
+        Fold in patients appended since the last call.
+        """
+        with self._lock:
+            changes = data_loader.patients_since(self._position)
+            if changes.epoch != self._epoch or changes.total != len(self.patient_ids) + len(changes.rows):
+                self.rebuild()
+                return
+            if changes.rows:
+                self._add(changes.rows)
+                self._position = changes.position
+
+    def rebuild(self):
+        with self._lock:
+            self._reset()
+            changes = data_loader.patients_since(0)
+            self._epoch = changes.epoch
+            self._position = changes.position
+            self._add(changes.rows)
+
+    def _add(self, rows: Iterable[Dict]):
+        for row in rows:
+            doc = len(self.patient_ids)
+            self.patient_ids.append(row.get("patient_id", ""))
+            for key in blocking_keys(row):
+                postings = self._blocks.get(key)
+                if postings is None:
+                    postings = self._blocks[key] = array("i")
+                postings.append(doc)
+            state_grams = self._grams.setdefault((row.get("state") or "").strip().lower(), {})
+            for gram in name_grams(row):
+                postings = state_grams.get(gram)
+                if postings is None:
+                    postings = state_grams[gram] = array("i")
+                postings.append(doc)
+
+    # ---------------------------------------------------
+    # Queries
+    # ---------------------------------------------------
+    def candidates(self, row: Dict) -> List[int]:
+        """
+        Patient numbers worth scoring against `row`, blocks first, at most
+        LINKAGE_MAX_CANDIDATES.
+        """
+        cap = settings.LINKAGE_MAX_CANDIDATES
+        found: Dict[int, None] = {}
+        for key in sorted(blocking_keys(row, query=True)):
+            for doc in self._blocks.get(key, ()):
+                found[doc] = None
+        grams = name_grams(row)
+        if grams and len(found) < cap:
+            state_grams = self._grams.get((row.get("state") or "").strip().lower(), {})
+            postings = sorted((state_grams.get(g, ()) for g in grams), key=len)
+            required = math.ceil(len(grams) * settings.LINKAGE_NGRAM_OVERLAP)
+            for docs in postings[: len(grams) - required + 1]:
+                for doc in docs:
+                    found[doc] = None
+                if len(found) >= cap:
+                    break
+        return list(found)[:cap]
+
+    def find_duplicates(self, row: Dict, limit: int = 5) -> List[Dict]:
+        """
+        Existing patients likely to be the same person as `row`, best first.
+        The row itself (same patient_id) is never reported.
+        """
+        self.refresh()
+        own_id = str(row.get("patient_id", ""))
+        with self._lock:
+            ids = [self.patient_ids[doc] for doc in self.candidates(row)]
+        out = []
+        for patient_id in ids:
+            if patient_id == own_id:
+                continue
+            other = data_loader.get_patient(patient_id)
+            if other is None:
+                continue
+            score = score_pair(row, other)
+            status = classify(score)
+            if status:
+                out.append(_candidate(other, score, status))
+        out.sort(key=lambda c: (-c["score"], c["patient_id"]))
+        return out[:limit]
+
+    def dedupe(self, progress: Callable = lambda fraction, message="": None) -> Dict:
+        """
+        Every pair of patients sharing a block whose score reaches
+        LINKAGE_POSSIBLE_SCORE, best first. Blocks larger than
+        LINKAGE_MAX_BLOCK are too unspecific to compare and are skipped.
+        """
+        started = time.perf_counter()
+        self.refresh()
+        with self._lock:
+            rows = data_loader.patients_since(0).rows
+            blocks = [docs for docs in self._blocks.values() if 1 < len(docs) <= settings.LINKAGE_MAX_BLOCK]
+            skipped = sum(1 for docs in self._blocks.values() if len(docs) > settings.LINKAGE_MAX_BLOCK)
+        seen: Set[Tuple[int, int]] = set()
+        pairs = []
+        for done, docs in enumerate(blocks, start=1):
+            # rows are decoded from the columnar store on access; once per block
+            members = [rows[doc] for doc in docs]
+            for i, a in enumerate(docs):
+                for j in range(i + 1, len(docs)):
+                    b = docs[j]
+                    if (a, b) in seen:
+                        continue
+                    seen.add((a, b))
+                    score = score_pair(members[i], members[j])
+                    status = classify(score)
+                    if status:
+                        # docs ascend in registration order: the later record is the duplicate
+                        pairs.append({
+                            "patient_id": members[j]["patient_id"],
+                            "duplicate_of": members[i]["patient_id"],
+                            "score": round(score, 2),
+                            "status": status,
+                        })
+            if done % 1000 == 0:
+                progress(done / len(blocks), f"{done}/{len(blocks)} blocks")
+        pairs.sort(key=lambda p: (-p["score"], p["patient_id"]))
+        return {
+            "patients": len(rows),
+            "blocks": len(blocks),
+            "skipped_blocks": skipped,
+            "compared": len(seen),
+            "matches": sum(1 for p in pairs if p["status"] == MATCH),
+            "possible": sum(1 for p in pairs if p["status"] == POSSIBLE),
+            "pairs": pairs[: settings.LINKAGE_MAX_PAIRS],
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "patients": len(self.patient_ids),
+                "blocks": len(self._blocks),
+                "largest_block": max(map(len, self._blocks.values()), default=0),
+                "grams": sum(len(g) for g in self._grams.values()),
+            }
+
+
+def _candidate(row: Dict, score: float, status: str) -> Dict:
+    return {
+        "patient_id": row.get("patient_id", ""),
+        "name": row.get("name", ""),
+        "age": row.get("age", ""),
+        "city": row.get("city", ""),
+        "state": row.get("state", ""),
+        "score": round(score, 2),
+        "status": status,
+    }
+
+
+_index: Optional[LinkageIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_linkage_index() -> LinkageIndex:
+    """
+    Shared index; subscribes to data_loader appends on first use.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LinkageIndex()
+            data_loader.add_append_listener(_on_append)
+        return _index
+
+
+def _on_append():
+    if _index is not None:
+        _index.refresh()
+
+
+def clear_linkage_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def run_dedupe_job(payload: Dict, progress: Callable) -> Dict:
+    """
+    Job handler: batch duplicate scan over every registered patient.
+    """
+    return get_linkage_index().dedupe(progress)
@@ -0,0 +1,154 @@
+# backend/services/ocr.py
+import hashlib
+import re
+import shutil
+import sys
+import threading
+from concurrent.futures import Executor
+from typing import Dict, Iterable, Optional
+
+from backend.utils.disk_cache import DiskCache
+from backend.utils.lazy import optional_import
+from backend.utils.metrics import cache_event
+from backend.utils.processes import spawn_pool
+from config import settings
+
+# OCR is optional; without it uploads only use the PDF text layer.
+pytesseract = optional_import("pytesseract")
+Image = optional_import("PIL.Image")
+pdf2image = optional_import("pdf2image")
+
+
+def file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def ocr_available() -> bool:
+    if not settings.OCR_ENABLED or pytesseract is None or Image is None:
+        return False
+    return shutil.which(str(settings.TESSERACT_CMD)) is not None
+
+
+def pdf_ocr_available() -> bool:
+    return ocr_available() and pdf2image is not None
+
+
+# -------------------------------------------------------
+# CACHE
+# -------------------------------------------------------
+# Extracted text on disk under OCR_CACHE_DIR, keyed by the SHA-256 of the
+# upload plus the settings that change the text (language, and the render
+# DPI and page number for PDFs).
+OCRCache = DiskCache
+
+
+def get_ocr_cache() -> OCRCache:
+    return OCRCache(settings.OCR_CACHE_DIR, settings.OCR_CACHE_MAX_BYTES)
+
+
+def _cache_key(digest: str, page: int = None) -> str:
+    lang = re.sub(r"[^\w+.-]", "_", str(settings.OCR_LANG))
+    if page is None:
+        return f"{digest}-{lang}"
+    return f"{digest}-{lang}-{settings.OCR_DPI}-p{page}"
+
+
+# -------------------------------------------------------
+# TESSERACT (runs in the OCR pool)
+# -------------------------------------------------------
+def _configure():
+    pytesseract.pytesseract.tesseract_cmd = str(settings.TESSERACT_CMD)
+
+
+def _ocr_image_file(path: str) -> str:
+    _configure()
+    with Image.open(path) as img:
+        return pytesseract.image_to_string(img, lang=settings.OCR_LANG)
+
+
+def _ocr_pdf_page(path: str, page: int) -> str:
+    _configure()
+    images = pdf2image.convert_from_path(path, dpi=settings.OCR_DPI, first_page=page, last_page=page)
+    return pytesseract.image_to_string(images[0], lang=settings.OCR_LANG) if images else ""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _in_child_process() -> bool:
+    # A child already has multiprocessing loaded; the parent may not.
+    mp = sys.modules.get("multiprocessing")
+    return mp is not None and mp.parent_process() is not None
+
+
+def _get_pool() -> Optional[Executor]:
+    """
+    One Tesseract process per core (OCR_WORKERS) for the web process; None
+    means run inline. Jobs running in a job-pool process OCR inline, so the
+    job pool (JOB_WORKERS) caps Tesseract there rather than multiplying it.
+    """
+    global _pool
+    if settings.OCR_WORKERS <= 1 or _in_child_process():
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = spawn_pool(settings.OCR_WORKERS)
+        return _pool
+
+
+def _run_all(fn, arg_lists):
+    pool = _get_pool()
+    if pool is None:
+        return [fn(*args) for args in arg_lists]
+    futures = [pool.submit(fn, *args) for args in arg_lists]
+    return [f.result() for f in futures]
+
+
+# -------------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------------
+def ocr_image(path, digest: str = None) -> str:
+    """
+    Text of an image upload, served from the cache when this exact file was
+    OCR'd before.
+    """
+    key = _cache_key(digest or file_sha256(path))
+    cache = get_ocr_cache()
+    cached = cache.get(key)
+    cache_event("ocr", "miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+    if not ocr_available():
+        return ""
+    text = _run_all(_ocr_image_file, [(str(path),)])[0]
+    cache.put(key, text)
+    return text
+
+
+def ocr_pdf_pages(path, pages: Iterable[int], digest: str = None) -> Dict[int, str]:
+    """
+    OCR selected (1-based) pages of a PDF in parallel, reusing cached pages.
+    """
+    digest = digest or file_sha256(path)
+    cache = get_ocr_cache()
+    out: Dict[int, str] = {}
+    missing = []
+    for page in pages:
+        cached = cache.get(_cache_key(digest, page))
+        cache_event("ocr", "miss" if cached is None else "hit")
+        if cached is None:
+            missing.append(page)
+        else:
+            out[page] = cached
+
+    if missing and pdf_ocr_available():
+        texts = _run_all(_ocr_pdf_page, [(str(path), page) for page in missing])
+        for page, text in zip(missing, texts):
+            cache.put(_cache_key(digest, page), text)
+            out[page] = text
+    return out
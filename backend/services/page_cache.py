@@ -0,0 +1,73 @@
+# backend/services/page_cache.py
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from backend.services.snapshots import get_snapshot
+from backend.utils.metrics import cache_event
+from config import settings
+
+
+class PageCache:
+    """
+    Rendered pages and fragments that depend only on the language, keyed by
+    (name, language). Entries belong to one version of the translation
+    catalogs and the app; when either moves the whole cache is dropped, so
+    editing a translation file shows up within SNAPSHOT_CHECK_INTERVAL.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], str] = {}
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, name: str, lang: str, render: Callable[[], str]) -> str:
+        version = f"{get_snapshot('translations').version}|{settings.VERSION}"
+        key = (name, lang)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            html = self._entries.get(key)
+            if html is not None:
+                self.hits += 1
+                cache_event("page", "hit")
+                return html
+            self.misses += 1
+        cache_event("page", "miss")
+        html = render()
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = html
+        return html
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache()
+        return _cache
+
+
+def clear_page_cache():
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def cached_page(name: str, lang: str, render: Callable[[], str]) -> str:
+    """
+    `render()` output for a language-only page or fragment, rendered once per
+    language and catalog version.
+    """
+    return get_page_cache().get_or_render(name, lang, render)
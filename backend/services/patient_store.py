@@ -0,0 +1,237 @@
+# backend/services/patient_store.py
+import csv
+import io
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+from backend.services.patient_table import PATIENT_FIELDS, PatientRows, PatientTable
+from backend.utils.frozen import FrozenDict
+from backend.utils.metrics import file_read
+
+# Bytes kept from just before the read offset, used to detect a file that was
+# rewritten (rather than appended to) between two refreshes.
+_TAIL_PROBE = 64
+
+
+def row_to_patient(row: dict) -> Dict[str, str]:
+    return FrozenDict((field, (row.get(field) or "").strip()) for field in PATIENT_FIELDS)
+
+
+def _field_columns(header: List[str]) -> List[Optional[int]]:
+    """
+    Column of each patient field in a CSV header (the last one when a name
+    repeats, as in dict(zip(header, values))), None when absent.
+    """
+    columns = {name: i for i, name in enumerate(header)}
+    return [columns.get(field) for field in PATIENT_FIELDS]
+
+
+class PatientStore:
+    """
+    Process-wide in-memory view of the runtime patients CSV.
+
+    The file is parsed once; afterwards every access does a cheap stat().
+    If the file only grew, just the appended bytes are parsed. Any other
+    change of size / mtime / inode triggers a full reload.
+
+    Rows live in a columnar PatientTable and are handed out as read-only
+    views; a reload starts a new table, so views taken earlier stay valid.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._table = PatientTable()
+        self._header: Optional[List[str]] = None
+        self._offset = 0
+        self._tail = b""
+        self._unterminated = False
+        self._signature = None
+        self._generation = 0
+
+    # ---------------------------------------------------
+    # Refresh
+    # ---------------------------------------------------
+    def _stat_signature(self):
+        st = os.stat(self.path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def refresh(self):
+        with self._lock:
+            try:
+                sig = self._stat_signature()
+            except FileNotFoundError:
+                self._reset()
+                return
+            if sig == self._signature:
+                return
+
+            if self._can_extend(sig):
+                self._read_from(self._offset)
+            else:
+                self._reset()
+                self._read_from(0)
+            self._signature = sig
+
+    def _can_extend(self, sig) -> bool:
+        if self._signature is None or self._header is None:
+            return False
+        ino, size, _ = sig
+        if ino != self._signature[0] or size < self._offset:
+            return False
+        if self._unterminated:
+            return False  # the last row read at EOF may have grown since
+        if not self._tail:
+            return True
+        with open(self.path, "rb") as f:
+            f.seek(self._offset - len(self._tail))
+            return f.read(len(self._tail)) == self._tail
+
+    def _reset(self):
+        self._generation += 1
+        self._table = PatientTable()
+        self._header = None
+        self._offset = 0
+        self._tail = b""
+        self._unterminated = False
+        self._signature = None
+
+    def _read_from(self, offset: int):
+        file_read("patients_csv")
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+
+        # On a full load EOF ends the last row, as it does for csv.reader:
+        # a hand-edited file or export without a final newline loses nothing.
+        # Rows that arrive later are only consumed up to their newline, since
+        # an unterminated tail then is an append still being written.
+        end = chunk.rfind(b"\n") + 1
+        self._unterminated = offset == 0 and end < len(chunk)
+        if self._unterminated:
+            end = len(chunk)
+        if end == 0:
+            return
+        consumed = chunk[:end]
+
+        reader = csv.reader(io.StringIO(consumed.decode("utf-8"), newline=""))
+        if self._header is None:
+            try:
+                self._header = [h.strip() for h in next(reader)]
+            except StopIteration:
+                return
+        append = self._table.append_row
+        columns = _field_columns(self._header)
+        for values in reader:
+            if not values:
+                continue
+            n = len(values)
+            append([values[i].strip() if i is not None and i < n else "" for i in columns])
+
+        self._offset = offset + end
+        self._tail = (self._tail + consumed)[-_TAIL_PROBE:]
+
+    # ---------------------------------------------------
+    # Reads
+    # ---------------------------------------------------
+    def all(self) -> PatientRows:
+        with self._lock:
+            self.refresh()
+            return self._table.rows()
+
+    def get(self, patient_id) -> Optional[Dict[str, str]]:
+        with self._lock:
+            self.refresh()
+            table = self._table
+            pos = table.find(patient_id)
+        return None if pos is None else table.row(pos)
+
+    def page(self, start: int = 0, limit: Optional[int] = None, predicate=None, where: Optional[Mapping] = None):
+        """
+        Return (rows, next_start) walking the store from position `start`.
+        next_start is None once the end is reached. `where` maps categorical
+        fields to values matched case-insensitively on the interned codes,
+        before any row is decoded for `predicate`.
+        """
+        with self._lock:
+            self.refresh()
+            table = self._table
+            total = len(table)
+        positions = table.positions(where, start) if where else range(start, total)
+        rows = []
+        for pos in positions:
+            if pos >= total:
+                break
+            if limit is not None and len(rows) >= limit:
+                return rows, pos
+            p = table.row(pos)
+            if predicate is None or predicate(p):
+                rows.append(p)
+        return rows, None
+
+    def since(self, position: int):
+        """
+        Return (rows from `position` on, new position, generation). The
+        generation changes whenever the file is reloaded from scratch, which
+        invalidates positions handed out before.
+        """
+        with self._lock:
+            self.refresh()
+            total = len(self._table)
+            return self._table.rows(position, total), total, self._generation
+
+    def version(self) -> str:
+        """
+        Opaque token that changes whenever the underlying file changes.
+        """
+        self.refresh()
+        if self._signature is None:
+            return "0"
+        return "-".join(str(v) for v in self._signature)
+
+    def header(self) -> List[str]:
+        self.refresh()
+        return list(self._header or PATIENT_FIELDS)
+
+    def max_patient_id(self) -> int:
+        """
+        Highest numeric patient_id seen so far (0 when there is none).
+        """
+        self.refresh()
+        return self._table.max_patient_id
+
+    def memory(self) -> Dict[str, int]:
+        """
+        Rows held and approximate bytes of their columns.
+        """
+        self.refresh()
+        table = self._table
+        return {"patients": len(table), "bytes": table.nbytes()}
+
+    def __len__(self):
+        self.refresh()
+        return len(self._table)
+
+
+_stores: Dict[Path, PatientStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_patient_store(path: Path) -> PatientStore:
+    """
+    Return the shared store for a CSV path, creating it on first use.
+    """
+    path = Path(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = PatientStore(path)
+            _stores[path] = store
+        return store
+
+
+def clear_patient_stores():
+    with _stores_lock:
+        _stores.clear()
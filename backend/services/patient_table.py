@@ -0,0 +1,359 @@
+# backend/services/patient_table.py
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+from backend.utils.frozen import FrozenDict
+
+PATIENT_FIELDS = [
+    "patient_id",
+    "name",
+    "age",
+    "gender",
+    "city",
+    "state",
+    "last_visit",
+    "present_disease",
+    "previous_diseases",
+]
+
+# Interned columns; present and previous diseases share one vocabulary
+CATEGORICAL_FIELDS = ("gender", "city", "state")
+
+_NO_AGE = -1
+_NO_DATE = 0
+
+
+class Vocabulary:
+    """
+    Interned strings of one column: every distinct value is stored once and
+    rows hold its integer code.
+    """
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        try:
+            return self._codes[value]
+        except KeyError:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+            return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+
+    def matching(self, value: str) -> set:
+        """
+        Codes of every value equal to `value` ignoring case.
+        """
+        folded = value.lower()
+        return {code for code, v in enumerate(self.values) if v.lower() == folded}
+
+    def nbytes(self) -> int:
+        return (
+            sys.getsizeof(self.values)
+            + sys.getsizeof(self._codes)
+            + sum(sys.getsizeof(v) for v in self.values)
+        )
+
+    def __len__(self):
+        return len(self.values)
+
+
+class PatientTable:
+    """
+    Append-only columnar store of patient rows.
+
+    Categorical columns hold codes into a Vocabulary, diseases are codes
+    into one shared vocabulary and previous_diseases is a slice of a flat
+    code array. IDs, ages and visit dates sit in typed arrays and names in
+    one UTF-8 buffer. Rows are decoded into FrozenDicts on access, so
+    callers keep seeing the same dicts as before.
+
+    Values the typed columns cannot reproduce exactly (non-numeric IDs or
+    ages, dates not in ISO form) are kept verbatim in a per-row side table.
+    """
+
+    def __init__(self):
+        self._count = 0
+        self._ids = array("q")
+        self._name_offsets = array("Q", [0])
+        self._names = bytearray()
+        self._ages = array("h")
+        self._visits = array("i")
+        self.vocabularies: Dict[str, Vocabulary] = {f: Vocabulary() for f in CATEGORICAL_FIELDS}
+        self.diseases = Vocabulary()
+        self._categorical = {f: array("I") for f in CATEGORICAL_FIELDS}
+        self._genders, self._cities, self._states = (self.vocabularies[f] for f in CATEGORICAL_FIELDS)
+        self._gender_codes, self._city_codes, self._state_codes = (self._categorical[f] for f in CATEGORICAL_FIELDS)
+        # ordinal <-> ISO text; a census spans a few thousand distinct days
+        self._dates: Dict[int, str] = {}
+        self._date_codes: Dict[str, int] = {}
+        self._present = array("I")
+        self._previous_offsets = array("I", [0])
+        self._previous = array("I")
+        # position -> {field: raw value} for values kept as text
+        self._raw: Dict[int, Dict[str, str]] = {}
+        # numeric ID -> position, once IDs stop arriving in ascending order
+        self._positions: Optional[Dict[int, int]] = None
+        self._text_ids: Dict[str, int] = {}
+        self._max_id = 0
+
+    # ---------------------------------------------------
+    # Writes
+    # ---------------------------------------------------
+    def append(self, patient: Mapping[str, str]):
+        self.append_row([patient.get(field) or "" for field in PATIENT_FIELDS])
+
+    def append_row(self, values: Sequence[str]):
+        """
+        Append one patient given as its nine strings in PATIENT_FIELDS order.
+        """
+        pid, name, age, gender, city, state, visit, present, previous = values
+        pos = self._count
+        raw = None
+
+        number = _as_int(pid)
+        # The ID column is binary searched while IDs ascend; the first ID out
+        # of order (or not a number) switches lookups to a dict.
+        if self._positions is None and pos and (number is None or number <= self._max_id):
+            self._positions = {n: i for i, n in enumerate(self._ids) if n >= 0}
+        if number is None:
+            raw = {"patient_id": pid}
+            self._text_ids[pid] = pos
+            self._ids.append(-1)
+        else:
+            if self._positions is not None:
+                self._positions[number] = pos
+            self._ids.append(number)
+            if number > self._max_id:
+                self._max_id = number
+
+        self._names += name.encode("utf-8")
+        self._name_offsets.append(len(self._names))
+
+        number = _as_int(age) if age else _NO_AGE
+        if number is None or number >= 32768:
+            raw = raw or {}
+            raw["age"] = age
+            number = _NO_AGE
+        self._ages.append(number)
+
+        ordinal = self._date_codes.get(visit)
+        if ordinal is None:
+            ordinal = _as_ordinal(visit) if visit else _NO_DATE
+            if ordinal is None:
+                raw = raw or {}
+                raw["last_visit"] = visit
+                ordinal = _NO_DATE
+            else:
+                self._date_codes[visit] = ordinal
+        self._visits.append(ordinal)
+
+        self._gender_codes.append(self._genders.code(gender))
+        self._city_codes.append(self._cities.code(city))
+        self._state_codes.append(self._states.code(state))
+
+        code = self.diseases.code
+        self._present.append(code(present))
+        # split/join round-trips exactly, so "A||B" or " A" come back unchanged
+        if previous:
+            self._previous.extend([code(d) for d in previous.split("|")])
+        self._previous_offsets.append(len(self._previous))
+
+        if raw:
+            self._raw[pos] = raw
+        self._count = pos + 1
+
+    def extend(self, patients: Iterable[Mapping[str, str]]):
+        for patient in patients:
+            self.append(patient)
+
+    # ---------------------------------------------------
+    # Reads
+    # ---------------------------------------------------
+    def row(self, pos: int) -> Dict[str, str]:
+        """
+        The patient at `pos` as a read-only dict of its CSV strings.
+        """
+        if not 0 <= pos < self._count:
+            raise IndexError(pos)
+        names = self._name_offsets
+        diseases = self.diseases.values
+        start, end = self._previous_offsets[pos], self._previous_offsets[pos + 1]
+        row = FrozenDict(
+            patient_id=str(self._ids[pos]),
+            name=self._names[names[pos]:names[pos + 1]].decode("utf-8"),
+            age=_age_text(self._ages[pos]),
+            gender=self._genders.values[self._gender_codes[pos]],
+            city=self._cities.values[self._city_codes[pos]],
+            state=self._states.values[self._state_codes[pos]],
+            last_visit=self._date_text(self._visits[pos]),
+            present_disease=diseases[self._present[pos]],
+            previous_diseases="|".join([diseases[c] for c in self._previous[start:end]]),
+        )
+        raw = self._raw.get(pos)
+        if raw:
+            row = FrozenDict({**row, **raw})
+        return row
+
+    def _date_text(self, ordinal: int) -> str:
+        text = self._dates.get(ordinal)
+        if text is None:
+            text = self._dates[ordinal] = date.fromordinal(ordinal).isoformat() if ordinal != _NO_DATE else ""
+        return text
+
+    def find(self, patient_id) -> Optional[int]:
+        """
+        Position of the last row with this patient_id, or None.
+        """
+        key = str(patient_id).strip()
+        number = _as_int(key)
+        if number is None:
+            return self._text_ids.get(key)
+        if self._positions is not None:
+            return self._positions.get(number)
+        # IDs arrived in ascending order. Without gaps the position follows
+        # from the first ID; otherwise binary search the ID column.
+        ids = self._ids
+        if not self._count:
+            return None
+        pos = number - ids[0]
+        if 0 <= pos < self._count and ids[pos] == number:
+            return pos
+        pos = bisect_left(ids, number, 0, self._count)
+        if pos < self._count and ids[pos] == number:
+            return pos
+        return None
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> "PatientRows":
+        """
+        Read-only view of rows [start, stop); later appends stay outside it.
+        """
+        stop = self._count if stop is None else min(stop, self._count)
+        return PatientRows(self, start, max(start, stop))
+
+    def positions(self, where: Mapping[str, str], start: int = 0) -> Iterator[int]:
+        """
+        Positions from `start` on whose state / gender / city / present
+        disease equal the given values ignoring case, found on the codes
+        without decoding any row.
+        """
+        tests = []
+        for field, value in where.items():
+            if field == "present_disease":
+                tests.append((self._present, self.diseases.matching(value)))
+            else:
+                tests.append((self._categorical[field], self.vocabularies[field].matching(value)))
+        if any(not codes for _, codes in tests):
+            return iter(())
+        span = range(start, self._count)
+        if len(tests) == 1:
+            column, codes = tests[0]
+            return (pos for pos in span if column[pos] in codes)
+        return (pos for pos in span if all(column[pos] in codes for column, codes in tests))
+
+    @property
+    def max_patient_id(self) -> int:
+        return self._max_id
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the columns, vocabularies and side tables.
+        """
+        arrays = [self._ids, self._name_offsets, self._ages, self._visits, self._present,
+                  self._previous_offsets, self._previous, *self._categorical.values()]
+        total = sum(a.buffer_info()[1] * a.itemsize for a in arrays) + len(self._names)
+        total += self.diseases.nbytes() + sum(v.nbytes() for v in self.vocabularies.values())
+        total += sys.getsizeof(self._raw) + sum(sys.getsizeof(r) for r in self._raw.values())
+        total += sys.getsizeof(self._text_ids) + sys.getsizeof(self._dates) + sys.getsizeof(self._date_codes)
+        if self._positions is not None:
+            # plus one int object for each key and value
+            total += sys.getsizeof(self._positions) + 2 * 28 * len(self._positions)
+        return total
+
+    def __len__(self):
+        return self._count
+
+
+class PatientRows(Sequence):
+    """
+    Fixed slice of a PatientTable that decodes rows as they are read.
+    Compares equal to a list of the same rows.
+    """
+
+    __slots__ = ("_table", "_start", "_stop")
+
+    def __init__(self, table: PatientTable, start: int, stop: int):
+        self._table = table
+        self._start = start
+        self._stop = stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return PatientRows(self._table, self._start + start, self._start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("patient row index out of range")
+        return self._table.row(self._start + index)
+
+    def __iter__(self):
+        row = self._table.row
+        for pos in range(self._start, self._stop):
+            yield row(pos)
+
+    def __eq__(self, other):
+        if isinstance(other, (PatientRows, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+    def __repr__(self):
+        return f"<PatientRows {len(self)} rows>"
+
+
+_AGE_TEXT = tuple(str(age) for age in range(150))
+
+
+def _age_text(age: int) -> str:
+    if age == _NO_AGE:
+        return ""
+    return _AGE_TEXT[age] if age < 150 else str(age)
+
+
+def _as_int(value: str) -> Optional[int]:
+    """
+    int(value) when str() of it gives back exactly `value`, else None.
+    """
+    if not value.isdigit() or (value[0] == "0" and len(value) > 1) or not value.isascii():
+        return None
+    number = int(value)
+    return number if number < 2 ** 63 else None
+
+
+def _as_ordinal(value: str) -> Optional[int]:
+    if len(value) != 10:
+        return None
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return None
+    return day.toordinal() if day.isoformat() == value else None
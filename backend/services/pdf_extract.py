@@ -0,0 +1,111 @@
+# backend/services/pdf_extract.py
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from backend.utils.lazy import lazy_import
+from config import settings
+
+PyPDF2 = lazy_import("PyPDF2")
+
+
+class PageText(NamedTuple):
+    page: int  # 1-based page number
+    text: str
+    seconds: float
+    error: Optional[str]
+
+
+class ExtractionBudget(NamedTuple):
+    max_pages: int
+    max_bytes: int  # UTF-8 bytes of extracted text
+    max_seconds: float
+
+    @classmethod
+    def from_settings(cls):
+        return cls(settings.PDF_MAX_PAGES, settings.PDF_MAX_TEXT_BYTES, settings.PDF_TIME_BUDGET)
+
+
+class ExtractionReport:
+    """
+    Per-page timings and failures of one extraction, plus why it stopped
+    (None when every page was read).
+    """
+
+    def __init__(self):
+        self.pages: List[Dict] = []
+        self.total_pages = 0
+        self.text_bytes = 0
+        self.seconds = 0.0
+        self.stopped: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "total_pages": self.total_pages,
+            "pages_read": len(self.pages),
+            "failed_pages": sum(1 for p in self.pages if p["error"]),
+            "text_bytes": self.text_bytes,
+            "seconds": round(self.seconds, 4),
+            "stopped": self.stopped,
+            "pages": self.pages,
+        }
+
+
+def iter_pdf_pages(path, budget: ExtractionBudget = None, report: ExtractionReport = None) -> Iterator[PageText]:
+    """
+    Yield the text of each page of a PDF, one page at a time.
+
+    Extraction stops early once the page, byte or wall-clock budget is spent;
+    the reason lands in report.stopped. A page that fails to extract is
+    yielded with empty text and its error instead of aborting the document.
+    The time budget is checked between pages, so a single pathological page
+    can still overrun it by its own extraction time.
+    """
+    budget = budget or ExtractionBudget.from_settings()
+    report = report if report is not None else ExtractionReport()
+    started = time.perf_counter()
+
+    try:
+        reader = PyPDF2.PdfReader(str(path))
+        pages = reader.pages
+        report.total_pages = len(pages)
+    except Exception as e:
+        report.stopped = f"unreadable: {type(e).__name__}: {e}"
+        report.seconds = time.perf_counter() - started
+        return
+
+    for number in range(1, report.total_pages + 1):
+        if number > budget.max_pages:
+            report.stopped = "page_limit"
+            break
+        if time.perf_counter() - started > budget.max_seconds:
+            report.stopped = "time_limit"
+            break
+
+        page_started = time.perf_counter()
+        error = None
+        try:
+            text = pages[number - 1].extract_text() or ""
+        except Exception as e:
+            text = ""
+            error = f"{type(e).__name__}: {e}"
+
+        size = len(text.encode("utf-8"))
+        remaining = budget.max_bytes - report.text_bytes
+        truncated = size > remaining
+        if truncated:
+            text = text.encode("utf-8")[:max(remaining, 0)].decode("utf-8", "ignore")
+            size = len(text.encode("utf-8"))
+        report.text_bytes += size
+
+        elapsed = time.perf_counter() - page_started
+        report.pages.append(
+            {"page": number, "seconds": round(elapsed, 4), "chars": len(text), "error": error}
+        )
+        report.seconds = time.perf_counter() - started
+        yield PageText(number, text, elapsed, error)
+
+        if truncated:
+            report.stopped = "byte_limit"
+            break
+
+    report.seconds = time.perf_counter() - started
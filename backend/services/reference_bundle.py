@@ -0,0 +1,594 @@
+# backend/services/reference_bundle.py
+import hashlib
+import json
+import mmap
+import os
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend.services import data_loader
+from backend.utils.frozen import FrozenDict
+from config import settings
+
+# Bump when the layout changes; older bundles are then recompiled.
+FORMAT = 2
+_MAGIC = b"NHLREF\x00" + bytes([FORMAT])
+_NONE = 0xFFFFFFFF  # "no string" in string ID columns
+
+
+def _key(name: str) -> str:
+    """
+    Lookup key of a disease name or alias: quotes stripped, lower-cased,
+    whitespace collapsed.
+    """
+    return " ".join(name.strip().strip('"').strip("'").lower().split())
+
+
+def source_paths() -> Tuple[Path, ...]:
+    return (
+        Path(settings.RELATIONS_JSON),
+        Path(settings.DISEASES_CSV),
+        Path(settings.STATE_DISEASES_JSON),
+        Path(settings.MOCK_HISTORY_DISEASES_JSON),
+        Path(settings.DISEASE_ALIASES_JSON),
+    )
+
+
+def source_digest() -> str:
+    """
+    Content hash of the source files; a bundle compiled from them carries it.
+    """
+    h = hashlib.sha256(_MAGIC)
+    for path in source_paths():
+        try:
+            h.update(path.read_bytes())
+        except OSError:
+            h.update(b"\x00missing")
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+# -------------------------------------------------------
+# COMPILE
+# -------------------------------------------------------
+class _Strings:
+    """
+    Interned UTF-8 string table: offsets[i]..offsets[i + 1] in one blob.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.offsets = array("I", [0])
+        self.blob = bytearray()
+
+    def __call__(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NONE
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = self.ids[value] = len(self.offsets) - 1
+            self.blob += value.encode("utf-8")
+            self.offsets.append(len(self.blob))
+        return sid
+
+
+def _slot(key: bytes, mask: int) -> int:
+    return zlib.crc32(key) & mask
+
+
+def _hash_slots(keys: List[str]) -> array:
+    """
+    Open-addressing table over `keys` (linear probing, at most half full):
+    each slot holds a position in `keys` or _NONE.
+    """
+    size = 8
+    while size < 2 * len(keys):
+        size *= 2
+    slots = array("I", [_NONE]) * size
+    for pos, key in enumerate(keys):
+        i = _slot(key.encode("utf-8"), size - 1)
+        while slots[i] != _NONE:
+            i = (i + 1) & (size - 1)
+        slots[i] = pos
+    return slots
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except Exception:
+        return 0.0
+
+
+def compile_bundle(relations, aliases, diseases, mock_pool, state_map, digest: str = "") -> bytes:
+    """
+    Bundle bytes for already-parsed reference data.
+
+    Every disease spelling (relation keys, disease lists, aliases) gets an
+    integer ID in first-seen order; names and aliases resolve to it through
+    a hashed key table, and relations are stored as CSR rows of previous-IDs
+    sorted per present-ID. The per-file datasets are kept as string-ID
+    columns so they can be read back as views.
+    """
+    strings = _Strings()
+    names = array("I")
+    ids: Dict[str, int] = {}
+    # An alias always resolves to its canonical disease, even when the alias
+    # is also listed as a disease of its own (e.g. "Diabetes" in state lists).
+    alias_of = {
+        _key(alias): canonical
+        for canonical, alias_list in aliases.items()
+        for alias in alias_list
+        if _key(alias) and _key(alias) != _key(canonical)
+    }
+
+    def intern(name: str) -> int:
+        key = _key(name)
+        if not key:
+            return -1
+        did = ids.get(key)
+        if did is None:
+            canonical = alias_of.get(key)
+            if canonical is not None:
+                did = ids[key] = intern(canonical)
+            else:
+                did = ids[key] = len(names)
+                names.append(strings(name.strip().strip('"').strip("'")))
+        return did
+
+    for present, neighbours in relations.items():
+        intern(present)
+        for previous in neighbours:
+            intern(previous)
+    for name in list(aliases) + [d["disease_name"] for d in diseases] + list(mock_pool):
+        intern(name)
+    for state_list in state_map.values():
+        for name in state_list:
+            intern(name)
+    for alias_list in aliases.values():
+        for alias in alias_list:
+            intern(alias)
+
+    edges: Dict[int, Dict[int, Tuple[float, int]]] = {}
+    presents = array("I")
+    for present, neighbours in relations.items():
+        pid = ids[_key(present)]
+        if pid not in edges:
+            presents.append(pid)
+        row = edges.setdefault(pid, {})
+        for previous, info in neighbours.items():
+            row[ids[_key(previous)]] = (_float(info.get("probability", 0)), strings(info.get("report")))
+    edge_index, edge_target, edge_prob, edge_report = array("I", [0]), array("I"), array("d"), array("I")
+    for did in range(len(names)):
+        for qid, (prob, report) in sorted(edges.get(did, {}).items()):
+            edge_target.append(qid)
+            edge_prob.append(prob)
+            edge_report.append(report)
+        edge_index.append(len(edge_target))
+
+    key_str = array("I", map(strings, ids))
+    key_did = array("I", ids.values())
+
+    fields = list(diseases[0]) if diseases else ["disease_name"]
+    disease_cols = array("I", (strings(str(d.get(f, ""))) for d in diseases for f in fields))
+
+    sections = {
+        "str_offsets": strings.offsets,
+        "names": names,
+        "key_str": key_str,
+        "key_did": key_did,
+        "key_slots": _hash_slots(list(ids)),
+        "edge_index": edge_index,
+        "edge_target": edge_target,
+        "edge_prob": edge_prob,
+        "edge_report": edge_report,
+        "presents": presents,
+        "diseases": disease_cols,
+        "mock_pool": array("I", (strings(name) for name in mock_pool)),
+    }
+    sections.update(_keyed_lists("states", state_map, strings))
+    sections.update(_keyed_lists("aliases", aliases, strings))
+    sections["str_blob"] = array("B", bytes(strings.blob))
+
+    header = {
+        "format": FORMAT,
+        "digest": digest,
+        "byteorder": sys.byteorder,
+        "disease_fields": fields,
+        "sections": {},
+    }
+    body = bytearray()
+    for name, values in sections.items():
+        body += b"\x00" * (-len(body) % 8)
+        header["sections"][name] = [len(body), values.typecode, len(values)]
+        body += values.tobytes()
+
+    head = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    prefix = _MAGIC + len(head).to_bytes(4, "little") + head
+    prefix += b"\x00" * (-len(prefix) % 8)
+    return bytes(prefix) + bytes(body)
+
+
+def _keyed_lists(prefix: str, mapping, strings: _Strings) -> Dict[str, array]:
+    """
+    {name: [strings]} as key, offset and item columns plus a hash table.
+    """
+    names = list(mapping)
+    keys = array("I", map(strings, names))
+    index, items = array("I", [0]), array("I")
+    for values in mapping.values():
+        items.extend(strings(v) for v in values)
+        index.append(len(items))
+    return {
+        f"{prefix}_keys": keys,
+        f"{prefix}_slots": _hash_slots(names),
+        f"{prefix}_index": index,
+        f"{prefix}_items": items,
+    }
+
+
+def build_bundle(digest: str = None) -> bytes:
+    """
+    Compile the bundle from the source files.
+    """
+    return compile_bundle(
+        data_loader.load_relations(),
+        data_loader.load_disease_aliases(),
+        data_loader.load_diseases(),
+        data_loader.load_mock_history_diseases(),
+        data_loader.load_state_diseases(),
+        source_digest() if digest is None else digest,
+    )
+
+
+def write_bundle(path: Path, data: bytes):
+    """
+    Atomically replace the bundle file; processes that mapped the old one
+    keep reading it until they reload.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# -------------------------------------------------------
+# READ
+# -------------------------------------------------------
+class ReferenceBundle:
+    """
+    Read-only view of a compiled bundle, normally a shared memory map of
+    the bundle file: workers mapping the same file share its pages, and
+    every lookup below reads the mapped columns directly.
+
+    Besides the per-file datasets (relations, diseases, state_diseases,
+    mock_history_diseases, disease_aliases) it serves the relation index:
+    disease_id(), canonical(), relation() and neighbours().
+    """
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if bytes(view[:8]) != _MAGIC:
+            raise ValueError("not a reference bundle of this format")
+        size = int.from_bytes(view[8:12], "little")
+        header = json.loads(bytes(view[12: 12 + size]))
+        if header.get("byteorder") != sys.byteorder:
+            raise ValueError("reference bundle was compiled for another byte order")
+        start = 12 + size + (-(12 + size) % 8)
+
+        self._buffer = buffer
+        self.digest: str = header["digest"]
+        self.version: str = self.digest[:16]
+        self.nbytes = len(view)
+        cols = {}
+        for name, (offset, typecode, count) in header["sections"].items():
+            itemsize = array(typecode).itemsize
+            cols[name] = view[start + offset: start + offset + count * itemsize].cast(typecode)
+        self._cols = cols
+        self._offsets = cols["str_offsets"]
+        self._blob = cols["str_blob"]
+        self._names = cols["names"]
+        self._edge_index = cols["edge_index"]
+        self._edge_target = cols["edge_target"]
+        self._key_slots, self._key_str, self._key_did = cols["key_slots"], cols["key_str"], cols["key_did"]
+        # Per-worker memos of hot lookups, bounded like any other cache.
+        self._resolve = lru_cache(maxsize=4096)(self._resolve_uncached)
+        self.relation = lru_cache(maxsize=16384)(self._relation_uncached)
+
+        self.names = _Column(self, self._names)
+        self.relations = _Relations(self)
+        self.diseases = _Records(self, cols["diseases"], header["disease_fields"])
+        self.mock_history_diseases = _Column(self, cols["mock_pool"])
+        self.state_diseases = _KeyedLists(self, "states")
+        self.disease_aliases = _KeyedLists(self, "aliases")
+
+    def string(self, sid: int) -> Optional[str]:
+        if sid == _NONE:
+            return None
+        return str(self._blob[self._offsets[sid]: self._offsets[sid + 1]], "utf-8")
+
+    def _find(self, slots, key_sids, key: str) -> int:
+        """
+        Position of `key` in a hashed key column, or -1.
+        """
+        raw = key.encode("utf-8")
+        mask = len(slots) - 1
+        i = _slot(raw, mask)
+        while True:
+            pos = slots[i]
+            if pos == _NONE:
+                return -1
+            sid = key_sids[pos]
+            if self._blob[self._offsets[sid]: self._offsets[sid + 1]] == raw:
+                return pos
+            i = (i + 1) & mask
+
+    # ---------------------------------------------------
+    # Relation index
+    # ---------------------------------------------------
+    def _resolve_uncached(self, name: str) -> Optional[int]:
+        key = _key(name or "")
+        pos = self._find(self._key_slots, self._key_str, key) if key else -1
+        return self._key_did[pos] if pos >= 0 else None
+
+    def disease_id(self, name: str) -> Optional[int]:
+        return self._resolve(name)
+
+    def canonical(self, name: str) -> str:
+        """
+        Display name for a disease: its canonical spelling when known,
+        otherwise the title-cased input.
+        """
+        did = self._resolve(name)
+        if did is None:
+            return name.strip().strip('"').strip("'").title() if name else ""
+        return self.string(self._names[did])
+
+    def _row(self, did: int) -> Tuple[int, int]:
+        return self._edge_index[did], self._edge_index[did + 1]
+
+    def _edge(self, i: int) -> Tuple[float, Optional[str]]:
+        return self._cols["edge_prob"][i], self.string(self._cols["edge_report"][i])
+
+    def _relation_uncached(self, present: str, previous: str) -> Optional[Tuple[float, Optional[str]]]:
+        """
+        (probability, report) of a relation, or None; see relation().
+        """
+        pid, qid = self._resolve(present), self._resolve(previous)
+        if pid is None or qid is None:
+            return None
+        lo, hi = self._row(pid)
+        i = bisect_left(self._edge_target, qid, lo, hi)
+        if i < hi and self._edge_target[i] == qid:
+            return self._edge(i)
+        return None
+
+    def neighbours(self, present: str) -> Mapping:
+        """
+        {previous disease ID: (probability, report)} for one present disease.
+        """
+        pid = self._resolve(present)
+        return _Neighbours(self, *self._row(pid)) if pid is not None else _Neighbours(self, 0, 0)
+
+    def cache_info(self):
+        return self._resolve.cache_info()
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "bytes": self.nbytes,
+            "diseases": len(self._names),
+            "relations": len(self._cols["edge_target"]),
+            "strings": len(self._offsets) - 1,
+            "mapped": isinstance(self._buffer, mmap.mmap),
+        }
+
+
+class _Column(Sequence):
+    """
+    Tuple-like view of a string ID column.
+    """
+
+    def __init__(self, bundle: ReferenceBundle, sids):
+        self._bundle = bundle
+        self._sids = sids
+
+    def __len__(self):
+        return len(self._sids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._bundle.string(s) for s in self._sids[i]]
+        return self._bundle.string(self._sids[i])
+
+
+class _Records(Sequence):
+    """
+    diseases.csv rows, one read-only dict per item.
+    """
+
+    def __init__(self, bundle: ReferenceBundle, cols, fields: List[str]):
+        self._bundle = bundle
+        self._cols = cols
+        self._fields = fields
+
+    def __len__(self):
+        return len(self._cols) // len(self._fields)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        width = len(self._fields)
+        row = self._cols[i * width: (i + 1) * width]
+        return FrozenDict(zip(self._fields, map(self._bundle.string, row)))
+
+
+class _KeyedLists(Mapping):
+    """
+    {name: tuple of names} view (state_diseases, disease_aliases).
+    """
+
+    def __init__(self, bundle: ReferenceBundle, prefix: str):
+        cols = bundle._cols
+        self._bundle = bundle
+        self._keys = cols[f"{prefix}_keys"]
+        self._slots = cols[f"{prefix}_slots"]
+        self._index = cols[f"{prefix}_index"]
+        self._items = cols[f"{prefix}_items"]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return map(self._bundle.string, self._keys)
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+        i = self._bundle._find(self._slots, self._keys, key)
+        if i < 0:
+            raise KeyError(key)
+        return tuple(map(self._bundle.string, self._items[self._index[i]: self._index[i + 1]]))
+
+
+class _Neighbours(Mapping):
+    """
+    One relation row: {previous disease ID: (probability, report)}.
+    """
+
+    def __init__(self, bundle: ReferenceBundle, lo: int, hi: int):
+        self._bundle = bundle
+        self._lo = lo
+        self._hi = hi
+
+    def __len__(self):
+        return self._hi - self._lo
+
+    def __iter__(self):
+        return iter(self._bundle._edge_target[self._lo: self._hi].tolist())
+
+    def __getitem__(self, qid):
+        targets = self._bundle._edge_target
+        if isinstance(qid, int):
+            i = bisect_left(targets, qid, self._lo, self._hi)
+            if i < self._hi and targets[i] == qid:
+                return self._bundle._edge(i)
+        raise KeyError(qid)
+
+    def items(self):
+        targets = self._bundle._edge_target
+        return [(targets[i], self._bundle._edge(i)) for i in range(self._lo, self._hi)]
+
+
+class _Relations(Mapping):
+    """
+    relations.json as {present: {previous: {"probability", "report"}}}, with
+    canonical spellings.
+    """
+
+    def __init__(self, bundle: ReferenceBundle):
+        self._bundle = bundle
+
+    def __len__(self):
+        return len(self._bundle._cols["presents"])
+
+    def __iter__(self):
+        names = self._bundle._names
+        return (self._bundle.string(names[did]) for did in self._bundle._cols["presents"])
+
+    def __getitem__(self, present):
+        bundle = self._bundle
+        did = bundle.disease_id(present) if isinstance(present, str) else None
+        lo, hi = bundle._row(did) if did is not None else (0, 0)
+        if lo == hi or bundle.string(bundle._names[did]) != present:
+            raise KeyError(present)
+        targets = bundle._edge_target
+        out = {}
+        for i in range(lo, hi):
+            prob, report = bundle._edge(i)
+            info = {"probability": prob} if report is None else {"probability": prob, "report": report}
+            out[bundle.string(bundle._names[targets[i]])] = FrozenDict(info)
+        return FrozenDict(out)
+
+
+def open_bundle(path: Path) -> Optional[ReferenceBundle]:
+    """
+    Map a bundle file read-only; None if it is missing or unreadable.
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        return ReferenceBundle(buffer)
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def bundle_digest(path: Path) -> Optional[str]:
+    """
+    Source digest recorded in a bundle file's header, without mapping it.
+    """
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(12)
+            if prefix[:8] != _MAGIC:
+                return None
+            return json.loads(f.read(int.from_bytes(prefix[8:12], "little")))["digest"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# Source digest each bundle path was last verified against, with the
+# version of the files (sources and bundle) at that time.
+_verified: Dict[str, Tuple[str, str]] = {}
+
+
+def ensure_compiled(version: Callable[[], str]):
+    """
+    Recompile REFERENCE_BUNDLE unless it was compiled from the current
+    source files. `version` covers the sources and the bundle itself, so
+    sources are only hashed after one of them changed, and nothing is
+    written when the bundle already matches.
+    """
+    path = Path(settings.REFERENCE_BUNDLE)
+    current = version()
+    seen = _verified.get(str(path))
+    if seen is not None and seen[0] == current:
+        return
+    digest = source_digest()
+    if bundle_digest(path) != digest:
+        try:
+            write_bundle(path, build_bundle(digest))
+            current = version()
+        except OSError:
+            pass  # load_bundle() compiles in memory instead
+    _verified[str(path)] = (current, digest)
+
+
+def load_bundle() -> ReferenceBundle:
+    """
+    Map REFERENCE_BUNDLE read-only. If it is missing or stale (the runtime
+    directory is not writable) the bundle is compiled in memory instead.
+    """
+    path = Path(settings.REFERENCE_BUNDLE)
+    bundle = open_bundle(path)
+    seen = _verified.get(str(path))
+    if bundle is None or (seen is not None and bundle.digest != seen[1]):
+        return ReferenceBundle(build_bundle())
+    return bundle
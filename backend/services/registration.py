@@ -0,0 +1,100 @@
+# backend/services/registration.py
+from pathlib import Path
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from backend.services.data_loader import append_patient, append_patient_history
+from backend.services.jobs import QueueFull, get_job_queue
+from backend.services.linkage import get_linkage_index
+from backend.services.snapshots import get_data
+from backend.utils.helpers import generate_auto_history
+from backend.utils.metrics import stage
+from config import settings
+
+# Patient registration, shared by the Flask form handler and the ASGI upload
+# path: both allocate the ID first, store the optional report under it, then
+# call build_patient() and save_registration().
+
+DEFAULT_LAST_VISIT = "2025-01-01"
+
+
+class Registration(NamedTuple):
+    patient_id: str
+    duplicates: List[Dict]
+
+
+def upload_target(patient_id, filename: str) -> Optional[Tuple[Path, str]]:
+    """
+    Where an uploaded report is stored, and its extension; None if the file
+    type is not accepted (the registration then proceeds without it).
+    """
+    filename = secure_filename(filename or "")
+    if not filename:
+        return None
+    ext = filename.lower().rsplit(".", 1)[-1]
+    if ext not in settings.ALLOWED_EXTENSIONS:
+        return None
+    return Path(settings.UPLOAD_DIR) / f"{patient_id}_{filename}", ext
+
+
+def build_patient(patient_id, form: Mapping[str, str]) -> Tuple[Dict, List[Dict]]:
+    """
+    The patient row and auto-generated history for a submitted form.
+    """
+    def field(name):
+        return (form.get(name) or "").strip()
+
+    last_visit = field("last_visit") or DEFAULT_LAST_VISIT
+
+    # Auto history from mock 50+ diseases
+    with stage("history_generate"):
+        auto_history = generate_auto_history(
+            patient_id=str(patient_id),
+            present_disease=field("present_disease"),
+            last_visit_str=last_visit,
+            master_diseases=list(get_data("mock_history_diseases")),
+            count=5,
+        )
+
+    row = {
+        "patient_id": str(patient_id),
+        "name": field("name"),
+        "age": field("age"),
+        "gender": field("gender"),
+        "city": field("city"),
+        "state": field("state"),
+        "last_visit": last_visit,
+        "present_disease": field("present_disease"),
+        "previous_diseases": "|".join(h["disease"] for h in auto_history),
+    }
+    return row, auto_history
+
+
+def save_registration(row: Dict, auto_history: List[Dict], upload: Optional[Tuple[Path, str]] = None) -> Registration:
+    """
+    Persist a new patient and queue parsing of its stored report upload.
+    """
+    patient_id = row["patient_id"]
+
+    # Flag, don't block: the new record is kept and the report page
+    # lists the likely duplicates for staff to reconcile.
+    with stage("duplicate_check"):
+        duplicates = get_linkage_index().find_duplicates(row)
+
+    with stage("data_write"):
+        append_patient(row)
+        append_patient_history(patient_id, {"auto_history": auto_history, "report_history": []})
+
+    if upload:
+        path, ext = upload
+        report_job = {"patient_id": patient_id, "path": str(path), "ext": ext, "diagnosed_on": row["last_visit"]}
+        try:
+            get_job_queue().enqueue("report_parse", report_job, patient_id=patient_id)
+        except QueueFull:
+            # Queue is saturated: parse in the request rather than drop the
+            # upload. It still gets a job row, so a failure is logged and
+            # shown on the report page instead of vanishing.
+            get_job_queue().run_now("report_parse", report_job, patient_id=patient_id)
+
+    return Registration(patient_id, duplicates)
@@ -1,8 +1,10 @@
 # backend/services/relation_service.py
 import hashlib
-from backend.services.data_loader import load_relations
+from functools import lru_cache
+from typing import Dict
 
-_relations = load_relations()
+from backend.services.reference_bundle import ReferenceBundle
+from backend.services.snapshots import get_snapshot
 
 
 def _normalize(name: str) -> str:
@@ -11,17 +13,75 @@ def _normalize(name: str) -> str:
     return name.strip().strip('"').strip("'").title()
 
 
-def _safe_float(value):
-    try:
-        return float(value)
-    except Exception:
-        return 0.0
+def get_relation_index() -> ReferenceBundle:
+    """
+    Relation index of the current reference data: the memory-mapped bundle,
+    which resolves names and aliases and looks up relations in place.
+    """
+    return get_snapshot("reference").data
+
+
+def canonical_name(name: str) -> str:
+    return get_relation_index().canonical(name)
+
+
+# -------------------------------------------------------
+# MEMOISED DETERMINISTIC SCORES
+# -------------------------------------------------------
+@lru_cache(maxsize=65536)
+def _hash_unit(key: str) -> float:
+    h = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return int(h[:6], 16) / 0xFFFFFF
+
+
+@lru_cache(maxsize=65536)
+def _mock_probability(version: str, present: str, previous: str, patient_id: str, extra_key: str) -> float:
+    rel = get_relation_index().relation(present, previous)
+    base_prob = rel[0] if rel else 0.0
 
+    key = f"hist:{patient_id}:{_normalize(present)}:{_normalize(previous)}:{extra_key}"
+    rand_component = _hash_unit(key)
 
+    if base_prob > 0:
+        return 0.6 * base_prob + 0.4 * rand_component
+    return rand_component
+
+
+def relation_cache_stats() -> Dict[str, Dict]:
+    """
+    Hit/miss counters of the relation memo caches.
+    """
+
+    def _stats(info):
+        total = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "max_size": info.maxsize,
+            "hit_rate": round(info.hits / total, 4) if total else 0.0,
+        }
+
+    return {
+        "hash": _stats(_hash_unit.cache_info()),
+        "mock_probability": _stats(_mock_probability.cache_info()),
+        "name_resolution": _stats(get_relation_index().cache_info()),
+    }
+
+
+def clear_relation_caches():
+    _hash_unit.cache_clear()
+    _mock_probability.cache_clear()
+
+
+# -------------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------------
 def get_relation(present_disease: str, previous_disease: str):
-    present = _normalize(present_disease)
-    previous = _normalize(previous_disease)
-    rel = _relations.get(present, {}).get(previous)
+    index = get_relation_index()
+    present = index.canonical(present_disease)
+    previous = index.canonical(previous_disease)
+    rel = index.relation(present_disease, previous_disease)
     if not rel:
         return {
             "present_disease": present,
@@ -32,40 +92,37 @@ def get_relation(present_disease: str, previous_disease: str):
     return {
         "present_disease": present,
         "previous_disease": previous,
-        "probability": _safe_float(rel.get("probability", 0)),
-        "report": rel.get("report", "No data available."),
+        "probability": rel[0],
+        "report": rel[1] or "No data available.",
     }
 
 
 def get_all_relations_for_disease(present_disease: str):
-    present = _normalize(present_disease)
+    index = get_relation_index()
     out = {}
-    for prev, info in _relations.get(present, {}).items():
-        out[_normalize(prev)] = {
-            "probability": _safe_float(info.get("probability", 0)),
-            "report": info.get("report", "No data available."),
+    for qid, (prob, report) in index.neighbours(present_disease).items():
+        out[index.names[qid]] = {
+            "probability": prob,
+            "report": report or "No data available.",
         }
     return out
 
 
 def relation_exists(present_disease: str, previous_disease: str) -> bool:
-    present = _normalize(present_disease)
-    previous = _normalize(previous_disease)
-    return previous in _relations.get(present, {})
+    return get_relation_index().relation(present_disease, previous_disease) is not None
 
 
 def build_state_causal_context(present_disease: str, state: str, state_diseases, patient_id: str):
+    index = get_relation_index()
     present = _normalize(present_disease)
     results = []
     for sd in state_diseases[:5]:
         sd_norm = _normalize(sd)
-        base_rel = _relations.get(present, {}).get(sd_norm)
-        base_prob = _safe_float(base_rel.get("probability", 0)) if base_rel else 0.0
-        base_report = base_rel.get("report") if base_rel else None
+        base_rel = index.relation(present_disease, sd)
+        base_prob = base_rel[0] if base_rel else 0.0
+        base_report = base_rel[1] if base_rel else None
 
-        key = f"state:{patient_id}:{state}:{sd_norm}:{present}"
-        h = hashlib.sha256(key.encode("utf-8")).hexdigest()
-        rand_component = int(h[:6], 16) / 0xFFFFFF
+        rand_component = _hash_unit(f"state:{patient_id}:{state}:{sd_norm}:{present}")
 
         if base_prob > 0:
             final_prob = 0.5 * base_prob + 0.5 * rand_component
@@ -93,19 +150,8 @@ def build_state_causal_context(present_disease: str, state: str, state_diseases,
 def build_mock_causal_probability(present_disease: str, previous_disease: str, patient_id: str, extra_key: str = ""):
     """
     Deterministic pseudo-random probability for auto/report history diseases.
+    Memoised per relation index version.
     """
-    present = _normalize(present_disease)
-    previous = _normalize(previous_disease)
-    base_rel = _relations.get(present, {}).get(previous)
-    base_prob = _safe_float(base_rel.get("probability", 0)) if base_rel else 0.0
-
-    key = f"hist:{patient_id}:{present}:{previous}:{extra_key}"
-    h = hashlib.sha256(key.encode("utf-8")).hexdigest()
-    rand_component = int(h[:6], 16) / 0xFFFFFF
-
-    if base_prob > 0:
-        final_prob = 0.6 * base_prob + 0.4 * rand_component
-    else:
-        final_prob = rand_component
-
-    return final_prob
+    return _mock_probability(
+        get_relation_index().version, present_disease or "", previous_disease or "", str(patient_id), extra_key
+    )
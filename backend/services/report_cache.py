@@ -0,0 +1,161 @@
+# backend/services/report_cache.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional
+
+from backend.services.relation_service import get_relation_index
+from backend.services.report_service import build_report_context
+from backend.services.snapshots import get_snapshot
+from backend.utils.disk_cache import DiskCache
+from backend.utils.frozen import freeze
+from backend.utils.metrics import cache_event
+from config import settings
+
+
+class ReportPage(NamedTuple):
+    html: str
+    etag: str
+    last_modified: float  # epoch seconds the page was first rendered
+
+
+class ReportCache:
+    """
+    Bounded in-process LRU of JSON-compatible values, optionally backed by a
+    DiskCache shared with the other workers. Keys already contain every data
+    version a value depends on, so entries never need explicit invalidation;
+    stale ones simply age out.
+    """
+
+    def __init__(self, max_entries: int, disk: Optional[DiskCache] = None):
+        self.max_entries = max(1, max_entries)
+        self.disk = disk
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                cache_event("report", "hit")
+                return value
+        if self.disk is not None:
+            text = self.disk.get(_disk_key(key))
+            if text is not None:
+                value = freeze(json.loads(text))
+                self._remember(key, value)
+                with self._lock:
+                    self.disk_hits += 1
+                cache_event("report", "disk_hit")
+                return value
+        with self._lock:
+            self.misses += 1
+        cache_event("report", "miss")
+        return None
+
+    def put(self, key: str, value: dict):
+        self._remember(key, value)
+        if self.disk is not None:
+            self.disk.put(_disk_key(key), json.dumps(value, ensure_ascii=False))
+
+    def _remember(self, key: str, value: dict):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / total, 4) if total else 0.0,
+            }
+
+
+def _disk_key(key: str) -> str:
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+_caches: Dict[str, ReportCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_report_cache() -> ReportCache:
+    disk_dir = settings.REPORT_CACHE_DIR if settings.REPORT_CACHE_DISK else None
+    key = f"{settings.REPORT_CACHE_ENTRIES}|{disk_dir}"
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            disk = DiskCache(disk_dir, settings.REPORT_CACHE_MAX_BYTES) if disk_dir else None
+            cache = ReportCache(settings.REPORT_CACHE_ENTRIES, disk)
+            _caches[key] = cache
+        return cache
+
+
+def clear_report_caches():
+    with _caches_lock:
+        _caches.clear()
+
+
+# -------------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------------
+def report_version(patient, history: Dict) -> str:
+    """
+    Token covering everything a report depends on: the patient's row and
+    history, the reference data behind the relation index, the translation
+    catalogs the page is rendered with and the app version.
+    """
+    h = hashlib.sha1()
+    h.update(json.dumps([patient, history], sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    h.update(get_relation_index().version.encode("utf-8"))
+    h.update(str(get_snapshot("translations").version).encode("utf-8"))
+    h.update(settings.VERSION.encode("utf-8"))
+    return h.hexdigest()
+
+
+def report_etag(patient_id, lang: str, version: str) -> str:
+    return hashlib.sha1(f"{patient_id}|{lang}|{version}".encode("utf-8")).hexdigest()
+
+
+def cached_report_context(patient, history: Dict, version: str = None) -> Dict:
+    version = version or report_version(patient, history)
+    key = f"ctx:{patient.get('patient_id')}:{version}"
+    cache = get_report_cache()
+    entry = cache.get(key)
+    if entry is None:
+        entry = {"context": freeze(build_report_context(patient, history))}
+        cache.put(key, entry)
+    return entry["context"]
+
+
+def cached_report_page(
+    patient, history: Dict, lang: str, render: Callable[[Dict], str], version: str = None
+) -> ReportPage:
+    """
+    Rendered report for one patient and language; `render(context)` is only
+    called on a miss.
+    """
+    version = version or report_version(patient, history)
+    patient_id = patient.get("patient_id")
+    key = f"html:{patient_id}:{lang}:{version}"
+    cache = get_report_cache()
+    entry = cache.get(key)
+    if entry is None:
+        context = cached_report_context(patient, history, version)
+        entry = freeze({"html": render(context), "last_modified": int(time.time())})
+        cache.put(key, entry)
+    return ReportPage(entry["html"], report_etag(patient_id, lang, version), entry["last_modified"])
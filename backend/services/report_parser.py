@@ -0,0 +1,81 @@
+# backend/services/report_parser.py
+from typing import Callable, Dict
+
+from backend.services.data_loader import append_patient_history, get_patient_history
+from backend.services.disease_matcher import get_disease_matcher
+from backend.services.ocr import file_sha256, ocr_image, ocr_pdf_pages, pdf_ocr_available
+from backend.services.pdf_extract import ExtractionReport, iter_pdf_pages
+from config import settings
+
+
+def _no_progress(fraction: float, message: str = ""):
+    pass
+
+
+def match_pdf_diseases(path, progress: Callable = _no_progress, digest: str = None) -> Dict:
+    """
+    Stream a PDF page by page, matching diseases as each page arrives so the
+    full document text is never held in memory. Pages without a text layer
+    (scans) are OCR'd afterwards, in parallel, when Tesseract is available.
+    """
+    matcher = get_disease_matcher()
+    report = ExtractionReport()
+    found: Dict[str, None] = {}
+    blank_pages = []
+
+    for page in iter_pdf_pages(path, report=report):
+        if not page.text.strip():
+            blank_pages.append(page.page)
+        for d in matcher.diseases_in(page.text):
+            found.setdefault(d)
+        total = min(report.total_pages, settings.PDF_MAX_PAGES) or 1
+        progress(page.page / total * 0.8, f"Read page {page.page}/{report.total_pages}")
+
+    ocr_pages = []
+    if blank_pages and pdf_ocr_available():
+        ocr_pages = blank_pages[: settings.OCR_MAX_PAGES]
+        progress(0.85, f"Running OCR on {len(ocr_pages)} scanned pages")
+        texts = ocr_pdf_pages(path, ocr_pages, digest)
+        for number in sorted(texts):
+            for d in matcher.diseases_in(texts[number]):
+                found.setdefault(d)
+
+    return {"diseases": list(found), "extraction": report.to_dict(), "ocr_pages": ocr_pages}
+
+
+def match_image_diseases(path, digest: str = None) -> Dict:
+    text = ocr_image(path, digest)
+    return {"diseases": get_disease_matcher().diseases_in(text), "extraction": None, "ocr_pages": [1] if text else []}
+
+
+def run_report_job(payload: Dict, progress: Callable = _no_progress) -> Dict:
+    """
+    Parse an uploaded report and store the diseases it mentions as the
+    patient's report_history. Runs inside a job worker.
+    """
+    patient_id = str(payload["patient_id"])
+    ext = payload["ext"]
+    digest = file_sha256(payload["path"])
+
+    if ext == "pdf":
+        result = match_pdf_diseases(payload["path"], progress, digest)
+    else:
+        progress(0.1, "Running OCR on image")
+        result = match_image_diseases(payload["path"], digest)
+
+    diseases = result["diseases"]
+    report_history = [
+        {
+            "disease": d,
+            "diagnosed_on": payload.get("diagnosed_on", ""),
+            "source": "upload",
+        }
+        for d in diseases
+    ]
+
+    history = dict(get_patient_history(patient_id))
+    history["report_history"] = report_history
+    append_patient_history(patient_id, history)
+
+    progress(1.0, f"Found {len(diseases)} diseases")
+    return result
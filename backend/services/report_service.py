@@ -0,0 +1,134 @@
+# backend/services/report_service.py
+import time
+from typing import Dict
+
+from backend.services.relation_service import (
+    get_all_relations_for_disease,
+    build_state_causal_context,
+    build_mock_causal_probability,
+    canonical_name,
+)
+from backend.services.snapshots import get_data
+from backend.utils.helpers import generate_mock_vitals, vitals_to_scores
+from backend.utils.metrics import observe_stage, stage
+
+
+def previous_disease_list(patient) -> list:
+    return [
+        d.strip()
+        for d in (patient.get("previous_diseases") or "").split("|")
+        if d.strip()
+    ]
+
+
+def state_diseases_for(patient) -> list:
+    state_map = get_data("state_diseases")
+    state_raw = (patient.get("state") or "").strip()
+    return state_map.get(state_raw) or state_map.get(state_raw.title()) or []
+
+
+def build_report_context(patient, history_info: Dict) -> Dict:
+    """
+    Everything report.html shows for one patient: relation table, auto/report
+    history linkage, state context, vitals and the chart series.
+    """
+    patient_id = patient.get("patient_id")
+    present = patient.get("present_disease", "")
+    started = time.perf_counter()
+
+    all_rel = get_all_relations_for_disease(present)
+    relation_data = {}
+
+    for prev in previous_disease_list(patient):
+        key = canonical_name(prev)
+        rel = all_rel.get(key)
+        if rel:
+            relation_data[key] = rel
+        else:
+            relation_data[key] = {
+                "probability": 0.0,
+                "report": "No data available for this pair in base dataset.",
+            }
+
+    auto_history = history_info.get("auto_history", [])
+    report_history = history_info.get("report_history", [])
+
+    auto_context = []
+    for h in auto_history:
+        dname = h["disease"]
+        prob = build_mock_causal_probability(
+            present_disease=present,
+            previous_disease=dname,
+            patient_id=str(patient_id),
+            extra_key=h.get("diagnosed_on", ""),
+        )
+        auto_context.append(
+            {
+                "disease": dname,
+                "diagnosed_on": h.get("diagnosed_on"),
+                "probability": prob,
+                "source": "auto",
+                "report": f"Previously recorded {dname} on {h.get('diagnosed_on')} may influence the current {present} (mock).",
+            }
+        )
+        relation_data[canonical_name(dname)] = {
+            "probability": prob,
+            "report": f"Auto-history linkage: {dname} on {h.get('diagnosed_on')} → {present}.",
+        }
+
+    report_context = []
+    for h in report_history:
+        dname = h["disease"]
+        prob = build_mock_causal_probability(
+            present_disease=present,
+            previous_disease=dname,
+            patient_id=str(patient_id),
+            extra_key=f"report-{h.get('diagnosed_on', '')}",
+        )
+        report_context.append(
+            {
+                "disease": dname,
+                "diagnosed_on": h.get("diagnosed_on"),
+                "probability": prob,
+                "source": "upload",
+                "report": f"Disease {dname} from uploaded report dated {h.get('diagnosed_on')} may still contribute to {present} (mock).",
+            }
+        )
+        relation_data[canonical_name(dname)] = {
+            "probability": prob,
+            "report": f"Report-derived linkage: {dname} ({h.get('diagnosed_on')}) → {present}.",
+        }
+
+    observe_stage("scoring", time.perf_counter() - started)
+
+    with stage("state_context"):
+        state_raw = (patient.get("state") or "").strip()
+        state_context = build_state_causal_context(
+            present_disease=present,
+            state=state_raw or "Unknown",
+            state_diseases=state_diseases_for(patient),
+            patient_id=str(patient_id),
+        )
+
+    with stage("vitals"):
+        vitals = generate_mock_vitals(str(patient_id))
+        vital_scores = vitals_to_scores(vitals)
+
+    chart_values = (
+        [c["probability"] for c in auto_context]
+        + [c["probability"] for c in report_context]
+        + [c["probability"] for c in state_context]
+        + vital_scores
+    )
+
+    return {
+        "patient": patient,
+        "relation_data": relation_data,
+        "state_context": state_context,
+        "vitals": vitals,
+        "vital_scores": vital_scores,
+        "auto_history": auto_context,
+        "report_history": report_context,
+        "chart_values": chart_values,
+    }
+
@@ -0,0 +1,320 @@
+# backend/services/scoring.py
+from __future__ import annotations
+
+import gc
+import hashlib
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from backend.services import data_loader
+from backend.services.relation_service import _normalize, get_relation_index
+from backend.services.report_service import (
+    build_report_context,
+    previous_disease_list,
+    state_diseases_for,
+)
+from backend.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+@lru_cache(maxsize=None)
+def _temperature_tables() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    report_service rounds temperatures with Python's round(); the handful of
+    possible values are tabulated with it so the batch path matches bit for bit.
+    """
+    current = np.array([round(36.5 + k / 10.0, 1) for k in range(8)])
+    predicted = np.array([[round(36.5 + k / 10.0 + (j - 1) * 0.1, 1) for j in range(3)] for k in range(8)])
+    return current, predicted
+
+
+_VITAL_KEYS = ("heart_rate", "bp_systolic", "bp_diastolic", "spo2", "temperature")
+
+
+# (base, random) mixing weights of build_mock_causal_probability and
+# build_state_causal_context, indexed by term kind.
+_HISTORY, _STATE = 0, 1
+_MIX = ((0.6, 0.4), (0.5, 0.5))
+
+
+# -------------------------------------------------------
+# VITALS
+# -------------------------------------------------------
+def batch_vitals(pids: np.ndarray) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    generate_mock_vitals for an array of integer patient IDs.
+    Returns (current, predicted) column dicts.
+    """
+    pids = np.asarray(pids, dtype=np.int64)
+    t_idx = (pids * 11) % 8
+    temperature, temperature_pred = _temperature_tables()
+    current = {
+        "heart_rate": 60 + (pids * 7) % 40,
+        "bp_systolic": 100 + (pids * 3) % 40,
+        "bp_diastolic": 60 + (pids * 2) % 25,
+        "spo2": 94 + (pids * 5) % 6,
+        "temperature": temperature[t_idx],
+    }
+    predicted = {
+        "heart_rate": current["heart_rate"] + ((pids * 13) % 5 - 2),
+        "bp_systolic": current["bp_systolic"] + ((pids * 17) % 6 - 3),
+        "bp_diastolic": current["bp_diastolic"] + ((pids * 19) % 5 - 2),
+        "spo2": np.clip(current["spo2"] + ((pids * 23) % 3 - 1), 90, 99),
+        "temperature": temperature_pred[t_idx, (pids * 29) % 3],
+    }
+    return current, predicted
+
+
+def batch_vital_scores(current: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    vitals_to_scores for every row at once; shape (n, 5).
+    """
+    return np.column_stack(
+        [
+            np.clip((current["heart_rate"] - 50) / 80.0, 0.0, 1.0),
+            np.clip((current["bp_systolic"] - 90) / 70.0, 0.0, 1.0),
+            np.clip((current["bp_diastolic"] - 60) / 30.0, 0.0, 1.0),
+            np.clip((100 - current["spo2"]) / 20.0, 0.0, 1.0),
+            np.clip((current["temperature"] - 36.5) / 2.0, 0.0, 1.0),
+        ]
+    )
+
+
+# -------------------------------------------------------
+# CAUSAL PROBABILITIES
+# -------------------------------------------------------
+def _hash_units(keys: Sequence[str]) -> np.ndarray:
+    """
+    Same value as relation_service._hash_unit (first 24 bits of SHA-256),
+    without filling its memo with one-off batch keys.
+    """
+    sha = hashlib.sha256
+    raw = np.fromiter(
+        (int.from_bytes(sha(k.encode("utf-8")).digest()[:3], "big") for k in keys),
+        dtype=np.float64,
+        count=len(keys),
+    )
+    return raw / 0xFFFFFF
+
+
+def _mix(keys: Sequence[str], base: Sequence[float], kinds: Sequence[int]) -> np.ndarray:
+    rand = _hash_units(keys)
+    base = np.fromiter(base, dtype=np.float64, count=len(keys))
+    weights = np.asarray(_MIX)[np.fromiter(kinds, dtype=np.intp, count=len(keys))]
+    return np.where(base > 0, weights[:, 0] * base + weights[:, 1] * rand, rand)
+
+
+@contextmanager
+def _gc_paused():
+    """
+    A batch allocates millions of small, acyclic containers; letting the
+    cyclic collector rescan them all on every generation-2 pass costs more
+    than the scoring itself.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+# -------------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------------
+def score_patients(
+    patients: Iterable[Mapping], histories: Optional[Mapping[str, dict]] = None, pause_gc: bool = False
+) -> Dict:
+    """
+    Relation, history, state and vitals scores for many patients at once.
+
+    Each score row carries the same numbers patient_view shows for that
+    patient. `histories` maps patient_id -> history; when omitted each
+    patient's history is read from storage. Patients whose IDs are not
+    integers cannot get mock vitals and are reported under "errors".
+
+    pause_gc turns the cyclic collector off for the batch. gc.disable() is
+    process-wide, so only offline callers (whole-census scoring, benchmarks)
+    should pass it, never a request handler.
+    """
+    if not pause_gc:
+        return _score_patients(patients, histories)
+    with _gc_paused():
+        return _score_patients(patients, histories)
+
+
+def _score_patients(patients, histories) -> Dict:
+    index = get_relation_index()
+    normalized: Dict[str, str] = {}
+    base_cache: Dict[Tuple[str, str], float] = {}
+    state_cache: Dict[Tuple[str, str], list] = {}
+
+    def norm(name: str) -> str:
+        value = normalized.get(name)
+        if value is None:
+            value = normalized[name] = _normalize(name)
+        return value
+
+    def base_prob(present: str, previous: str) -> float:
+        pair = (present, previous)
+        prob = base_cache.get(pair)
+        if prob is None:
+            rel = index.relation(present, previous)
+            prob = base_cache[pair] = rel[0] if rel else 0.0
+        return prob
+
+    # Every probability in the batch becomes one entry in these flat lists;
+    # the hashing and mixing then run once over all of them.
+    keys: List[str] = []
+    bases: List[float] = []
+    kinds: List[int] = []
+
+    plans = []
+    errors = []
+    for patient in patients:
+        pid = str(patient.get("patient_id"))
+        try:
+            numeric_id = int(pid or "0")
+        except ValueError:
+            errors.append({"patient_id": pid, "error": "patient_id is not an integer"})
+            continue
+
+        present = patient.get("present_disease", "")
+        present_norm = norm(present)
+        if histories is None:
+            history = data_loader.get_patient_history(pid)
+        else:
+            history = histories.get(pid) or {}
+
+        neighbours = index.neighbours(present)
+        relations = {}
+        for prev in previous_disease_list(patient):
+            rel = neighbours.get(index.disease_id(prev))
+            relations[index.canonical(prev)] = rel[0] if rel else 0.0
+
+        auto = []
+        for h in history.get("auto_history", []):
+            dname = h["disease"]
+            auto.append((dname, h.get("diagnosed_on"), len(keys)))
+            keys.append(f"hist:{pid}:{present_norm}:{norm(dname)}:{h.get('diagnosed_on', '')}")
+            bases.append(base_prob(present, dname))
+            kinds.append(_HISTORY)
+
+        report = []
+        for h in history.get("report_history", []):
+            dname = h["disease"]
+            report.append((dname, h.get("diagnosed_on"), len(keys)))
+            keys.append(f"hist:{pid}:{present_norm}:{norm(dname)}:report-{h.get('diagnosed_on', '')}")
+            bases.append(base_prob(present, dname))
+            kinds.append(_HISTORY)
+
+        state_raw = (patient.get("state") or "").strip()
+        state_terms = state_cache.get((state_raw, present))
+        if state_terms is None:
+            state_terms = state_cache[(state_raw, present)] = [
+                (norm(sd), f"{state_raw or 'Unknown'}:{norm(sd)}:{present_norm}", base_prob(present, sd))
+                for sd in state_diseases_for(patient)[:5]
+            ]
+        state = []
+        for sd_norm, key_tail, base in state_terms:
+            state.append((sd_norm, len(keys)))
+            keys.append(f"state:{pid}:{key_tail}")
+            bases.append(base)
+            kinds.append(_STATE)
+
+        plans.append((pid, numeric_id, present, relations, auto, report, state))
+
+    probs = _mix(keys, bases, kinds).tolist() if keys else []
+    current, predicted = batch_vitals(np.fromiter((p[1] for p in plans), dtype=np.int64, count=len(plans)))
+    vital_scores = batch_vital_scores(current).tolist() if plans else []
+    current = {k: v.tolist() for k, v in current.items()}
+    predicted = {k: v.tolist() for k, v in predicted.items()}
+
+    scores = []
+    for row, (pid, _, present, relations, auto, report, state) in enumerate(plans):
+        auto_rows = [{"disease": d, "diagnosed_on": on, "probability": probs[i]} for d, on, i in auto]
+        report_rows = [{"disease": d, "diagnosed_on": on, "probability": probs[i]} for d, on, i in report]
+        state_rows = [{"disease": d, "probability": probs[i]} for d, i in state]
+        for entry in auto_rows + report_rows:
+            relations[index.canonical(entry["disease"])] = entry["probability"]
+        scores.append(
+            {
+                "patient_id": pid,
+                "present_disease": present,
+                "relations": relations,
+                "auto_history": auto_rows,
+                "report_history": report_rows,
+                "state_context": state_rows,
+                "vitals": {
+                    "current": {k: current[k][row] for k in _VITAL_KEYS},
+                    "predicted": {k: predicted[k][row] for k in _VITAL_KEYS},
+                },
+                "vital_scores": vital_scores[row],
+                "chart_values": [r["probability"] for r in auto_rows + report_rows + state_rows]
+                + vital_scores[row],
+            }
+        )
+    return {"scores": scores, "errors": errors}
+
+
+def score_patient_ids(patient_ids: Iterable) -> Dict:
+    """
+    score_patients for explicit IDs; unknown IDs are listed under "missing".
+    """
+    patients, missing = [], []
+    for pid in patient_ids:
+        patient = data_loader.get_patient(pid)
+        if patient:
+            patients.append(patient)
+        else:
+            missing.append(str(pid))
+    result = score_patients(patients)
+    result["missing"] = missing
+    return result
+
+
+def score_all(state=None, present_disease=None, batch_size: int = 10000) -> Iterator[Dict]:
+    """
+    Score the whole census (optionally filtered), one batch at a time, with
+    the cyclic collector paused per batch. Offline use only.
+    """
+    histories = data_loader.load_patient_history()
+    start = 0
+    while start is not None:
+        rows, start = data_loader.page_patients(
+            start=start, limit=batch_size, state=state, present_disease=present_disease
+        )
+        if rows:
+            yield score_patients(rows, histories, pause_gc=True)
+
+
+def score_from_context(context: Mapping) -> Dict:
+    """
+    The score row for one patient taken from its report context, i.e. the
+    per-patient path the batch results must reproduce.
+    """
+    def history_rows(items):
+        return [
+            {"disease": c["disease"], "diagnosed_on": c["diagnosed_on"], "probability": c["probability"]}
+            for c in items
+        ]
+
+    patient = context["patient"]
+    return {
+        "patient_id": str(patient.get("patient_id")),
+        "present_disease": patient.get("present_disease", ""),
+        "relations": {k: v["probability"] for k, v in context["relation_data"].items()},
+        "auto_history": history_rows(context["auto_history"]),
+        "report_history": history_rows(context["report_history"]),
+        "state_context": [{"disease": c["disease"], "probability": c["probability"]} for c in context["state_context"]],
+        "vitals": context["vitals"],
+        "vital_scores": context["vital_scores"],
+        "chart_values": context["chart_values"],
+    }
+
+
+def score_patient(patient, history: Dict) -> Dict:
+    return score_from_context(build_report_context(patient, history))
@@ -0,0 +1,236 @@
+# backend/services/search_index.py
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from backend.services import data_loader
+from backend.utils.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+SEARCH_FIELDS = ("name", "city", "state", "present_disease", "previous_diseases")
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or "").lower())
+
+
+class SearchPage(NamedTuple):
+    patient_ids: List[str]
+    total: int
+
+
+class PatientSearchIndex:
+    """
+    Inverted index from lower-cased word tokens of the searchable fields to
+    the patients containing them.
+
+    Patients are numbered by insertion order, so every posting list is a
+    sorted int32 array. Query terms match as prefixes: the sorted vocabulary
+    is bisected for the terms starting with each query word, and the
+    patients of the rarest word are filtered by the postings of the others.
+    Like the co-occurrence matrix, new patients are folded in from the
+    storage backend's append position and the index is rebuilt if rows were
+    rewritten. Appended postings are buffered per term and merged into the
+    arrays on first use.
+    """
+
+    def __init__(self, cache_entries: int = 64):
+        self._lock = threading.RLock()
+        self._cache_entries = cache_entries
+        self._reset()
+
+    def _reset(self):
+        self.patient_ids: List[str] = []
+        self._postings: Dict[str, np.ndarray] = {}
+        self._pending: Dict[str, List[int]] = {}
+        self._vocab: List[str] = []  # sorted
+        self._results: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._position = 0
+        self._epoch = None
+
+    # ---------------------------------------------------
+    # Maintenance
+    # ---------------------------------------------------
+    def refresh(self):
+        """
+        Fold in patients appended since the last call.
+        """
+        with self._lock:
+            changes = data_loader.patients_since(self._position)
+            if changes.epoch != self._epoch or changes.total != len(self.patient_ids) + len(changes.rows):
+                self.rebuild()
+                return
+            if changes.rows:
+                self._add(changes.rows)
+                self._position = changes.position
+
+    def rebuild(self):
+        with self._lock:
+            self._reset()
+            changes = data_loader.patients_since(0)
+            self._epoch = changes.epoch
+            self._position = changes.position
+            self._add(changes.rows)
+            self._merge_all()
+
+    def _add(self, rows: Iterable):
+        pending = self._pending
+        new_terms = []
+        for row in rows:
+            doc = len(self.patient_ids)
+            self.patient_ids.append(row.get("patient_id", ""))
+            terms = set()
+            for field in SEARCH_FIELDS:
+                terms.update(tokenize(row.get(field)))
+            for term in terms:
+                docs = pending.get(term)
+                if docs is None:
+                    docs = pending[term] = []
+                    if term not in self._postings:
+                        new_terms.append(term)
+                docs.append(doc)
+        if len(new_terms) > 64:
+            self._vocab = sorted(self._vocab + new_terms)
+        else:
+            for term in new_terms:
+                bisect.insort(self._vocab, term)
+        for term in new_terms:
+            self._postings[term] = np.zeros(0, dtype=np.int32)
+        self._results.clear()
+
+    def _merge_all(self):
+        for term in list(self._pending):
+            self._docs(term)
+
+    def _docs(self, term: str) -> np.ndarray:
+        extra = self._pending.pop(term, None)
+        docs = self._postings[term]
+        if extra:
+            docs = self._postings[term] = np.concatenate([docs, np.asarray(extra, dtype=np.int32)])
+        return docs
+
+    # ---------------------------------------------------
+    # Queries
+    # ---------------------------------------------------
+    def _terms(self, prefix: str) -> List[str]:
+        lo = bisect.bisect_left(self._vocab, prefix)
+        hi = bisect.bisect_left(self._vocab, prefix + "\U0010ffff")
+        return self._vocab[lo:hi]
+
+    def _match(self, words: List[str]) -> np.ndarray:
+        """
+        Sorted patient numbers matching every word as a prefix.
+        """
+        key = " ".join(words)
+        cached = self._results.get(key)
+        if cached is not None:
+            self._results.move_to_end(key)
+            return cached
+
+        n = len(self.patient_ids)
+        groups = sorted(
+            ([self._docs(t) for t in self._terms(w)] for w in words),
+            key=lambda g: sum(len(a) for a in g),
+        )
+        if not groups:
+            result = np.arange(n, dtype=np.int32)
+        elif not groups[0]:
+            result = np.zeros(0, dtype=np.int32)
+        else:
+            # Candidates from the narrowest word; every other word filters them.
+            result = groups[0][0] if len(groups[0]) == 1 else np.flatnonzero(_mask(groups[0], n)).astype(np.int32)
+            for group in groups[1:]:
+                if not len(result):
+                    break
+                if len(group) == 1:
+                    docs = group[0]
+                    at = np.minimum(np.searchsorted(docs, result), max(len(docs) - 1, 0))
+                    keep = docs[at] == result if len(docs) else np.zeros(len(result), dtype=bool)
+                else:
+                    keep = _mask(group, n)[result]
+                result = result[keep]
+
+        self._results[key] = result
+        while len(self._results) > self._cache_entries:
+            self._results.popitem(last=False)
+        return result
+
+    def search(self, query: str, offset: int = 0, limit: int = 50) -> SearchPage:
+        """
+        Patient IDs (in registration order) whose name, city, state or
+        diseases contain a word starting with every query word.
+        """
+        self.refresh()
+        words = sorted(set(tokenize(query)))
+        with self._lock:
+            docs = self._match(words)
+            page = docs[offset: offset + limit]
+            return SearchPage([self.patient_ids[i] for i in page.tolist()], len(docs))
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[str]:
+        """
+        Vocabulary completions of one word, most frequent first.
+        """
+        self.refresh()
+        word = (tokenize(prefix) or [""])[-1]
+        if not word:
+            return []
+        with self._lock:
+            terms = self._terms(word)
+            counts = [(len(self._postings[t]) + len(self._pending.get(t, ())), t) for t in terms]
+        counts.sort(key=lambda c: (-c[0], c[1]))
+        return [t for _, t in counts[:limit]]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "patients": len(self.patient_ids),
+                "terms": len(self._vocab),
+                "postings": sum(len(p) for p in self._postings.values())
+                + sum(len(p) for p in self._pending.values()),
+                "cached_queries": len(self._results),
+            }
+
+
+def _mask(postings: List[np.ndarray], n: int) -> np.ndarray:
+    """
+    Boolean mask over all patients of the union of several posting lists.
+    """
+    mask = np.zeros(n, dtype=bool)
+    for docs in postings:
+        mask[docs] = True
+    return mask
+
+
+_index: Optional[PatientSearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> PatientSearchIndex:
+    """
+    Shared index; subscribes to data_loader appends on first use.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PatientSearchIndex()
+            data_loader.add_append_listener(_on_append)
+        return _index
+
+
+def _on_append():
+    if _index is not None:
+        _index.refresh()
+
+
+def clear_search_index():
+    global _index
+    with _index_lock:
+        _index = None
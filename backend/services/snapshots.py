@@ -0,0 +1,158 @@
+# backend/services/snapshots.py
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from flask import g, has_request_context
+
+from config import settings
+from backend.services import data_loader, reference_bundle
+from backend.utils import i18n
+from backend.utils.frozen import freeze
+
+
+class Snapshot(NamedTuple):
+    name: str
+    version: str
+    data: Any
+    loaded_at: float
+
+
+def file_version(*paths: Path) -> Callable[[], str]:
+    """
+    Version function based on (inode, size, mtime) of one or more files.
+    """
+
+    def _version():
+        parts = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                parts.append(f"{st.st_ino}-{st.st_size}-{st.st_mtime_ns}")
+            except FileNotFoundError:
+                parts.append("missing")
+        return ":".join(parts)
+
+    return _version
+
+
+class _Dataset:
+    def __init__(self, name, loader, version, min_interval):
+        self.name = name
+        self.loader = loader
+        self.version = version
+        self.min_interval = min_interval
+        self.snapshot: Optional[Snapshot] = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+
+class SnapshotRegistry:
+    """
+    Holds one immutable, versioned snapshot per dataset.
+
+    Readers just grab the current Snapshot reference (no locking). At most
+    once per `min_interval` seconds a reader also re-checks the dataset's
+    version; if it moved, the data is reloaded and the reference swapped in
+    one assignment, so concurrent readers see either the old or the new
+    snapshot, never a mix.
+    """
+
+    def __init__(self):
+        self._datasets: Dict[str, _Dataset] = {}
+
+    def register(self, name: str, loader: Callable[[], Any], version: Callable[[], str], min_interval: float = None):
+        """
+        Add a dataset. min_interval defaults to settings.SNAPSHOT_CHECK_INTERVAL.
+        """
+        self._datasets[name] = _Dataset(name, loader, version, min_interval)
+
+    def get(self, name: str) -> Snapshot:
+        ds = self._datasets[name]
+        interval = settings.SNAPSHOT_CHECK_INTERVAL if ds.min_interval is None else ds.min_interval
+        snap = ds.snapshot
+        if snap is not None and time.monotonic() - ds.checked_at < interval:
+            return snap
+
+        with ds.lock:
+            snap = ds.snapshot
+            if snap is not None and time.monotonic() - ds.checked_at < interval:
+                return snap
+            version = ds.version()
+            if snap is None or version != snap.version:
+                snap = Snapshot(name, version, freeze(ds.loader()), time.time())
+                ds.snapshot = snap
+            ds.checked_at = time.monotonic()
+            return snap
+
+    def versions(self) -> Dict[str, str]:
+        return {name: self.get(name).version for name in self._datasets}
+
+    def invalidate(self, name: Optional[str] = None):
+        """
+        Force the next get() to re-check the version (all datasets if no name).
+        """
+        for ds in ([self._datasets[name]] if name else self._datasets.values()):
+            ds.checked_at = 0.0
+
+    def clear(self):
+        for ds in self._datasets.values():
+            ds.snapshot = None
+            ds.checked_at = 0.0
+
+
+registry = SnapshotRegistry()
+
+# relations, diseases, state_diseases, mock_history_diseases and
+# disease_aliases are views over one memory-mapped reference bundle, so
+# they move together whenever a source file or the bundle file changes.
+def _reference_version() -> str:
+    version = file_version(*reference_bundle.source_paths(), settings.REFERENCE_BUNDLE)
+    reference_bundle.ensure_compiled(version)
+    return version()
+
+
+registry.register("reference", reference_bundle.load_bundle, _reference_version)
+
+
+def _bundle_view(attr: str):
+    return lambda: getattr(registry.get("reference").data, attr)
+
+
+for _name in ("relations", "diseases", "state_diseases", "mock_history_diseases", "disease_aliases"):
+    registry.register(_name, _bundle_view(_name), lambda: registry.get("reference").version)
+
+registry.register(
+    "translations",
+    i18n.load_catalogs,
+    i18n.catalogs_version,
+)
+# The patient store already does its own cheap stat() per access, so the
+# version is re-checked on every read.
+registry.register(
+    "patients",
+    data_loader.load_patients,
+    data_loader.patients_version,
+    min_interval=0,
+)
+
+
+def get_snapshot(name: str) -> Snapshot:
+    """
+    Current snapshot of a dataset. Inside a request the first snapshot taken
+    is pinned on flask.g, so one request always sees one consistent version.
+    """
+    if not has_request_context():
+        return registry.get(name)
+    pinned = g.setdefault("_snapshots", {})
+    snap = pinned.get(name)
+    if snap is None:
+        snap = registry.get(name)
+        pinned[name] = snap
+    return snap
+
+
+def get_data(name: str):
+    return get_snapshot(name).data
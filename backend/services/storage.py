@@ -0,0 +1,563 @@
+# backend/services/storage.py
+import csv
+import io
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from config import settings
+from backend.services.history_log import get_history_log
+from backend.services.patient_store import PATIENT_FIELDS, get_patient_store, row_to_patient
+from backend.utils.frozen import FrozenDict
+from backend.utils.locks import file_lock
+
+
+class PatientChanges(NamedTuple):
+    rows: Sequence  # patients appended after the requested position
+    position: int  # pass back to patients_since() to resume
+    epoch: str  # changes when earlier positions are no longer valid
+    total: int  # patients currently stored
+
+
+def _ensure_seed_file(source_path: Path, writable_path: Path, empty_default: str = "") -> Path:
+    """
+    Ensure a writable runtime copy exists.
+    If not present, copy from bundled read-only source.
+    If source is missing, create empty_default.
+    """
+    writable_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if writable_path.exists():
+        return writable_path
+
+    if source_path.exists():
+        shutil.copyfile(source_path, writable_path)
+        return writable_path
+
+    writable_path.write_text(empty_default, encoding="utf-8")
+    return writable_path
+
+
+def _legacy_patient_history() -> dict:
+    """
+    Read a pre-JSONL patient_history.json (runtime copy first, then bundled).
+    """
+    for path in (settings.WRITABLE_PATIENT_HISTORY_JSON, settings.PATIENT_HISTORY_JSON):
+        if Path(path).exists():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                return {}
+    return {}
+
+
+def _write_atomic(path: Path, text: str):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _matches(patient: dict, state=None, present_disease=None, last_visit_from=None, last_visit_to=None) -> bool:
+    if state and patient.get("state", "").lower() != state.lower():
+        return False
+    if present_disease and patient.get("present_disease", "").lower() != present_disease.lower():
+        return False
+    if last_visit_from and patient.get("last_visit", "") < last_visit_from:
+        return False
+    if last_visit_to and patient.get("last_visit", "") > last_visit_to:
+        return False
+    return True
+
+
+def _where(state=None, present_disease=None) -> Dict[str, str]:
+    """
+    The exact-match filters of _matches, for the patient store's coded scan.
+    """
+    where = {}
+    if state:
+        where["state"] = state
+    if present_disease:
+        where["present_disease"] = present_disease
+    return where
+
+
+class StorageBackend:
+    """
+    Interface every persistence backend implements.
+    Patients are plain dicts keyed by PATIENT_FIELDS; history entries are
+    {"auto_history": [...], "report_history": [...]} dicts.
+    """
+
+    name = ""
+
+    def load_patients(self) -> List[Dict[str, str]]:
+        raise NotImplementedError
+
+    def get_patient(self, patient_id) -> Optional[Dict[str, str]]:
+        raise NotImplementedError
+
+    def find_patients(self, state=None, present_disease=None, last_visit_from=None, last_visit_to=None):
+        raise NotImplementedError
+
+    def allocate_patient_ids(self, count: int = 1) -> range:
+        raise NotImplementedError
+
+    def page_patients(self, start: int = 0, limit: Optional[int] = None, state=None, present_disease=None):
+        """
+        Return (rows, next_start) in stable insertion order.
+        `start` is an opaque backend position taken from a previous next_start.
+        """
+        raise NotImplementedError
+
+    def data_version(self) -> str:
+        """
+        Token that changes whenever any patient row is written.
+        """
+        raise NotImplementedError
+
+    def patients_since(self, position: int = 0) -> PatientChanges:
+        """
+        Patients appended after `position` (0 = all), for consumers that keep
+        derived data up to date incrementally. If the epoch changed, or total
+        is not the number of rows seen so far plus the new ones, rows were
+        rewritten rather than appended and the consumer has to start over.
+        """
+        raise NotImplementedError
+
+    def append_patient(self, patient: dict):
+        raise NotImplementedError
+
+    def append_patients(self, patients: Iterable[dict]):
+        for patient in patients:
+            self.append_patient(patient)
+
+    def load_patient_history(self) -> Dict[str, dict]:
+        raise NotImplementedError
+
+    def get_patient_history(self, patient_id) -> Optional[dict]:
+        raise NotImplementedError
+
+    def append_patient_history(self, patient_id, history: dict):
+        raise NotImplementedError
+
+    def append_patient_histories(self, histories: Dict[str, dict]):
+        for patient_id, history in histories.items():
+            self.append_patient_history(patient_id, history)
+
+    def save_patient_history(self, history: Dict[str, dict]):
+        raise NotImplementedError
+
+
+# -------------------------------------------------------
+# FLAT FILES (CSV + JSONL) UNDER RUNTIME_DIR
+# -------------------------------------------------------
+class FileBackend(StorageBackend):
+    name = "file"
+
+    def patient_store(self):
+        path = _ensure_seed_file(
+            source_path=settings.PATIENTS_CSV,
+            writable_path=settings.WRITABLE_PATIENTS_CSV,
+            empty_default=",".join(PATIENT_FIELDS) + "\n",
+        )
+        return get_patient_store(path)
+
+    def history_log(self):
+        """
+        Shared append-only history log.
+        On first run, any legacy patient_history.json is converted into it.
+        """
+        path = Path(settings.WRITABLE_PATIENT_HISTORY_LOG)
+        log = get_history_log(path)
+        log.ensure(_legacy_patient_history)
+        return log
+
+    def load_patients(self):
+        return self.patient_store().all()
+
+    def get_patient(self, patient_id):
+        return self.patient_store().get(patient_id)
+
+    def find_patients(self, state=None, present_disease=None, last_visit_from=None, last_visit_to=None):
+        predicate = None
+        if last_visit_from or last_visit_to:
+            predicate = lambda p: _matches(p, last_visit_from=last_visit_from, last_visit_to=last_visit_to)  # noqa: E731
+        rows, _ = self.patient_store().page(0, None, predicate, _where(state, present_disease))
+        return rows
+
+    def page_patients(self, start: int = 0, limit: Optional[int] = None, state=None, present_disease=None):
+        return self.patient_store().page(start, limit, where=_where(state, present_disease))
+
+    def data_version(self) -> str:
+        return self.patient_store().version()
+
+    def patients_since(self, position: int = 0) -> PatientChanges:
+        rows, position, generation = self.patient_store().since(position)
+        return PatientChanges(rows, position, f"file:{generation}", position)
+
+    def allocate_patient_ids(self, count: int = 1) -> range:
+        """
+        Reserve `count` consecutive IDs from the persisted counter.
+        The counter never falls behind IDs already present in the CSV, so rows
+        written by other means (imports, manual edits) are never reissued.
+        """
+        seq_path = Path(settings.PATIENT_ID_SEQ)
+        store = self.patient_store()
+        with file_lock(seq_path):
+            try:
+                current = int(seq_path.read_text(encoding="utf-8").strip() or 0)
+            except (FileNotFoundError, ValueError):
+                current = 0
+            start = max(current, store.max_patient_id()) + 1
+            _write_atomic(seq_path, str(start + count - 1))
+        return range(start, start + count)
+
+    def append_patient(self, patient: dict):
+        self.append_patients([patient])
+
+    def append_patients(self, patients: Iterable[dict]):
+        store = self.patient_store()
+        header = store.header()
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for patient in patients:
+            writer.writerow([patient.get(col, "") for col in header])
+        data = buf.getvalue().encode("utf-8")
+
+        # One locked write per batch: concurrent workers can neither
+        # interleave rows nor tear a row in half.
+        with file_lock(store.path):
+            with open(store.path, "a+b") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        data = b"\n" + data
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+        store.refresh()
+
+    def load_patient_history(self):
+        return self.history_log().all()
+
+    def get_patient_history(self, patient_id):
+        return self.history_log().get(patient_id)
+
+    def append_patient_history(self, patient_id, history: dict):
+        self.append_patient_histories({patient_id: history})
+
+    def append_patient_histories(self, histories: Dict[str, dict]):
+        log = self.history_log()
+        log.append_many(histories)
+        log.maybe_compact(
+            interval=settings.HISTORY_COMPACT_INTERVAL,
+            min_garbage=settings.HISTORY_COMPACT_MIN_GARBAGE,
+        )
+
+    def save_patient_history(self, history: Dict[str, dict]):
+        self.history_log().replace_all(history)
+
+
+# -------------------------------------------------------
+# SQLITE (WAL MODE)
+# -------------------------------------------------------
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL DEFAULT '',
+    age TEXT NOT NULL DEFAULT '',
+    gender TEXT NOT NULL DEFAULT '',
+    city TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL DEFAULT '',
+    last_visit TEXT NOT NULL DEFAULT '',
+    present_disease TEXT NOT NULL DEFAULT '',
+    previous_diseases TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_patients_state ON patients (state COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_patients_present_disease ON patients (present_disease COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_patients_last_visit ON patients (last_visit);
+
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS patient_history (
+    patient_id TEXT PRIMARY KEY,
+    history TEXT NOT NULL
+);
+"""
+
+_PATIENT_COLUMNS = ", ".join(PATIENT_FIELDS)
+_PATIENT_PLACEHOLDERS = ", ".join("?" for _ in PATIENT_FIELDS)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    SQLite storage in WAL mode: readers never block the single writer, and
+    several worker processes can share one database file.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._init_schema(conn)
+                    self._initialized = True
+        return conn
+
+    def _init_schema(self, conn: sqlite3.Connection):
+        conn.executescript(_SQLITE_SCHEMA)
+        empty = conn.execute("SELECT 1 FROM patients LIMIT 1").fetchone() is None
+        if empty and Path(settings.PATIENTS_CSV).exists():
+            with open(settings.PATIENTS_CSV, encoding="utf-8") as f:
+                self._insert_patients(conn, (row_to_patient(r) for r in csv.DictReader(f)))
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _insert_patients(conn: sqlite3.Connection, patients: Iterable[dict]):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            max_id = 0
+            rows = []
+            for p in patients:
+                rows.append([p.get(col, "") for col in PATIENT_FIELDS])
+                try:
+                    max_id = max(max_id, int(p.get("patient_id", "")))
+                except ValueError:
+                    pass
+            conn.executemany(
+                f"INSERT OR REPLACE INTO patients ({_PATIENT_COLUMNS}) VALUES ({_PATIENT_PLACEHOLDERS})",
+                rows,
+            )
+            # Keep the ID sequence ahead of explicitly inserted IDs.
+            conn.execute(
+                "INSERT INTO sequences (name, value) VALUES ('patient_id', ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)",
+                (max_id,),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _insert_history(conn: sqlite3.Connection, history: Dict[str, dict], replace_all: bool = False):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if replace_all:
+                conn.execute("DELETE FROM patient_history")
+            conn.executemany(
+                "INSERT OR REPLACE INTO patient_history (patient_id, history) VALUES (?, ?)",
+                ((str(pid), json.dumps(h, ensure_ascii=False)) for pid, h in history.items()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def load_patients(self):
+        rows = self.connect().execute(f"SELECT {_PATIENT_COLUMNS} FROM patients ORDER BY rowid")
+        return [FrozenDict(r) for r in rows]
+
+    def get_patient(self, patient_id):
+        row = self.connect().execute(
+            f"SELECT {_PATIENT_COLUMNS} FROM patients WHERE patient_id = ?",
+            (str(patient_id).strip(),),
+        ).fetchone()
+        return FrozenDict(row) if row else None
+
+    def find_patients(self, state=None, present_disease=None, last_visit_from=None, last_visit_to=None):
+        clauses, params = [], []
+        if state:
+            clauses.append("state = ? COLLATE NOCASE")
+            params.append(state)
+        if present_disease:
+            clauses.append("present_disease = ? COLLATE NOCASE")
+            params.append(present_disease)
+        if last_visit_from:
+            clauses.append("last_visit >= ?")
+            params.append(last_visit_from)
+        if last_visit_to:
+            clauses.append("last_visit <= ?")
+            params.append(last_visit_to)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connect().execute(
+            f"SELECT {_PATIENT_COLUMNS} FROM patients {where} ORDER BY rowid", params
+        )
+        return [FrozenDict(r) for r in rows]
+
+    def page_patients(self, start: int = 0, limit: Optional[int] = None, state=None, present_disease=None):
+        clauses, params = ["rowid > ?"], [start]
+        if state:
+            clauses.append("state = ? COLLATE NOCASE")
+            params.append(state)
+        if present_disease:
+            clauses.append("present_disease = ? COLLATE NOCASE")
+            params.append(present_disease)
+        sql = f"SELECT rowid, {_PATIENT_COLUMNS} FROM patients WHERE {' AND '.join(clauses)} ORDER BY rowid"
+        if limit is not None:
+            # One extra row tells us whether another page exists.
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        rows = self.connect().execute(sql, params).fetchall()
+        next_start = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_start = rows[-1]["rowid"]
+        return [FrozenDict((col, r[col]) for col in PATIENT_FIELDS) for r in rows], next_start
+
+    def data_version(self) -> str:
+        # INSERT OR REPLACE always assigns a fresh rowid, so the max rowid
+        # moves on every write.
+        row = self.connect().execute("SELECT MAX(rowid) FROM patients").fetchone()
+        return str(row[0] or 0)
+
+    def patients_since(self, position: int = 0) -> PatientChanges:
+        conn = self.connect()
+        # One read transaction so the new rows and the total agree.
+        conn.execute("BEGIN")
+        try:
+            rows = conn.execute(
+                f"SELECT rowid, {_PATIENT_COLUMNS} FROM patients WHERE rowid > ? ORDER BY rowid", (position,)
+            ).fetchall()
+            total = conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+        finally:
+            conn.execute("COMMIT")
+        if rows:
+            position = rows[-1]["rowid"]
+        patients = [FrozenDict((col, r[col]) for col in PATIENT_FIELDS) for r in rows]
+        return PatientChanges(patients, position, "sqlite", total)
+
+    def allocate_patient_ids(self, count: int = 1) -> range:
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "INSERT INTO sequences (name, value) VALUES ('patient_id', ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + ? RETURNING value",
+                (count, count),
+            ).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        end = row[0]
+        return range(end - count + 1, end + 1)
+
+    def append_patient(self, patient: dict):
+        self._insert_patients(self.connect(), [patient])
+
+    def append_patients(self, patients: Iterable[dict]):
+        self._insert_patients(self.connect(), patients)
+
+    def load_patient_history(self):
+        rows = self.connect().execute("SELECT patient_id, history FROM patient_history ORDER BY rowid")
+        return {r["patient_id"]: json.loads(r["history"]) for r in rows}
+
+    def get_patient_history(self, patient_id):
+        row = self.connect().execute(
+            "SELECT history FROM patient_history WHERE patient_id = ?", (str(patient_id),)
+        ).fetchone()
+        return json.loads(row["history"]) if row else None
+
+    def append_patient_history(self, patient_id, history: dict):
+        self._insert_history(self.connect(), {str(patient_id): history})
+
+    def append_patient_histories(self, histories: Dict[str, dict]):
+        self._insert_history(self.connect(), {str(pid): h for pid, h in histories.items()})
+
+    def save_patient_history(self, history: Dict[str, dict]):
+        self._insert_history(self.connect(), history, replace_all=True)
+
+
+# -------------------------------------------------------
+# BACKEND SELECTION
+# -------------------------------------------------------
+_backends: Dict[tuple, StorageBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def _create_backend(name: str) -> StorageBackend:
+    if name == "file":
+        return FileBackend()
+    if name == "sqlite":
+        return SQLiteBackend(settings.SQLITE_DB)
+    raise ValueError(f"Unknown storage backend: {name!r} (expected 'file' or 'sqlite')")
+
+
+def get_backend(name: Optional[str] = None) -> StorageBackend:
+    """
+    Return the configured storage backend (settings.STORAGE_BACKEND).
+    """
+    name = (name or settings.STORAGE_BACKEND).lower()
+    key = (name, str(settings.SQLITE_DB) if name == "sqlite" else str(settings.RUNTIME_DIR))
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = _create_backend(name)
+            _backends[key] = backend
+        return backend
+
+
+def clear_backends():
+    with _backends_lock:
+        for backend in _backends.values():
+            if isinstance(backend, SQLiteBackend):
+                backend.close()
+        _backends.clear()
+
+
+def migrate(source: StorageBackend, target: StorageBackend) -> Dict[str, int]:
+    """
+    Copy every patient and history entry from one backend into another.
+    Existing rows in the target with the same patient_id are replaced.
+    """
+    patients = source.load_patients()
+    history = source.load_patient_history()
+
+    if isinstance(target, SQLiteBackend):
+        conn = target.connect()
+        target._insert_patients(conn, patients)
+        target._insert_history(conn, history)
+    else:
+        existing = {p["patient_id"] for p in target.load_patients()}
+        for p in patients:
+            if p["patient_id"] not in existing:
+                target.append_patient(p)
+        merged = target.load_patient_history()
+        merged.update(history)
+        target.save_patient_history(merged)
+
+    return {"patients": len(patients), "history": len(history)}
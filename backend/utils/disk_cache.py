@@ -0,0 +1,89 @@
+# backend/utils/disk_cache.py
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+class DiskCache:
+    """
+    Text values stored one file per key under a directory. File mtimes double
+    as LRU order: a hit touches the entry and writes evict the least recently
+    used entries until the directory fits in max_bytes. Safe to share between
+    worker processes; writes land via rename.
+
+    Each process keeps a running byte total, so a write only scans the
+    directory when the total crosses max_bytes, and every RESCAN_EVERY
+    writes to pick up what other workers wrote.
+    """
+
+    RESCAN_EVERY = 256
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes: Optional[int] = None  # unknown until the first scan
+        self._puts = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return text
+
+    def put(self, key: str, text: str):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        data = text.encode("utf-8")
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._puts += 1
+            if self._bytes is not None and self._puts % self.RESCAN_EVERY:
+                self._bytes += len(data) - replaced
+                if self._bytes <= self.max_bytes:
+                    return
+        self.evict()
+
+    def evict(self):
+        """
+        Scan the directory, drop least recently used entries until it fits
+        and reset the running total to what is left.
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".txt"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+            self._bytes = total
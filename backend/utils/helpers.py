@@ -1,25 +1,9 @@
 # backend/utils/helpers.py
 from typing import List, Dict
 from datetime import datetime, timedelta
-from pathlib import Path
-import json
 import random
 
 
-def get_next_patient_id(patients: List[Dict]) -> int:
-    if not patients:
-        return 1
-    max_id = 0
-    for p in patients:
-        try:
-            pid = int(str(p.get("patient_id", "0")).strip())
-            if pid > max_id:
-                max_id = pid
-        except ValueError:
-            continue
-    return max_id + 1
-
-
 def generate_mock_vitals(patient_id: str) -> Dict:
     pid = int(str(patient_id) or "0")
 
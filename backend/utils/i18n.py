@@ -1,19 +1,57 @@
 # backend/utils/i18n.py
 import json
-from functools import lru_cache
+import os
+from typing import Dict
+
 from config import settings
 
-@lru_cache(maxsize=64)
+
 def load_language(lang: str) -> dict:
+    """
+    One translation file as written, {} if it is missing or unreadable.
+    """
     lang_file = settings.TRANSLATIONS_DIR / f"{lang}.json"
-    if not lang_file.exists():
-        lang_file = settings.TRANSLATIONS_DIR / "en.json"
-
     try:
-        return json.loads(lang_file.read_text(encoding="utf-8"))
-    except:
+        table = json.loads(lang_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
         return {}
+    return table if isinstance(table, dict) else {}
+
+
+def load_catalogs() -> Dict[str, Dict[str, str]]:
+    """
+    Compiled catalogs: every supported language merged over the default
+    language, so a key missing from one file falls back per key rather than
+    per file.
+    """
+    fallback = load_language(settings.DEFAULT_LANGUAGE)
+    return {lang: {**fallback, **load_language(lang)} for lang in settings.SUPPORTED_LANGUAGES}
+
+
+def catalogs_version() -> str:
+    """
+    (name, inode, size, mtime) of every translation file, so adding,
+    removing or editing one moves the version.
+    """
+    parts = []
+    try:
+        entries = sorted(os.scandir(settings.TRANSLATIONS_DIR), key=lambda e: e.name)
+    except FileNotFoundError:
+        return "missing"
+    for entry in entries:
+        if entry.name.endswith(".json"):
+            st = entry.stat()
+            parts.append(f"{entry.name}-{st.st_ino}-{st.st_size}-{st.st_mtime_ns}")
+    return ":".join(parts)
+
+
+def get_catalog(lang: str) -> Dict[str, str]:
+    # Catalogs are a snapshot dataset; imported here to avoid an import cycle.
+    from backend.services.snapshots import get_data
+
+    catalogs = get_data("translations")
+    return catalogs.get(lang) or catalogs.get(settings.DEFAULT_LANGUAGE, {})
+
 
 def translate(key: str, lang: str = "en") -> str:
-    table = load_language(lang)
-    return table.get(key, key)
+    return get_catalog(lang).get(key, key)
@@ -0,0 +1,47 @@
+# backend/utils/lazy.py
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+from typing import Optional
+
+_lock = threading.Lock()
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    The module `name`, executed on first attribute access instead of now,
+    so heavy dependencies stay off the cold-start import path. Raises
+    ModuleNotFoundError straight away if it is not installed.
+    """
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
+
+
+def optional_import(name: str) -> Optional[ModuleType]:
+    """
+    lazy_import for optional dependencies: None when not installed.
+    """
+    try:
+        return lazy_import(name)
+    except ModuleNotFoundError:
+        return None
+
+
+def ensure_loaded(module: ModuleType) -> ModuleType:
+    """
+    Execute a lazily imported module now (any attribute access does).
+    """
+    getattr(module, "__dict__")
+    return module
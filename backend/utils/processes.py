@@ -0,0 +1,40 @@
+# backend/utils/processes.py
+import atexit
+from concurrent.futures import Executor
+from typing import Dict
+
+from config import settings
+
+
+def settings_snapshot() -> Dict:
+    return {name: value for name, value in vars(settings).items() if name.isupper()}
+
+
+def init_worker(values: Dict):
+    """
+    Give a spawned worker the parent's settings, including any changed at
+    runtime after import (a fork would have inherited them).
+    """
+    for name, value in values.items():
+        setattr(settings, name, value)
+
+
+def spawn_pool(max_workers: int) -> Executor:
+    """
+    Process pool whose workers are spawned, not forked: a fork of the
+    threaded web process could copy locks (file locks, snapshot registry,
+    sqlite handles) while another thread holds them. The pool is shut down
+    at interpreter exit.
+    """
+    # multiprocessing is slow to import
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(settings_snapshot(),),
+    )
+    atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+    return pool
@@ -0,0 +1,55 @@
+# backend/utils/slow_log.py
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import settings
+
+_logger = logging.getLogger("neural_health_link.slow_requests")
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+_handler_path: Optional[Path] = None
+_handler_lock = threading.Lock()
+
+
+def _ensure_handler():
+    """
+    (Re)attach the file handler when settings.LOG_FILE changes.
+    """
+    global _handler_path
+    path = Path(settings.LOG_FILE)
+    if path == _handler_path:
+        return
+    with _handler_lock:
+        if path == _handler_path:
+            return
+        for handler in list(_logger.handlers):
+            _logger.removeHandler(handler)
+            handler.close()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = logging.FileHandler(path, encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        _logger.addHandler(handler)
+        _handler_path = path
+
+
+def log_slow_request(method: str, path: str, route: str, status: int, seconds: float,
+                     stages: Dict[str, float]) -> bool:
+    """
+    Write one line with the stage breakdown if the request took at least
+    settings.SLOW_REQUEST_SECONDS. Returns whether it was logged.
+    """
+    threshold = settings.SLOW_REQUEST_SECONDS
+    if threshold < 0 or seconds < threshold:
+        return False
+    parts = [f"{name}={t * 1000:.1f}ms" for name, t in sorted(stages.items(), key=lambda kv: -kv[1])]
+    other = seconds - sum(stages.values())
+    if stages and other > 0:
+        parts.append(f"other={other * 1000:.1f}ms")
+    _ensure_handler()
+    _logger.warning(
+        "slow request %s %s route=%s status=%s total=%.1fms stages: %s",
+        method, path, route, status, seconds * 1000, " ".join(parts) or "-",
+    )
+    return True
@@ -0,0 +1,155 @@
+# backend/utils/startup.py
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from backend.utils.lazy import ensure_loaded
+from config import settings
+
+# -------------------------------------------------------
+# WARM-UP
+# -------------------------------------------------------
+def _warm_modules():
+    from backend.services import pdf_extract, scoring
+
+    ensure_loaded(scoring.np)
+    ensure_loaded(pdf_extract.PyPDF2)
+
+
+def _warm_reference_data():
+    from backend.services.snapshots import registry
+
+    for name in ("relations", "diseases", "state_diseases", "mock_history_diseases", "disease_aliases", "translations"):
+        registry.get(name)
+
+
+def _warm_patients():
+    from backend.services import data_loader
+
+    data_loader.load_patients()
+
+
+def _warm_relation_index():
+    from backend.services.relation_service import get_relation_index
+
+    get_relation_index()
+
+
+def _warm_search_index():
+    from backend.services.search_index import get_search_index
+
+    get_search_index().refresh()
+
+
+def _warm_linkage_index():
+    from backend.services.linkage import get_linkage_index
+
+    get_linkage_index().refresh()
+
+
+# Work deferred off the import path: what a first report view needs, then
+# the indexes the home page search and the first registration would build.
+WARMUP_STEPS: Tuple[Tuple[str, Callable[[], None]], ...] = (
+    ("modules", _warm_modules),
+    ("reference_data", _warm_reference_data),
+    ("patients", _warm_patients),
+    ("relation_index", _warm_relation_index),
+    ("search_index", _warm_search_index),
+    ("linkage_index", _warm_linkage_index),
+)
+
+
+def warm_up(app=None) -> Dict[str, float]:
+    """
+    Run every deferred startup step now; seconds per step. Failures are
+    recorded as -1 rather than raised: a cold request still works, just slower.
+    """
+    timings = {}
+    for name, step in WARMUP_STEPS:
+        t0 = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            timings[name] = -1.0
+            continue
+        timings[name] = round(time.perf_counter() - t0, 4)
+    if app is not None:
+        app.extensions["warmup"] = timings
+    return timings
+
+
+def schedule_warm_up(app, mode: str = None) -> Callable[[], Dict[str, float]]:
+    """
+    Apply settings.WARMUP: "off" (everything loads on first use), "sync"
+    (warm before create_app returns) or "background" (warm in a daemon
+    thread while the first requests are already being served).
+    """
+    mode = (mode or settings.WARMUP).lower()
+    if mode == "sync":
+        warm_up(app)
+    elif mode == "background":
+        threading.Thread(target=warm_up, args=(app,), name="warm-up", daemon=True).start()
+    return lambda: warm_up(app)
+
+
+# -------------------------------------------------------
+# IMPORT-TIME PROFILE
+# -------------------------------------------------------
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTime]:
+    """
+    Rows of `python -X importtime` output, in import order.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        rows.append(ImportTime(stripped, int(parts[0]), int(parts[1]), (len(name) - len(stripped) - 1) // 2))
+    return rows
+
+
+def import_profile(statement: str = "import backend; backend.create_app()") -> List[ImportTime]:
+    """
+    Import times of `statement` in a fresh interpreter.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=settings.BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(proc.stderr)
+
+
+def format_import_report(rows: List[ImportTime], top: int = 20) -> str:
+    """
+    Summary of an import profile: total, the top-level packages by
+    cumulative time and the slowest modules by their own time.
+    """
+    total = sum(r.self_us for r in rows)
+    packages: Dict[str, int] = {}
+    for r in rows:
+        if r.depth == 0:
+            root = r.module.split(".")[0]
+            packages[root] = packages.get(root, 0) + r.cumulative_us
+    lines = [f"{len(rows)} modules imported in {total / 1e3:.1f} ms", "", "cumulative ms  package"]
+    for root, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"{us / 1e3:13.1f}  {root}")
+    lines += ["", "self ms  module"]
+    for r in sorted(rows, key=lambda r: -r.self_us)[:top]:
+        lines.append(f"{r.self_us / 1e3:7.1f}  {r.module}")
+    return "\n".join(lines)
@@ -0,0 +1,72 @@
+# benchmarks/bench_cooccurrence.py
+"""
+Compare the vectorised co-occurrence recount with folding rows in one by one.
+
+    python -m benchmarks.bench_cooccurrence [--rows 100000 1000000]
+"""
+import argparse
+import json
+import random
+import time
+
+from backend.services.cooccurrence import CooccurrenceMatrix
+from backend.services.snapshots import get_data
+
+
+def _rows(n: int, rng: random.Random):
+    states = list(get_data("state_diseases"))
+    pool = list(get_data("mock_history_diseases"))
+    present = ["Fever", "Cough", "Headache", "Chest Pain", "Shortness of Breath"] + pool[:10]
+    for i in range(n):
+        yield {
+            "patient_id": str(i + 1),
+            "state": rng.choice(states),
+            "present_disease": rng.choice(present),
+            "previous_diseases": "|".join(rng.sample(pool, rng.randint(0, 5))),
+        }
+
+
+def run(sizes):
+    results = []
+    for n in sizes:
+        incremental, vectorised = CooccurrenceMatrix(), CooccurrenceMatrix()
+
+        t0 = time.perf_counter()
+        encoded = incremental.encode(_rows(n, random.Random(11)))
+        encode_s = time.perf_counter() - t0
+        # Same rows in the same order intern to the same IDs.
+        assert vectorised.encode(_rows(n, random.Random(11))) == encoded
+
+        t0 = time.perf_counter()
+        incremental.fold(encoded)
+        fold_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        vectorised.count(encoded)
+        count_s = time.perf_counter() - t0
+
+        results.append(
+            {
+                "rows": n,
+                "encode_s": round(encode_s, 3),
+                "fold_s": round(fold_s, 3),
+                "vectorised_s": round(count_s, 3),
+                "speedup": round(fold_s / count_s, 2) if count_s else None,
+                "identical": incremental.pairs == vectorised.pairs
+                and incremental.present_counts == vectorised.present_counts
+                and incremental.previous_counts == vectorised.previous_counts,
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    for row in run(args.rows):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_matcher.py
+"""
+Compare the compiled DiseaseMatcher with the old per-disease substring loop.
+
+    python -m benchmarks.bench_matcher [--vocab 50 1000 5000] [--pages 20]
+"""
+import argparse
+import json
+import random
+import time
+
+from config import settings
+from backend.services.disease_matcher import DiseaseMatcher
+
+_FILLER = (
+    "patient presented with complaints and was examined on admission vitals stable "
+    "history reviewed medication continued follow up advised in two weeks "
+).split()
+
+
+def _vocabulary(size: int):
+    with open(settings.MOCK_HISTORY_DISEASES_JSON, encoding="utf-8") as f:
+        base = json.load(f)["diseases"]
+    vocab = list(base)
+    i = 0
+    while len(vocab) < size:
+        vocab.append(f"{base[i % len(base)]} Variant {i}")
+        i += 1
+    return vocab[:size]
+
+
+def _report_text(vocab, pages: int, rng: random.Random) -> str:
+    words = []
+    for _ in range(pages * 400):
+        words.append(rng.choice(vocab) if rng.random() < 0.02 else rng.choice(_FILLER))
+    return " ".join(words)
+
+
+def naive_match(vocab, text):
+    lower_text = text.lower()
+    return [d for d in vocab if d.lower() in lower_text]
+
+
+def _time(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(vocab_sizes, pages):
+    rng = random.Random(42)
+    results = []
+    for size in vocab_sizes:
+        vocab = _vocabulary(size)
+        text = _report_text(vocab, pages, rng)
+
+        t0 = time.perf_counter()
+        matcher = DiseaseMatcher(vocab)
+        build = time.perf_counter() - t0
+
+        naive = _time(lambda: naive_match(vocab, text))
+        compiled = _time(lambda: matcher.find(text))
+        results.append(
+            {
+                "vocabulary": size,
+                "text_chars": len(text),
+                "build_s": round(build, 4),
+                "naive_s": round(naive, 4),
+                "matcher_s": round(compiled, 4),
+                "speedup": round(naive / compiled, 2) if compiled else None,
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vocab", type=int, nargs="+", default=[50, 1000, 5000])
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+    for row in run(args.vocab, args.pages):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_patients.py
+"""
+Memory and access cost of the in-memory patient rows: one FrozenDict per
+patient with a dict index by ID (the pre-columnar layout) against the
+columnar PatientTable the store now keeps. Each layout loads the same
+synthetic census in a fresh process and reports its private memory growth
+from /proc/self/smaps_rollup.
+
+    python -m benchmarks.bench_patients [--patients 1m] [--lookups 100000]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.synthetic import SCALES, generate
+from config import settings
+
+# One layout: parse the CSV, look up random IDs, walk every row once.
+_WORKER = r"""
+import csv, gc, json, random, sys, time
+from pathlib import Path
+
+def private_kb():
+    try:
+        lines = Path("/proc/self/smaps_rollup").read_text().splitlines()
+    except OSError:
+        return 0
+    out = 0
+    for line in lines[1:]:
+        key, value = line.split(":", 1)
+        if key in ("Private_Clean", "Private_Dirty"):
+            out += int(value.split()[0])
+    return out
+
+mode, csv_path, lookups = sys.argv[1], sys.argv[2], int(sys.argv[3])
+from backend.services.patient_store import PatientStore, row_to_patient
+
+gc.collect()
+before = private_kb()
+t0 = time.perf_counter()
+if mode == "dicts":
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        rows = [row_to_patient(r) for r in csv.DictReader(f)]
+    index = {p["patient_id"]: p for p in rows}
+    get = index.get
+    nbytes = None
+else:
+    store = PatientStore(Path(csv_path))
+    rows = store.all()
+    nbytes = store.memory()["bytes"]
+    table = store._table
+
+    # store.get minus its per-call stat(), which both layouts pay alike
+    def get(pid):
+        pos = table.find(pid)
+        return None if pos is None else table.row(pos)
+load_s = time.perf_counter() - t0
+gc.collect()
+grown_kb = private_kb() - before
+
+ids = [rows[i]["patient_id"] for i in random.Random(7).choices(range(len(rows)), k=lookups)]
+t0 = time.perf_counter()
+found = sum(get(pid) is not None for pid in ids)
+get_us = (time.perf_counter() - t0) / lookups * 1e6
+
+t0 = time.perf_counter()
+states = len({p["state"] for p in rows})
+scan_s = time.perf_counter() - t0
+
+print(json.dumps({
+    "rows": len(rows),
+    "load_s": round(load_s, 3),
+    "private_kb": grown_kb,
+    "bytes_per_patient": round(grown_kb * 1024 / len(rows), 1),
+    "column_bytes": nbytes,
+    "get_us": round(get_us, 3),
+    "scan_s": round(scan_s, 3),
+    "found": found,
+    "states": states,
+}))
+"""
+
+
+def _measure(mode: str, csv_path: Path, lookups: int):
+    out = subprocess.run(
+        [sys.executable, "-c", _WORKER, mode, str(csv_path), str(lookups)],
+        cwd=settings.BASE_DIR, check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout)
+
+
+def run(patients: int, lookups: int, seed: int = 7, csv_path: Path = None):
+    with tempfile.TemporaryDirectory(prefix="nhl-patients-") as tmp:
+        if csv_path is None:
+            csv_path = generate(Path(tmp), patients, seed)["patients"]
+        dicts = _measure("dicts", csv_path, lookups)
+        table = _measure("table", csv_path, lookups)
+        return {
+            "patients": table["rows"],
+            "csv_bytes": Path(csv_path).stat().st_size,
+            "dicts": dicts,
+            "table": table,
+            "memory_ratio": round(dicts["private_kb"] / max(table["private_kb"], 1), 2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", default="1m", help=f"Row count or one of {', '.join(SCALES)}.")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--csv", type=Path, help="Measure an existing patients CSV instead of a generated one.")
+    args = parser.parse_args()
+    n = SCALES.get(args.patients.lower()) or int(args.patients)
+    print(json.dumps(run(n, args.lookups, csv_path=args.csv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/bench_reference.py
+"""
+Per-worker memory of the reference data: every worker parsing relations.json
+into its own dicts (the pre-bundle layout) against every worker mapping the
+compiled bundle. Workers load concurrently and report private memory and
+proportional set size (PSS) from /proc/self/smaps_rollup, so memory shared
+through the page cache is split between them.
+
+    python -m benchmarks.bench_reference [--diseases 20000] [--edges 50] [--workers 4]
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from config import settings
+
+# One worker: load the data, look up `lookups` relations, wait until every
+# worker is loaded, then report its own memory growth.
+_WORKER = r"""
+import json, sys, time
+from pathlib import Path
+
+def rollup():
+    try:
+        lines = Path("/proc/self/smaps_rollup").read_text().splitlines()
+    except OSError:
+        return {}
+    out = {}
+    for line in lines[1:]:
+        key, value = line.split(":", 1)
+        out[key] = int(value.split()[0])
+    return out
+
+mode, relations_path, bundle_path, pairs_path = sys.argv[1:5]
+from config import settings
+settings.RELATIONS_JSON = Path(relations_path)
+settings.REFERENCE_BUNDLE = Path(bundle_path)
+from backend.services import data_loader, reference_bundle
+from backend.utils.frozen import freeze
+pairs = json.loads(Path(pairs_path).read_text())
+
+before = rollup()
+t0 = time.perf_counter()
+if mode == "files":
+    relations = freeze(data_loader.load_relations())
+    lookup = lambda p, q: relations.get(p, {}).get(q)
+else:
+    bundle = reference_bundle.open_bundle(Path(bundle_path))
+    lookup = bundle.relation
+load_s = time.perf_counter() - t0
+t0 = time.perf_counter()
+found = sum(lookup(p, q) is not None for p, q in pairs)
+lookup_us = (time.perf_counter() - t0) / len(pairs) * 1e6
+
+print("ready", flush=True)
+sys.stdin.readline()
+after = rollup()
+grow = lambda k: after.get(k, 0) - before.get(k, 0)
+print(json.dumps({
+    "load_s": load_s,
+    "lookup_us": lookup_us,
+    "found": found,
+    "private_kb": grow("Private_Clean") + grow("Private_Dirty"),
+    "pss_kb": grow("Pss"),
+}), flush=True)
+"""
+
+
+def _relations(diseases: int, edges: int, rng: random.Random):
+    names = [f"Synthetic Disease {i:05d}" for i in range(diseases)]
+    relations = {}
+    for i, present in enumerate(names):
+        relations[present] = {
+            previous: {
+                "probability": round(rng.random(), 2),
+                "report": f"Mock linkage between {present} and {previous} observed in cohort {i % 97}.",
+            }
+            for previous in rng.sample(names, edges)
+        }
+    return relations
+
+
+def _workers(mode: str, count: int, relations_path: Path, bundle_path: Path, pairs_path: Path):
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", _WORKER, mode, str(relations_path), str(bundle_path), str(pairs_path)],
+            cwd=settings.BASE_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(count)
+    ]
+    for proc in procs:
+        assert proc.stdout.readline().strip() == "ready"
+    results = []
+    for proc in procs:
+        proc.stdin.write("go\n")
+        proc.stdin.flush()
+        results.append(json.loads(proc.stdout.readline()))
+        proc.wait()
+    return {
+        "load_s": round(min(r["load_s"] for r in results), 4),
+        "lookup_us": round(min(r["lookup_us"] for r in results), 3),
+        "found": results[0]["found"],
+        "private_kb_per_worker": round(sum(r["private_kb"] for r in results) / count),
+        "pss_kb_total": sum(r["pss_kb"] for r in results),
+    }
+
+
+def run(diseases: int, edges: int, workers: int, lookups: int, seed: int = 7):
+    from backend.services import reference_bundle
+
+    rng = random.Random(seed)
+    relations = _relations(diseases, edges, rng)
+    pairs = [(p, rng.choice(list(relations[p]))) for p in rng.choices(list(relations), k=lookups)]
+
+    with tempfile.TemporaryDirectory(prefix="nhl-reference-") as tmp:
+        tmp = Path(tmp)
+        relations_path = tmp / "relations.json"
+        relations_path.write_text(json.dumps(relations), encoding="utf-8")
+        (tmp / "pairs.json").write_text(json.dumps(pairs), encoding="utf-8")
+        del relations
+
+        settings.RELATIONS_JSON = relations_path
+        t0 = time.perf_counter()
+        data = reference_bundle.build_bundle()
+        compile_s = time.perf_counter() - t0
+        reference_bundle.write_bundle(tmp / "reference.bundle", data)
+
+        return {
+            "diseases": diseases,
+            "relations": diseases * edges,
+            "workers": workers,
+            "json_bytes": relations_path.stat().st_size,
+            "bundle_bytes": len(data),
+            "compile_s": round(compile_s, 3),
+            "files": _workers("files", workers, relations_path, tmp / "reference.bundle", tmp / "pairs.json"),
+            "bundle": _workers("bundle", workers, relations_path, tmp / "reference.bundle", tmp / "pairs.json"),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--diseases", type=int, default=20_000)
+    parser.add_argument("--edges", type=int, default=50, help="Relations per present disease.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.diseases, args.edges, args.workers, args.lookups)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_scores.py
+"""
+Time the batched score_patients against the per-patient report path.
+
+    python -m benchmarks.bench_scores [--patients 100000] [--check 2000]
+"""
+import argparse
+import json
+import random
+import time
+
+from backend.services.scoring import score_patient, score_patients
+from backend.services.snapshots import get_data
+from backend.utils.helpers import generate_auto_history
+
+
+def _census(n: int, rng: random.Random):
+    states = list(get_data("state_diseases"))
+    pool = list(get_data("mock_history_diseases"))
+    present = ["Fever", "Cough", "Headache", "Chest Pain", "Shortness of Breath"] + pool[:10]
+
+    patients, histories = [], {}
+    for i in range(n):
+        pid = str(1001 + i)
+        disease = rng.choice(present)
+        last_visit = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        auto = generate_auto_history(pid, disease, last_visit, pool, count=5)
+        patients.append(
+            {
+                "patient_id": pid,
+                "name": f"Patient {pid}",
+                "age": str(rng.randint(1, 90)),
+                "gender": rng.choice(["Male", "Female"]),
+                "city": "",
+                "state": rng.choice(states),
+                "last_visit": last_visit,
+                "present_disease": disease,
+                "previous_diseases": "|".join(h["disease"] for h in auto),
+            }
+        )
+        histories[pid] = {"auto_history": auto, "report_history": []}
+    return patients, histories
+
+
+def run(n: int, check: int):
+    rng = random.Random(7)
+    patients, histories = _census(n, rng)
+
+    t0 = time.perf_counter()
+    batch = score_patients(patients, histories, pause_gc=True)["scores"]
+    batch_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    single = [score_patient(p, histories[p["patient_id"]]) for p in patients]
+    single_s = time.perf_counter() - t0
+
+    sample = rng.sample(range(n), min(check, n))
+    identical = all(batch[i] == single[i] for i in sample)
+    return {
+        "patients": n,
+        "per_patient_s": round(single_s, 3),
+        "batch_s": round(batch_s, 3),
+        "speedup": round(single_s / batch_s, 2) if batch_s else None,
+        "checked": len(sample),
+        "identical": identical,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patients", type=int, default=100_000)
+    parser.add_argument("--check", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.patients, args.check)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# benchmarks/startup.py
+"""
+Cold-start benchmarks: time to first response of a fresh interpreter, split
+into interpreter start, `import backend`, create_app() and each first
+request, for the bundled data and optionally synthetic censuses.
+
+Every sample is a new process with its own empty runtime directory, as on a
+serverless cold start. Results are written as JSON and gated against a
+baseline exactly like benchmarks.suite.
+
+    python -m benchmarks.startup [--scales bundled 10k] [--repeat 5] [--warmup off]
+        [--paths / /register /patient/1001] [--baseline PATH] [--update-baseline]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmarks.suite import compare
+from benchmarks.synthetic import SCALES, FIRST_ID, generate, settings_for
+from config import settings
+
+DEFAULT_BASELINE = Path(__file__).with_name("startup_baseline.json")
+RESULTS_DIR = Path(__file__).with_name("results")
+DEFAULT_PATHS = ("/", "/register", f"/patient/{FIRST_ID}", "/api/patients?limit=20")
+
+# Runs in the child interpreter; reports wall-clock stamps so the parent can
+# include interpreter start-up in time to first response.
+_CHILD = r"""
+import json, os, sys, time
+from pathlib import Path
+started = time.time()
+t0 = time.perf_counter()
+from config import settings
+for key, value in json.loads(os.environ.get("NHL_BENCH_SETTINGS", "{}")).items():
+    setattr(settings, key, type(getattr(settings, key))(value))
+t1 = time.perf_counter()
+from backend import create_app
+t2 = time.perf_counter()
+app = create_app()
+t3 = time.perf_counter()
+client = app.test_client()
+out = {"started": started, "import_s": t2 - t1, "create_app_s": t3 - t2, "responses": []}
+for path in json.loads(os.environ["NHL_BENCH_PATHS"]):
+    ts = time.perf_counter()
+    status = client.get(path).status_code
+    out["responses"].append({"path": path, "status": status, "seconds": time.perf_counter() - ts, "at": time.time()})
+print(json.dumps(out))
+"""
+
+
+def _slug(path: str) -> str:
+    slug = "".join(c if c.isalnum() else "_" for c in path.split("?")[0].strip("/"))
+    return slug or "home"
+
+
+def cold_start(paths: List[str], runtime_dir: Path, overrides: Optional[Dict] = None, warmup: str = "off") -> Dict:
+    """
+    One fresh process: seconds for each start-up phase and first request.
+    """
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(settings.BASE_DIR),
+        RUNTIME_DIR=str(runtime_dir),
+        WARMUP=warmup,
+        NHL_BENCH_PATHS=json.dumps(list(paths)),
+        NHL_BENCH_SETTINGS=json.dumps({k: str(v) for k, v in (overrides or {}).items()}),
+    )
+    spawned = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"cold start failed:\n{proc.stderr}")
+    out = json.loads(proc.stdout.strip().splitlines()[-1])
+    for r in out["responses"]:
+        if r["status"] >= 400:
+            raise RuntimeError(f"GET {r['path']} -> {r['status']}")
+
+    metrics = {
+        "interpreter_s": out["started"] - spawned,
+        "import_s": out["import_s"],
+        "create_app_s": out["create_app_s"],
+        "time_to_first_response_s": out["responses"][0]["at"] - spawned,
+    }
+    for r in out["responses"]:
+        metrics[f"first_{_slug(r['path'])}_s"] = r["seconds"]
+    return metrics
+
+
+def bench_startup(
+    paths: List[str], repeat: int = 5, overrides: Optional[Dict] = None, warmup: str = "off"
+) -> Dict[str, float]:
+    """
+    Best of `repeat` cold starts per metric.
+    """
+    best: Dict[str, float] = {}
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix="nhl-startup-") as tmp:
+            for metric, value in cold_start(paths, Path(tmp), overrides, warmup).items():
+                best[metric] = min(value, best.get(metric, value))
+    return {metric: round(value, 4) for metric, value in best.items()}
+
+
+# Paths settings_for() points under its runtime dir; the child derives them
+# from RUNTIME_DIR instead.
+_RUNTIME_KEYS = (
+    "RUNTIME_DIR", "WRITABLE_PATIENT_HISTORY_JSON", "PATIENT_ID_SEQ", "SQLITE_DB", "JOBS_DB",
+    "OCR_CACHE_DIR", "REPORT_CACHE_DIR", "UPLOAD_DIR", "REFERENCE_BUNDLE",
+)
+
+
+def run(scales: List[str], paths: List[str], repeat: int = 5, warmup: str = "off", seed: int = 7) -> Dict:
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "warmup": warmup,
+        "paths": list(paths),
+        "scales": {},
+    }
+    for scale in scales:
+        if scale == "bundled":
+            metrics = bench_startup(paths, repeat, warmup=warmup)
+        else:
+            n = SCALES.get(scale.lower()) or int(scale)
+            with tempfile.TemporaryDirectory(prefix=f"nhl-startup-{scale}-") as tmp:
+                census = generate(Path(tmp) / "data", n, seed)
+                # Every run starts from the generated files, with its own runtime dir.
+                overrides = {k: v for k, v in settings_for(census, Path(tmp)).items() if k not in _RUNTIME_KEYS}
+                metrics = bench_startup(paths, repeat, overrides, warmup)
+        results["scales"][scale] = metrics
+        print(json.dumps({"scale": scale, **metrics}), flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", default=["bundled"], help=f"bundled, row counts or {', '.join(SCALES)}.")
+    parser.add_argument("--paths", nargs="+", default=list(DEFAULT_PATHS), help="Requests made after start-up, in order.")
+    parser.add_argument("--repeat", type=int, default=5, help="Cold starts per scale; the best of each metric is kept.")
+    parser.add_argument("--warmup", choices=("off", "sync", "background"), default="off")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Allowed slowdown (1.0 = 2x slower).")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.paths, args.repeat, args.warmup, args.seed)
+    output = args.output or RESULTS_DIR / f"startup-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"results: {output}", file=sys.stderr)
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"baseline updated: {args.baseline}", file=sys.stderr)
+        return
+    if args.baseline.exists():
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+# benchmarks/suite.py
+"""
+Scaling benchmarks over synthetic censuses: load_patients, /register,
+/patient/<id>, /api/patients and relation lookups.
+
+Results are written as JSON. With a baseline (by default
+benchmarks/baseline.json, if present) the run exits non-zero when any
+metric is slower than baseline * (1 + tolerance). Baselines are only
+comparable on the machine that recorded them; refresh with --update-baseline.
+
+    python -m benchmarks.suite [--scales 10k 100k 1m] [--repeat 3] [--output results.json]
+        [--baseline PATH] [--tolerance 1.0] [--tails] [--update-baseline]
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from backend.services import reset_runtime_caches
+from benchmarks.synthetic import SCALES, FIRST_ID, generate, settings_for
+from config import settings
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+RESULTS_DIR = Path(__file__).with_name("results")
+
+# Regressions smaller than this are treated as timer noise.
+MIN_DELTA_SECONDS = 0.002
+_UNITS = {"_s": 1.0, "_ms": 1e-3, "_us": 1e-6}
+
+
+@contextmanager
+def census(n: int, workdir: Path, seed: int = 7):
+    """
+    Generate a census of n patients and point settings at it for the
+    duration of the block.
+    """
+    paths = generate(workdir / "data", n, seed)
+    overrides = settings_for(paths, workdir / "runtime")
+    saved = {k: getattr(settings, k) for k in overrides}
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+    settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    reset_runtime_caches()
+    try:
+        yield paths
+    finally:
+        reset_runtime_caches()
+        for key, value in saved.items():
+            setattr(settings, key, value)
+
+
+def _percentiles(samples: List[float], name: str) -> Dict[str, float]:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        f"{name}_p50_ms": round(statistics.median(ordered) * 1e3, 3),
+        f"{name}_p95_ms": round(p95 * 1e3, 3),
+    }
+
+
+def _timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def _best(fn, setup=None, repeat: int = 3) -> float:
+    """
+    Fastest of `repeat` runs, for one-shot timings that a single sample
+    would make too noisy to compare against a baseline.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        times.append(_timed(fn))
+    return min(times)
+
+
+def _get(client, url: str):
+    resp = client.get(url)
+    if resp.status_code != 200:
+        raise RuntimeError(f"GET {url} -> {resp.status_code}")
+    return resp
+
+
+def bench_scale(n: int, workdir: Path, samples: int = 50, seed: int = 7, repeat: int = 3) -> Dict[str, float]:
+    """
+    Every metric for one census size: the best of `repeat` passes, so a
+    burst of contention on a shared machine does not read as a regression.
+    """
+    best: Dict[str, float] = {}
+    with census(n, workdir, seed):
+        for i in range(repeat):
+            reset_runtime_caches()
+            for metric, value in _measure(n, samples, random.Random(seed + i)).items():
+                best[metric] = min(value, best.get(metric, value))
+    return best
+
+
+def _measure(n: int, samples: int, rng: random.Random) -> Dict[str, float]:
+    from backend import create_app
+    from backend.services import data_loader, patient_store
+    from backend.services import reference_bundle
+    from backend.services.relation_service import get_relation_index
+    from backend.services.snapshots import get_data
+
+    metrics: Dict[str, float] = {}
+    # load_patients: cold parses the CSV, warm serves the shared store.
+    metrics["load_patients_cold_s"] = round(_best(data_loader.load_patients, patient_store.clear_patient_stores), 4)
+    metrics["load_patients_warm_s"] = round(_best(data_loader.load_patients), 4)
+    patient_store.clear_patient_stores()
+
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+    ids = [FIRST_ID + rng.randrange(n) for _ in range(samples)]
+
+    metrics.update(_percentiles([_timed(lambda: _get(client, f"/patient/{pid}")) for pid in ids], "patient_view_cold"))
+    metrics.update(_percentiles([_timed(lambda: _get(client, f"/patient/{pid}")) for pid in ids], "patient_view_warm"))
+
+    pool = list(get_data("mock_history_diseases"))
+    states = list(get_data("state_diseases"))
+
+    def register():
+        resp = client.post("/register", data={
+            "name": "Bench Patient",
+            "age": str(rng.randint(1, 90)),
+            "gender": "Female",
+            "city": "Pune",
+            "state": rng.choice(states),
+            "present_disease": rng.choice(pool),
+            "last_visit": "2025-06-01",
+        })
+        if resp.status_code != 302:
+            raise RuntimeError(f"POST /register -> {resp.status_code}")
+
+    metrics.update(_percentiles([_timed(register) for _ in range(samples)], "register_patient"))
+
+    first_pages, walk = [], []
+    for _ in range(samples):
+        first_pages.append(_timed(lambda: _get(client, "/api/patients?limit=100")))
+    cursor = None
+    for _ in range(samples):
+        url = "/api/patients?limit=100" + (f"&cursor={cursor}" if cursor else "")
+        t0 = time.perf_counter()
+        body = _get(client, url).get_json()
+        walk.append(time.perf_counter() - t0)
+        cursor = body.get("next_cursor")
+    metrics.update(_percentiles(first_pages, "api_patients_first_page"))
+    metrics.update(_percentiles(walk, "api_patients_cursor_walk"))
+    state = rng.choice(states)
+    metrics.update(_percentiles(
+        [_timed(lambda: _get(client, f"/api/patients?limit=100&state={state}")) for _ in range(samples)],
+        "api_patients_by_state",
+    ))
+
+    relations = get_data("relations")
+    pairs = [(p, q) for p, prev in relations.items() for q in prev]
+    metrics["reference_compile_s"] = round(_best(reference_bundle.build_bundle), 4)
+    index = get_relation_index()
+    lookups = [rng.choice(pairs) for _ in range(20_000)]
+    lookups += [(p.upper(), q.lower()) for p, q in lookups[:5_000]]
+    elapsed = _timed(lambda: [index.relation(p, q) for p, q in lookups])
+    metrics["relation_lookup_us"] = round(elapsed / len(lookups) * 1e6, 3)
+    metrics.update(_percentiles(
+        [_timed(lambda: _get(client, "/api/relations/{}/{}".format(*rng.choice(pairs)))) for _ in range(samples)],
+        "api_relation",
+    ))
+    return metrics
+
+
+def _seconds(metric: str, value: float) -> float:
+    for suffix, scale in _UNITS.items():
+        if metric.endswith(suffix):
+            return value * scale
+    return value
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float, tails: bool = False) -> List[str]:
+    """
+    Metrics slower than baseline * (1 + tolerance), for scales and metrics
+    present in both runs. p95 latencies are recorded but only gated with
+    tails=True; with 50 samples they are mostly scheduler noise.
+    """
+    regressions = []
+    for scale, base_metrics in baseline.get("scales", {}).items():
+        current = results.get("scales", {}).get(scale)
+        if current is None:
+            continue
+        for metric, base in base_metrics.items():
+            value = current.get(metric)
+            if value is None or (metric.endswith("_p95_ms") and not tails):
+                continue
+            delta = _seconds(metric, value) - _seconds(metric, base)
+            if value > base * (1 + tolerance) and delta > MIN_DELTA_SECONDS:
+                slower = f" (+{value / base - 1:.0%})" if base else ""
+                regressions.append(f"{scale}: {metric} {value} vs baseline {base}{slower}")
+    return regressions
+
+
+def run(scales: List[str], samples: int, seed: int = 7, repeat: int = 3) -> Dict:
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "samples": samples,
+        "repeat": repeat,
+        "scales": {},
+    }
+    for scale in scales:
+        n = SCALES.get(scale.lower()) or int(scale)
+        with tempfile.TemporaryDirectory(prefix=f"nhl-bench-{scale}-") as tmp:
+            t0 = time.perf_counter()
+            metrics = bench_scale(n, Path(tmp), samples, seed, repeat)
+            metrics["total_s"] = round(time.perf_counter() - t0, 2)
+        results["scales"][scale] = metrics
+        print(json.dumps({"scale": scale, **metrics}), flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", default=["10k", "100k"], help=f"Row counts or {', '.join(SCALES)}.")
+    parser.add_argument("--samples", type=int, default=50, help="Requests timed per endpoint.")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes per scale; the best of each metric is kept.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Allowed slowdown (1.0 = 2x slower).")
+    parser.add_argument("--tails", action="store_true", help="Also gate p95 latencies.")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.samples, args.seed, args.repeat)
+    output = args.output or RESULTS_DIR / f"suite-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"results: {output}", file=sys.stderr)
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"baseline updated: {args.baseline}", file=sys.stderr)
+        return
+    if args.baseline.exists():
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance, args.tails)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
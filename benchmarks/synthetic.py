@@ -0,0 +1,178 @@
+# benchmarks/synthetic.py
+"""
+Generate a synthetic census: patients, their history log, relations and
+state disease maps, drawn from the bundled disease pools.
+
+    python -m benchmarks.synthetic --patients 100000 --out /tmp/census-100k
+"""
+import argparse
+import csv
+import json
+import random
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict
+
+from backend.services.patient_store import PATIENT_FIELDS
+from backend.services.snapshots import get_data
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+FIRST_ID = 1001
+
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Amit", "Ananya", "Arjun", "Deepa", "Farhan", "Gita", "Ishaan", "Kavita",
+    "Kiran", "Meera", "Neha", "Nikhil", "Pooja", "Priya", "Rahul", "Ravi", "Rohan", "Sana",
+    "Sneha", "Suresh", "Tanvi", "Vikram",
+]
+LAST_NAMES = [
+    "Bose", "Das", "Gupta", "Iyer", "Jain", "Khan", "Kumar", "Menon", "Mishra", "Nair",
+    "Patel", "Rao", "Reddy", "Sharma", "Singh", "Verma",
+]
+CAPITALS = {
+    "Andhra Pradesh": "Amaravati", "Arunachal Pradesh": "Itanagar", "Assam": "Guwahati",
+    "Bihar": "Patna", "Chhattisgarh": "Raipur", "Goa": "Panaji", "Gujarat": "Ahmedabad",
+    "Haryana": "Gurugram", "Himachal Pradesh": "Shimla", "Jharkhand": "Ranchi",
+    "Karnataka": "Bengaluru", "Kerala": "Kochi", "Madhya Pradesh": "Bhopal",
+    "Maharashtra": "Mumbai", "Manipur": "Imphal", "Meghalaya": "Shillong", "Mizoram": "Aizawl",
+    "Nagaland": "Kohima", "Odisha": "Bhubaneswar", "Punjab": "Ludhiana", "Rajasthan": "Jaipur",
+    "Sikkim": "Gangtok", "Tamil Nadu": "Chennai", "Telangana": "Hyderabad", "Tripura": "Agartala",
+    "Uttar Pradesh": "Lucknow", "Uttarakhand": "Dehradun", "West Bengal": "Kolkata",
+    "Delhi": "Delhi", "Puducherry": "Puducherry", "Jammu and Kashmir": "Srinagar", "Ladakh": "Leh",
+}
+
+
+def _relations(rng: random.Random, present, pool, per_disease: int) -> Dict:
+    """
+    The bundled relations plus `per_disease` synthetic pairs for every
+    present disease; bundled pairs win.
+    """
+    relations = {p: dict(v) for p, v in get_data("relations").items()}
+    for present_disease in present:
+        pairs = relations.setdefault(present_disease, {})
+        for prev in rng.sample(pool, min(per_disease, len(pool))):
+            if prev != present_disease and prev not in pairs:
+                pairs[prev] = {
+                    "probability": round(rng.uniform(0.05, 0.9), 2),
+                    "report": f"Synthetic linkage between {prev} and {present_disease}.",
+                }
+    return relations
+
+
+def _state_map(rng: random.Random, pool) -> Dict:
+    out = {}
+    for state, diseases in get_data("state_diseases").items():
+        extra = [d for d in rng.sample(pool, 5) if d not in diseases]
+        out[state] = list(diseases) + extra[:3]
+    return out
+
+
+def generate(out_dir: Path, patients: int, seed: int = 7, relations_per_disease: int = 20) -> Dict[str, Path]:
+    """
+    Write a census of `patients` rows into out_dir and return the file paths:
+    patients.csv, patient_history.jsonl (the runtime log format),
+    relations.json, state_diseases.json and mock_history_diseases.json.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    pool = list(get_data("mock_history_diseases"))
+    present_pool = list(dict.fromkeys(list(get_data("relations")) + pool))
+    states = list(get_data("state_diseases"))
+
+    paths = {
+        "patients": out_dir / "patients.csv",
+        "history": out_dir / "patient_history.jsonl",
+        "relations": out_dir / "relations.json",
+        "state_diseases": out_dir / "state_diseases.json",
+        "mock_history_diseases": out_dir / "mock_history_diseases.json",
+    }
+    paths["relations"].write_text(
+        json.dumps(_relations(rng, present_pool, pool, relations_per_disease), ensure_ascii=False), encoding="utf-8"
+    )
+    paths["state_diseases"].write_text(json.dumps(_state_map(rng, pool), ensure_ascii=False), encoding="utf-8")
+    paths["mock_history_diseases"].write_text(json.dumps({"diseases": pool}, ensure_ascii=False), encoding="utf-8")
+
+    epoch = date(2023, 1, 1)
+    with open(paths["patients"], "w", encoding="utf-8", newline="") as pf, \
+            open(paths["history"], "w", encoding="utf-8") as hf:
+        writer = csv.writer(pf)
+        writer.writerow(PATIENT_FIELDS)
+        for i in range(patients):
+            pid = str(FIRST_ID + i)
+            state = rng.choice(states)
+            last_visit = epoch + timedelta(days=rng.randrange(1000))
+            past = rng.sample(pool, rng.randint(2, 6))
+            auto = [
+                {
+                    "disease": d,
+                    "diagnosed_on": (last_visit - timedelta(days=rng.randint(30 * k, 180 * k))).isoformat(),
+                    "source": "auto",
+                }
+                for k, d in enumerate(past, start=1)
+            ]
+            reports = []
+            if rng.random() < 0.05:
+                reports.append({"disease": rng.choice(pool), "diagnosed_on": last_visit.isoformat(), "source": "upload"})
+            writer.writerow([
+                pid,
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                rng.randint(1, 95),
+                rng.choice(("Male", "Female")),
+                CAPITALS.get(state, state),
+                state,
+                last_visit.isoformat(),
+                rng.choice(present_pool),
+                "|".join(past),
+            ])
+            record = {"patient_id": pid, "history": {"auto_history": auto, "report_history": reports}}
+            hf.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return paths
+
+
+def settings_for(paths: Dict[str, Path], runtime_dir: Path) -> Dict:
+    """
+    settings overrides that make the app serve a generated census, with
+    every other writable path under runtime_dir.
+    """
+    runtime_dir = Path(runtime_dir)
+    return {
+        "PATIENTS_CSV": paths["patients"],
+        "RELATIONS_JSON": paths["relations"],
+        "STATE_DISEASES_JSON": paths["state_diseases"],
+        "MOCK_HISTORY_DISEASES_JSON": paths["mock_history_diseases"],
+        "RUNTIME_DIR": runtime_dir,
+        "WRITABLE_PATIENTS_CSV": paths["patients"],
+        "WRITABLE_PATIENT_HISTORY_JSON": runtime_dir / "patient_history.json",
+        "WRITABLE_PATIENT_HISTORY_LOG": paths["history"],
+        "PATIENT_ID_SEQ": runtime_dir / "patient_id.seq",
+        "SQLITE_DB": runtime_dir / "neural_health_link.db",
+        "JOBS_DB": runtime_dir / "jobs.db",
+        "JOB_EXECUTOR": "inline",
+        "OCR_CACHE_DIR": runtime_dir / "ocr_cache",
+        "REPORT_CACHE_DIR": runtime_dir / "report_cache",
+        "UPLOAD_DIR": runtime_dir / "uploads",
+        "REFERENCE_BUNDLE": runtime_dir / "reference.bundle",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", default="10k", help=f"Row count or one of {', '.join(SCALES)}.")
+    parser.add_argument("--out", required=True, type=Path)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--relations-per-disease", type=int, default=20)
+    args = parser.parse_args()
+
+    n = SCALES.get(args.patients.lower()) or int(args.patients)
+    t0 = time.perf_counter()
+    paths = generate(args.out, n, args.seed, args.relations_per_disease)
+    print(json.dumps({
+        "patients": n,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "files": {k: str(v) for k, v in paths.items()},
+    }))
+
+
+if __name__ == "__main__":
+    main()
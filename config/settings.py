@@ -29,6 +29,13 @@ SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-dev-key")
 # -------------------------------------------------------
 IS_VERCEL = os.getenv("VERCEL") == "1"
 
+# -------------------------------------------------------
+# STARTUP
+# -------------------------------------------------------
+# Heavy modules and data load on first use. WARMUP loads them up front:
+# "off", "sync" (before create_app returns) or "background" (daemon thread).
+WARMUP = os.getenv("WARMUP", "off")
+
 # -------------------------------------------------------
 # READ-ONLY SOURCE DATA PATHS
 # -------------------------------------------------------
@@ -38,20 +45,35 @@ DISEASES_CSV = DATA_DIR / "diseases.csv"
 RELATIONS_JSON = DATA_DIR / "relations.json"
 STATE_DISEASES_JSON = DATA_DIR / "state_diseases.json"
 MOCK_HISTORY_DISEASES_JSON = DATA_DIR / "mock_history_diseases.json"
+DISEASE_ALIASES_JSON = DATA_DIR / "disease_aliases.json"
 PATIENT_HISTORY_JSON = DATA_DIR / "patient_history.json"
 
 # -------------------------------------------------------
 # WRITABLE RUNTIME PATHS
 # -------------------------------------------------------
-if IS_VERCEL:
+if os.getenv("RUNTIME_DIR"):
+    RUNTIME_DIR = Path(os.environ["RUNTIME_DIR"])
+elif IS_VERCEL:
     RUNTIME_DIR = Path("/tmp/neural_health_link")
 else:
     RUNTIME_DIR = BASE_DIR / "runtime"
-
-RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
+# Nothing is created at import; each writer makes its own directory on first
+# write, so a cold start that only reads never touches the filesystem.
 
 WRITABLE_PATIENTS_CSV = RUNTIME_DIR / "patients.csv"
 WRITABLE_PATIENT_HISTORY_JSON = RUNTIME_DIR / "patient_history.json"
+WRITABLE_PATIENT_HISTORY_LOG = RUNTIME_DIR / "patient_history.jsonl"
+PATIENT_ID_SEQ = RUNTIME_DIR / "patient_id.seq"
+
+# Storage backend for patients + history: "file" (CSV/JSONL) or "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "file")
+SQLITE_DB = RUNTIME_DIR / "neural_health_link.db"
+
+# Background compaction of the append-only history log. It only reclaims
+# superseded records (a patient's history written again); first records of
+# new registrations never count toward the threshold.
+HISTORY_COMPACT_INTERVAL = 300  # seconds between compactions
+HISTORY_COMPACT_MIN_GARBAGE = 1000  # superseded records before compacting
 
 # -------------------------------------------------------
 # TRANSLATIONS
@@ -101,15 +123,105 @@ SUPPORTED_LANGUAGES = {
 # FILE UPLOADS
 # -------------------------------------------------------
 UPLOAD_DIR = RUNTIME_DIR / "uploads"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 ALLOWED_EXTENSIONS = {"pdf", "jpg", "jpeg", "png"}
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB
 
+# -------------------------------------------------------
+# ASGI SERVING (asgi.py)
+# -------------------------------------------------------
+# Threads running Flask views and blocking writes off the event loop
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", 8))
+ASGI_UPLOAD_CHUNK = 64 * 1024  # upload bytes buffered per disk write
+ASGI_SPOOL_SIZE = 1024 * 1024  # request bodies for Flask views spill to disk above this
+
+# -------------------------------------------------------
+# DATA SNAPSHOTS
+# -------------------------------------------------------
+# Minimum seconds between file version checks of reference data
+SNAPSHOT_CHECK_INTERVAL = 2.0
+# Reference data compiled into one binary file that every worker memory-maps;
+# recompiled when a source file changes, reloaded when the file is replaced
+REFERENCE_BUNDLE = Path(os.getenv("REFERENCE_BUNDLE", RUNTIME_DIR / "reference.bundle"))
+
+# -------------------------------------------------------
+# API
+# -------------------------------------------------------
+API_MAX_PAGE_SIZE = 5000
+
+# -------------------------------------------------------
+# SEARCH
+# -------------------------------------------------------
+DASHBOARD_PAGE_SIZE = 50
+SEARCH_MAX_RESULTS = 50  # /api/search limit cap
+SEARCH_SUGGESTIONS = 5
+
+# -------------------------------------------------------
+# BULK IMPORT
+# -------------------------------------------------------
+IMPORT_BATCH_SIZE = 5000  # rows per ID block and per storage write
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", 1 if IS_VERCEL else os.cpu_count() or 1))  # 1 = inline
+IMPORT_MAX_ERRORS = 1000  # per-row errors listed in an import report
+
+# -------------------------------------------------------
+# BACKGROUND JOBS (report parsing)
+# -------------------------------------------------------
+JOBS_DB = RUNTIME_DIR / "jobs.db"
+# "process" pool, "thread" pool, or "inline" (run inside the request; used on
+# Vercel where nothing may outlive the response)
+JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "inline" if IS_VERCEL else "process")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", min(4, os.cpu_count() or 1)))
+JOB_QUEUE_MAX = 100  # queued + running jobs before uploads are parsed inline
+JOB_POLL_INTERVAL = 1.0  # seconds the dispatcher sleeps when idle
+
+# Budgets for extracting text from one uploaded PDF
+PDF_MAX_PAGES = 200
+PDF_MAX_TEXT_BYTES = 2 * 1024 * 1024
+PDF_TIME_BUDGET = 30.0  # seconds
+
 # -------------------------------------------------------
 # OCR CONFIG
 # -------------------------------------------------------
 TESSERACT_CMD = os.getenv("TESSERACT_CMD", "/usr/bin/tesseract")
+OCR_ENABLED = os.getenv("OCR_ENABLED", "1") == "1"
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_DPI = 200
+OCR_MAX_PAGES = 20  # scanned PDF pages OCR'd per upload
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))  # 1 = run inline
+
+# Extracted text cached by SHA-256 of the upload, LRU-evicted by total size
+OCR_CACHE_DIR = RUNTIME_DIR / "ocr_cache"
+OCR_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# -------------------------------------------------------
+# HIGHER-ORDER INTERACTIONS
+# -------------------------------------------------------
+INTERACTION_MIN_SUPPORT = 2  # patients with A and every item of the set
+INTERACTION_MAX_ORDER = 3  # S(A;B,C) by default
+INTERACTION_MAX_ORDER_LIMIT = 5  # compute guard for "expand to 4+"
+INTERACTION_MAX_CANDIDATES = 20000  # itemsets counted per present disease
+
+# -------------------------------------------------------
+# RECORD LINKAGE (duplicate detection)
+# -------------------------------------------------------
+# Fellegi-Sunter score thresholds (sum of log2 field weights, max ~26)
+LINKAGE_MATCH_SCORE = 18.0
+LINKAGE_POSSIBLE_SCORE = 12.0
+LINKAGE_AGE_BAND = 10  # years per blocking band
+LINKAGE_NGRAM_OVERLAP = 0.6  # share of a name's trigrams a candidate must have
+LINKAGE_MAX_CANDIDATES = 500  # scored per registration
+LINKAGE_MAX_BLOCK = 500  # larger blocks are skipped by the batch scan
+LINKAGE_MAX_PAIRS = 10000  # pairs kept in a batch scan result
+
+# -------------------------------------------------------
+# REPORT CACHE
+# -------------------------------------------------------
+# Computed report contexts and rendered report pages, keyed by patient,
+# language and data versions. The disk tier is shared by all workers.
+REPORT_CACHE_ENTRIES = int(os.getenv("REPORT_CACHE_ENTRIES", "512"))
+REPORT_CACHE_DISK = os.getenv("REPORT_CACHE_DISK", "0") == "1"
+REPORT_CACHE_DIR = RUNTIME_DIR / "report_cache"
+REPORT_CACHE_MAX_BYTES = 64 * 1024 * 1024
 
 # -------------------------------------------------------
 # RANDOM MOCK HISTORY GENERATION
@@ -122,3 +234,16 @@ RANDOM_HISTORY_MAX_DAYS = 1200
 # LOGGING
 # -------------------------------------------------------
 LOG_FILE = RUNTIME_DIR / "app.log"
+
+# -------------------------------------------------------
+# METRICS
+# -------------------------------------------------------
+# Prometheus text format at /metrics (per worker process). Off by default:
+# it exposes route names, cache stats and file-read counters. When on, a
+# scraper sends "Authorization: Bearer <METRICS_TOKEN>"; without a token
+# only loopback clients are served.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Requests at least this slow are written to LOG_FILE with their stage
+# breakdown; 0 logs every request, a negative value turns the log off.
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
@@ -0,0 +1,57 @@
+# /tests/conftest.py
+import pytest
+
+from config import settings
+from backend.services import reset_runtime_caches
+
+
+@pytest.fixture
+def runtime_dir(tmp_path, monkeypatch):
+    """Point every writable runtime path at a fresh temporary directory."""
+    monkeypatch.setattr(settings, "RUNTIME_DIR", tmp_path)
+    monkeypatch.setattr(settings, "WRITABLE_PATIENTS_CSV", tmp_path / "patients.csv")
+    monkeypatch.setattr(settings, "WRITABLE_PATIENT_HISTORY_JSON", tmp_path / "patient_history.json")
+    monkeypatch.setattr(settings, "WRITABLE_PATIENT_HISTORY_LOG", tmp_path / "patient_history.jsonl")
+    monkeypatch.setattr(settings, "PATIENT_ID_SEQ", tmp_path / "patient_id.seq")
+    monkeypatch.setattr(settings, "SQLITE_DB", tmp_path / "neural_health_link.db")
+    monkeypatch.setattr(settings, "JOBS_DB", tmp_path / "jobs.db")
+    monkeypatch.setattr(settings, "JOB_EXECUTOR", "inline")
+    monkeypatch.setattr(settings, "OCR_CACHE_DIR", tmp_path / "ocr_cache")
+    monkeypatch.setattr(settings, "OCR_WORKERS", 1)
+    monkeypatch.setattr(settings, "REPORT_CACHE_DIR", tmp_path / "report_cache")
+    monkeypatch.setattr(settings, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(settings, "REFERENCE_BUNDLE", tmp_path / "reference.bundle")
+    monkeypatch.setattr(settings, "LOG_FILE", tmp_path / "app.log")
+    settings.UPLOAD_DIR.mkdir()
+    reset_runtime_caches()
+    yield tmp_path
+    reset_runtime_caches()
+
+
+def build_pdf(pages):
+    """Minimal text-layer PDF with one Helvetica text line per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None]
+    kids = []
+    for text in pages:
+        content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        page_no = len(objects) + 1
+        kids.append(f"{page_no} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Contents {page_no + 1} 0 R /Resources << /Font << /F1 << /Type /Font "
+            f"/Subtype /Type1 /BaseFont /Helvetica >> >> >> >>"
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content.decode('latin-1')}\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
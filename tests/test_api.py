@@ -0,0 +1,348 @@
+# /tests/test_api.py
+import json
+
+import pytest
+from backend import create_app
+
+
+@pytest.fixture
+def client(runtime_dir):
+    """Flask test client backed by an isolated runtime directory."""
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_patients_cursor_pagination(client):
+    """Walking the cursor visits every patient exactly once."""
+    everyone = client.get("/api/patients").get_json()["patients"]
+
+    seen, cursor = [], None
+    while True:
+        url = "/api/patients?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).get_json()
+        seen.extend(page["patients"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == everyone
+
+
+def test_patients_projection_filter_and_ndjson(client):
+    """fields= projects, state= filters and format=ndjson streams lines."""
+    resp = client.get("/api/patients?fields=patient_id,state&state=kerala&format=ndjson")
+    assert resp.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in resp.data.decode().splitlines()]
+    assert rows and all(set(r) == {"patient_id", "state"} for r in rows)
+    assert all(r["state"] == "Kerala" for r in rows)
+
+    assert client.get("/api/patients?fields=password").status_code == 400
+    assert client.get("/api/patients?cursor=@@@").status_code == 400
+
+
+def test_patients_etag_revalidation(client):
+    """Unchanged data answers If-None-Match with 304; a write changes the ETag."""
+    first = client.get("/api/patients?limit=3")
+    etag = first.headers["ETag"]
+    again = client.get("/api/patients?limit=3", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    client.post("/register", data={"name": "New", "state": "Goa", "present_disease": "Fever"})
+    changed = client.get("/api/patients?limit=3", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_single_patient_lookup(client):
+    """/api/patients/<id> is served from the index."""
+    pid = client.get("/api/patients?limit=1").get_json()["patients"][0]["patient_id"]
+    assert client.get(f"/api/patients/{pid}").get_json()["patient"]["patient_id"] == pid
+
+
+def test_report_upload_is_parsed_by_a_job(client):
+    """Registration enqueues the upload and /api/jobs reports the result."""
+    import io
+    from conftest import build_pdf
+    from backend.services.jobs import get_job_queue
+
+    pdf = build_pdf(["History of Asthma and Tuberculosis", "Follow up: Hypertension"])
+    resp = client.post(
+        "/register",
+        data={
+            "name": "Uploader",
+            "state": "Kerala",
+            "present_disease": "Fever",
+            "report_file": (io.BytesIO(pdf), "report.pdf"),
+        },
+        content_type="multipart/form-data",
+    )
+    pid = resp.headers["Location"].rsplit("/", 1)[-1]
+
+    (job,) = get_job_queue().for_patient(pid)
+    status = client.get(f"/api/jobs/{job['id']}").get_json()["job"]
+    assert status["status"] == "done"
+    assert set(status["result"]["diseases"]) == {"Asthma", "Tuberculosis", "Hypertension"}
+
+    page = client.get(f"/patient/{pid}")
+    assert b"from uploaded report" in page.data
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+
+def test_inline_fallback_records_a_failed_parse(client, monkeypatch, caplog):
+    """With the queue full the upload is parsed in the request, and a failure still leaves a job."""
+    import io
+    from conftest import build_pdf
+    from backend.services import report_parser
+    from backend.services.jobs import get_job_queue
+
+    def broken(payload, progress=None):
+        raise RuntimeError("unreadable scan")
+
+    monkeypatch.setattr(get_job_queue(), "max_pending", 0)
+    monkeypatch.setattr(report_parser, "run_report_job", broken)
+    resp = client.post(
+        "/register",
+        data={"name": "Overflow", "present_disease": "Fever",
+              "report_file": (io.BytesIO(build_pdf(["History of Asthma"])), "report.pdf")},
+        content_type="multipart/form-data",
+    )
+    pid = resp.headers["Location"].rsplit("/", 1)[-1]
+
+    (job,) = get_job_queue().for_patient(pid)
+    status = client.get(f"/api/jobs/{job['id']}").get_json()["job"]
+    assert status["status"] == "failed" and status["error"] == "RuntimeError: unreadable scan"
+    assert "report_parse job" in caplog.text and "unreadable scan" in caplog.text
+    assert b"Parsing the uploaded report failed: RuntimeError: unreadable scan" in client.get(f"/patient/{pid}").data
+
+
+def test_process_jobs_run_in_spawned_workers(client, monkeypatch):
+    """Process-pool jobs run in spawned workers that see the runtime settings."""
+    import io
+    import time
+    from conftest import build_pdf
+    from backend.services.jobs import clear_job_queues, get_job_queue
+    from config import settings
+
+    monkeypatch.setattr(settings, "JOB_EXECUTOR", "process")
+    monkeypatch.setattr(settings, "JOB_WORKERS", 1)
+    clear_job_queues()
+    try:
+        resp = client.post(
+            "/register",
+            data={"name": "Spawned", "present_disease": "Fever",
+                  "report_file": (io.BytesIO(build_pdf(["History of Asthma"])), "report.pdf")},
+            content_type="multipart/form-data",
+        )
+        pid = resp.headers["Location"].rsplit("/", 1)[-1]
+        queue = get_job_queue()
+        assert queue._executor._mp_context.get_start_method() == "spawn"
+
+        deadline = time.monotonic() + 60
+        (job,) = queue.for_patient(pid)
+        while job["status"] not in ("done", "failed") and time.monotonic() < deadline:
+            time.sleep(0.1)
+            job = queue.get(job["id"])
+        assert job["status"] == "done" and job["result"]["diseases"] == ["Asthma"]
+    finally:
+        clear_job_queues()
+
+
+def test_bulk_scores_by_ids_and_filter(client):
+    """/api/scores scores explicit IDs or a filtered page of the census."""
+    by_ids = client.post("/api/scores", json={"patient_ids": ["1001", "1002", "nope"]}).get_json()
+    assert [s["patient_id"] for s in by_ids["scores"]] == ["1001", "1002"]
+    assert by_ids["missing"] == ["nope"]
+    assert len(by_ids["scores"][0]["vital_scores"]) == 5
+
+    page = client.get("/api/scores?limit=2").get_json()
+    assert page["count"] == 2 and page["next_cursor"]
+
+    # Wrongly typed JSON values are client errors, not 500s.
+    assert client.post("/api/scores", json={"limit": [1]}).status_code == 400
+    assert client.post("/api/scores", json={"state": 5}).status_code == 400
+
+
+def test_report_page_cache_and_conditional_get(client, runtime_dir, monkeypatch):
+    """Reports are rendered once per data version and revalidate with 304s."""
+    from config import settings
+    from backend.services import data_loader
+    from backend.services.report_cache import get_report_cache
+
+    monkeypatch.setattr(settings, "REPORT_CACHE_DISK", True)
+    first = client.get("/patient/1001")
+    assert first.status_code == 200 and first.headers["ETag"] and first.last_modified
+
+    again = client.get("/patient/1001")
+    assert again.data == first.data
+    assert get_report_cache().stats()["hits"] >= 1
+    assert list((runtime_dir / "report_cache").glob("*.txt"))
+
+    etag = first.headers["ETag"]
+    assert client.get("/patient/1001", headers={"If-None-Match": etag}).status_code == 304
+    since = first.headers["Last-Modified"]
+    assert client.get("/patient/1001", headers={"If-Modified-Since": since}).status_code == 304
+
+    data_loader.append_patient_history(
+        "1001", {"auto_history": [], "report_history": [{"disease": "Asthma", "diagnosed_on": "2025-01-02"}]}
+    )
+    changed = client.get("/patient/1001", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert b"Asthma" in changed.data
+
+
+def test_report_pages_rerender_when_translations_change(client, runtime_dir, monkeypatch):
+    """A catalog edit changes the report ETag and the cached page text."""
+    import shutil
+    from config import settings
+    from backend.services.snapshots import registry
+
+    translations = runtime_dir / "translations"
+    shutil.copytree(settings.TRANSLATIONS_DIR, translations)
+    monkeypatch.setattr(settings, "TRANSLATIONS_DIR", translations)
+    monkeypatch.setattr(settings, "SNAPSHOT_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(settings, "REPORT_CACHE_DISK", True)
+    registry.clear()
+
+    first = client.get("/patient/1001")
+    etag = first.headers["ETag"]
+    en = json.loads((translations / "en.json").read_text(encoding="utf-8"))
+    en["lang_label"] = "Interface language"
+    (translations / "en.json").write_text(json.dumps(en), encoding="utf-8")
+
+    changed = client.get("/patient/1001", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert b"Interface language" in changed.data
+
+
+def test_cooccurrence_endpoint(client):
+    """Pairs come back with conditional probability and lift."""
+    body = client.get("/api/analytics/cooccurrence?present=fever&sort=lift").get_json()
+    assert body["patients"] >= 1
+    assert body["pairs"] and {"count", "probability", "lift"} <= set(body["pairs"][0])
+    assert all(p["present"] == "Fever" for p in body["pairs"])
+    assert client.get("/api/analytics/cooccurrence?sort=bogus").status_code == 400
+    bad = client.get("/api/analytics/cooccurrence?min_count=x")
+    assert bad.status_code == 400 and bad.get_json()["error"] == "min_count must be an integer"
+
+
+def test_interaction_endpoints(client):
+    """Population top-k and the per-patient view share one validator."""
+    body = client.get("/api/analytics/interactions?present=fever&k=5&min_support=1").get_json()
+    assert body["present"] == "fever" and len(body["interactions"]) <= 5
+    assert client.get("/api/analytics/interactions").status_code == 400
+    assert client.get("/api/analytics/interactions?present=Fever&sort=bogus").status_code == 400
+
+    patient = client.get("/api/patients/1001/interactions?min_support=1").get_json()
+    assert patient["patient_id"] == "1001" and "interactions" in patient
+    assert client.get("/api/patients/nope/interactions").status_code == 404
+
+
+
+
+def test_registration_flags_duplicates_and_batch_scan(client):
+    """A repeat registration is kept but linked; the scan runs as a job."""
+    form = {"name": "Priya  Nair", "age": "35", "gender": "Female", "city": "Kochi",
+            "state": "Kerala", "present_disease": "Cough"}
+    resp = client.post("/register", data=form)
+    assert resp.status_code == 302 and resp.headers["Location"].endswith("#duplicates")
+    pid = resp.headers["Location"].split("#")[0].rsplit("/", 1)[-1]
+
+    body = client.get(f"/api/patients/{pid}/duplicates").get_json()
+    assert [d["patient_id"] for d in body["duplicates"]] == ["1002"]
+    assert client.get("/api/patients/nope/duplicates").status_code == 404
+
+    fresh = client.post("/register", data=dict(form, name="Zoya Fernandes"))
+    assert "#" not in fresh.headers["Location"]
+
+    job_id = client.post("/api/dedupe").get_json()["job_id"]
+    job = client.get(f"/api/jobs/{job_id}").get_json()["job"]
+    assert job["status"] == "done"
+    assert {"patient_id": pid, "duplicate_of": "1002"} == {
+        k: job["result"]["pairs"][0][k] for k in ("patient_id", "duplicate_of")
+    }
+
+
+def test_static_pages_are_cached_per_language(client, runtime_dir, monkeypatch):
+    """Switching language is a cache lookup; editing a catalog re-renders."""
+    import shutil
+    from config import settings
+    from backend.services.page_cache import get_page_cache
+    from backend.services.snapshots import registry
+
+    translations = runtime_dir / "translations"
+    shutil.copytree(settings.TRANSLATIONS_DIR, translations)
+    monkeypatch.setattr(settings, "TRANSLATIONS_DIR", translations)
+    monkeypatch.setattr(settings, "SNAPSHOT_CHECK_INTERVAL", 0)
+    registry.clear()
+
+    client.post("/set-language", data={"lang": "hi"})
+    first = client.get("/register").get_data(as_text=True)
+    assert "Register New Patient" in first  # key missing from hi.json, taken from en
+    assert client.get("/register").get_data(as_text=True) == first
+    assert get_page_cache().stats()["hits"] >= 1
+
+    hi = json.loads((translations / "hi.json").read_text(encoding="utf-8"))
+    hi["register_heading"] = "नया मरीज़"
+    (translations / "hi.json").write_text(json.dumps(hi, ensure_ascii=False), encoding="utf-8")
+    assert "नया मरीज़" in client.get("/register").get_data(as_text=True)
+    client.post("/set-language", data={"lang": "en"})
+    assert "नया मरीज़" not in client.get("/register").get_data(as_text=True)
+
+
+def test_search_endpoint_and_dashboard_pages(client, monkeypatch):
+    """Typeahead results and suggestions; the dashboard pages the same index."""
+    from config import settings
+
+    body = client.get("/api/search?q=kerala%20pr").get_json()
+    assert body["total"] == 1 and body["results"][0]["patient_id"] == "1002"
+    assert body["suggestions"] == ["priya"]
+    assert client.get("/api/search?q=fever&offset=-1").status_code == 400
+
+    monkeypatch.setattr(settings, "DASHBOARD_PAGE_SIZE", 2)
+    page = client.get("/?q=fever&page=2").get_data(as_text=True)
+    assert "Aarav Singh" in page and "Rohan Sharma" not in page
+    assert "Page 2 of 3" in page
+
+def test_bulk_import_endpoint(client, monkeypatch):
+    """NDJSON bodies are streamed in; malformed lines come back as errors."""
+    from config import settings
+
+    monkeypatch.setattr(settings, "IMPORT_WORKERS", 1)
+    body = "\n".join([
+        '{"name": "Asha", "present_disease": "Fever", "state": "Goa"}',
+        "not json",
+        '{"name": "Ravi", "present_disease": "Cough", "previous_diseases": ["Asthma"]}',
+    ])
+    resp = client.post("/api/patients/bulk", data=body, content_type="application/x-ndjson")
+    report = resp.get_json()
+    assert resp.status_code == 200 and report["imported"] == 2
+    assert report["errors"][0]["line"] == 2
+    assert client.get(f"/api/patients/{report['last_id']}").get_json()["patient"]["previous_diseases"] == "Asthma"
+
+    missing = client.post("/api/patients/bulk", data="name,age\nAsha,3\n", content_type="text/csv")
+    assert missing.status_code == 400
+
+
+def test_metrics_endpoint_and_slow_request_log(client, runtime_dir, monkeypatch):
+    """Route and stage histograms are exported; slow requests log their stages."""
+    from config import settings
+
+    monkeypatch.setattr(settings, "SLOW_REQUEST_SECONDS", 0)
+    assert client.get("/patient/1002").status_code == 200
+    assert client.get("/metrics").status_code == 404  # off by default
+
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.7"}).status_code == 403
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 403
+    text = client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).get_data(as_text=True)
+    assert 'nhl_http_request_duration_seconds_count{method="GET",route="/patient/<patient_id>",status="200"}' in text
+    for stage in ("data_load", "scoring", "state_context", "vitals", "render"):
+        assert f'nhl_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert 'nhl_cache_events_total{cache="report",result="miss"}' in text
+    assert 'nhl_file_reads_total{kind="patients_csv"}' in text
+
+    log = (runtime_dir / "app.log").read_text(encoding="utf-8")
+    line = next(l for l in log.splitlines() if "GET /patient/1002" in l)
+    assert "route=/patient/<patient_id> status=200" in line and "render=" in line
@@ -0,0 +1,157 @@
+# /tests/test_asgi.py
+import asyncio
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+from werkzeug.test import EnvironBuilder
+
+from backend import create_app
+from backend.asgi import AsgiApp
+from config import settings
+
+
+@pytest.fixture
+def asgi_app(runtime_dir):
+    app = AsgiApp(create_app(), threads=2)
+    yield app
+    app.executor.shutdown()
+
+
+async def _call(app, method, path, body=b"", content_type=None, chunk=None, delay=0.0,
+                length=True, disconnect=False):
+    """
+    One request through the ASGI app, the body sent in `chunk`-sized pieces;
+    without a Content-Length when length=False, and with the client going
+    away after the last piece when disconnect=True.
+    """
+    query = path.split("?", 1)[1] if "?" in path else ""
+    headers = [(b"content-length", str(len(body)).encode())] if length else []
+    if content_type:
+        headers.append((b"content-type", content_type.encode("latin-1")))
+    scope = {
+        "type": "http", "method": method, "path": path.split("?")[0], "query_string": query.encode(),
+        "headers": headers, "http_version": "1.1", "scheme": "http", "root_path": "",
+    }
+    chunk = chunk or max(len(body), 1)
+    pieces = [body[i: i + chunk] for i in range(0, len(body), chunk)] or [b""]
+
+    async def receive():
+        await asyncio.sleep(delay)
+        if not pieces:
+            return {"type": "http.disconnect"}
+        piece = pieces.pop(0)
+        return {"type": "http.request", "body": piece, "more_body": bool(pieces) or disconnect}
+
+    response = {"body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message["headers"]}
+        else:
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response
+
+
+def _multipart(fields, report=None):
+    data = dict(fields)
+    if report is not None:
+        data["report_file"] = FileStorage(io.BytesIO(report[1]), filename=report[0])
+    environ = EnvironBuilder(method="POST", data=data).get_environ()
+    return environ["wsgi.input"].read(), environ["CONTENT_TYPE"]
+
+
+def test_asgi_reads_match_wsgi(asgi_app):
+    """Non-upload routes are served by the Flask app unchanged."""
+    flask_client = asgi_app.flask_app.test_client()
+    resp = asyncio.run(_call(asgi_app, "GET", "/api/patients?limit=5&fields=patient_id,name"))
+    assert resp["status"] == 200
+    assert resp["body"] == flask_client.get("/api/patients?limit=5&fields=patient_id,name").data
+    assert asyncio.run(_call(asgi_app, "GET", "/api/patients/9999"))["status"] == 404
+
+    body, content_type = b"name=Plain&state=Kerala&present_disease=Fever", "application/x-www-form-urlencoded"
+    posted = asyncio.run(_call(asgi_app, "POST", "/register", body, content_type))
+    assert posted["status"] == 302
+    pid = posted["headers"]["location"].rsplit("/", 1)[-1]
+    assert flask_client.get(f"/api/patients/{pid}").get_json()["patient"]["name"] == "Plain"
+
+
+def test_asgi_streams_report_upload_to_disk(asgi_app):
+    """A multipart registration trickled in small chunks stores the report and parses it."""
+    from conftest import build_pdf
+    from backend.services.jobs import get_job_queue
+
+    pdf = build_pdf(["History of Asthma and Tuberculosis"])
+    body, content_type = _multipart(
+        {"name": "Streamer", "state": "Kerala", "present_disease": "Fever"}, ("report.pdf", pdf)
+    )
+    resp = asyncio.run(_call(asgi_app, "POST", "/register", body, content_type, chunk=97))
+    assert resp["status"] == 302
+    pid = resp["headers"]["location"].rsplit("/", 1)[-1]
+
+    assert (settings.UPLOAD_DIR / f"{pid}_report.pdf").read_bytes() == pdf
+    (job,) = get_job_queue().for_patient(pid)
+    assert set(job["result"]["diseases"]) == {"Asthma", "Tuberculosis"}
+    patient = asgi_app.flask_app.test_client().get(f"/api/patients/{pid}").get_json()["patient"]
+    assert patient["name"] == "Streamer" and patient["previous_diseases"]
+
+
+def test_asgi_serves_reads_while_uploads_trickle(asgi_app):
+    """Slow uploads hold no worker thread, so reads complete while they stream."""
+    body, content_type = _multipart({"name": "Slow", "present_disease": "Fever"}, ("scan.png", b"\x89PNG" * 4096))
+
+    async def scenario():
+        uploads = [
+            asyncio.ensure_future(_call(asgi_app, "POST", "/register", body, content_type, chunk=4096, delay=0.01))
+            for _ in range(10)
+        ]
+        await asyncio.sleep(0.02)
+        read = await _call(asgi_app, "GET", "/api/meta")
+        pending = sum(not u.done() for u in uploads)
+        return read, pending, await asyncio.gather(*uploads)
+
+    read, pending, uploads = asyncio.run(scenario())
+    assert read["status"] == 200 and pending == 10
+    assert [u["status"] for u in uploads] == [302] * 10
+    assert len({u["headers"]["location"] for u in uploads}) == 10
+    assert len(list(settings.UPLOAD_DIR.glob("*_scan.png"))) == 10
+
+
+def test_asgi_rejects_oversized_upload_without_leftovers(asgi_app, monkeypatch):
+    """Bodies past MAX_CONTENT_LENGTH get 413 and leave no partial file or patient."""
+    from backend.services.data_loader import load_patients
+
+    before = len(load_patients())
+    body, content_type = _multipart({"name": "Huge"}, ("big.pdf", b"%PDF" + b"0" * 50_000))
+    monkeypatch.setattr(settings, "MAX_CONTENT_LENGTH", 20_000)
+
+    resp = asyncio.run(_call(asgi_app, "POST", "/register", body, content_type, chunk=8192))
+    assert resp["status"] == 413
+    assert list(settings.UPLOAD_DIR.iterdir()) == []
+    assert len(load_patients()) == before
+
+
+def test_asgi_failed_streamed_upload_leaves_no_file_or_id(asgi_app, monkeypatch):
+    """A finished upload is dropped when the rest of the request fails."""
+    from backend.services.data_loader import allocate_patient_id
+
+    monkeypatch.setattr(settings, "MAX_CONTENT_LENGTH", 20_000)
+    first = allocate_patient_id()
+
+    # No Content-Length; a field after the file pushes the body over the limit.
+    data = {"report_file": FileStorage(io.BytesIO(b"%PDF" + b"0" * 5_000), filename="r.pdf"), "name": "x" * 30_000}
+    environ = EnvironBuilder(method="POST", data=data).get_environ()
+    body, content_type = environ["wsgi.input"].read(), environ["CONTENT_TYPE"]
+    resp = asyncio.run(_call(asgi_app, "POST", "/register", body, content_type, chunk=4096, length=False))
+    assert resp["status"] == 413
+
+    # The client goes away after the file (and the whole body) was sent.
+    body, content_type = _multipart({"name": "Gone"}, ("r.pdf", b"%PDF" + b"0" * 5_000))
+    resp = asyncio.run(_call(asgi_app, "POST", "/register", body, content_type, chunk=4096, disconnect=True))
+    assert "status" not in resp
+
+    assert not settings.UPLOAD_DIR.exists() or list(settings.UPLOAD_DIR.iterdir()) == []
+    assert allocate_patient_id() == first + 1
@@ -0,0 +1,52 @@
+# /tests/test_benchmarks.py
+from benchmarks.suite import compare
+from benchmarks.synthetic import FIRST_ID, generate, settings_for
+from config import settings
+
+
+def test_routes_against_synthetic_census(runtime_dir, monkeypatch):
+    """The app serves a generated census, not just the bundled sample."""
+    from backend import create_app
+    from backend.services import reset_runtime_caches
+
+    paths = generate(runtime_dir / "census", 300, seed=3)
+    for key, value in settings_for(paths, runtime_dir).items():
+        monkeypatch.setattr(settings, key, value)
+    reset_runtime_caches()
+
+    client = create_app().test_client()
+    first = client.get("/api/patients?limit=250").get_json()
+    second = client.get(f"/api/patients?limit=250&cursor={first['next_cursor']}").get_json()
+    assert len(first["patients"]) + len(second["patients"]) == 300
+
+    pid = FIRST_ID + 123
+    assert client.get(f"/patient/{pid}").status_code == 200
+    patient = client.get(f"/api/patients/{pid}").get_json()["patient"]
+    assert patient["previous_diseases"].count("|") >= 1
+    assert client.post("/register", data={"name": "New", "present_disease": "Fever"}).status_code == 302
+    assert client.get(f"/api/patients/{FIRST_ID + 300}").status_code == 200
+
+
+def test_compare_flags_regressions_past_tolerance():
+    """Only slowdowns beyond tolerance and the noise floor count."""
+    baseline = {"scales": {"10k": {"load_s": 1.0, "view_p50_ms": 0.2, "lookup_us": 0.0}}}
+    current = {"scales": {"10k": {"load_s": 1.6, "view_p50_ms": 0.5, "lookup_us": 0.4}}}
+    assert compare(current, baseline, tolerance=0.5) == ["10k: load_s 1.6 vs baseline 1.0 (+60%)"]
+    assert compare(current, baseline, tolerance=1.0) == []
+    assert compare({"scales": {}}, baseline, tolerance=0.0) == []
+
+    tail = {"scales": {"10k": {"view_p95_ms": 9.0}}}
+    assert compare(tail, {"scales": {"10k": {"view_p95_ms": 1.0}}}, tolerance=0.5) == []
+    assert compare(tail, {"scales": {"10k": {"view_p95_ms": 1.0}}}, tolerance=0.5, tails=True)
+
+
+def test_startup_benchmark_measures_a_cold_process():
+    """One fresh interpreter: every phase and first response is timed."""
+    from benchmarks.startup import bench_startup
+
+    metrics = bench_startup(["/", "/api/patients?limit=5"], repeat=1)
+    assert set(metrics) == {
+        "interpreter_s", "import_s", "create_app_s", "time_to_first_response_s",
+        "first_home_s", "first_api_patients_s",
+    }
+    assert metrics["time_to_first_response_s"] >= metrics["import_s"] + metrics["create_app_s"]
@@ -0,0 +1,245 @@
+# /tests/test_data_loader.py
+import time
+
+from backend.services import data_loader, storage
+from backend.services.patient_store import PatientStore
+
+
+def _row(pid, name="Test Patient"):
+    return {
+        "patient_id": str(pid),
+        "name": name,
+        "age": "40",
+        "gender": "Female",
+        "city": "Pune",
+        "state": "Maharashtra",
+        "last_visit": "2025-01-01",
+        "present_disease": "Fever",
+        "previous_diseases": "Cough|Headache",
+    }
+
+
+def test_store_seeds_from_bundled_csv(runtime_dir):
+    """The runtime CSV is seeded and indexed on first load."""
+    patients = data_loader.load_patients()
+    assert patients
+    first = patients[0]
+    assert data_loader.get_patient(first["patient_id"]) == first
+    assert data_loader.get_patient("does-not-exist") is None
+
+
+def test_append_is_read_incrementally(runtime_dir):
+    """Appended rows show up without a full re-parse of the file."""
+    before = len(data_loader.load_patients())
+    data_loader.append_patient(_row(5001))
+    data_loader.append_patient(_row(5002))
+
+    patients = data_loader.load_patients()
+    assert len(patients) == before + 2
+    assert data_loader.get_patient("5002")["name"] == "Test Patient"
+
+
+def test_store_reloads_when_file_is_rewritten(tmp_path):
+    """A rewrite that is not an append invalidates the cached rows."""
+    path = tmp_path / "patients.csv"
+    path.write_text("patient_id,name\n1,Alpha\n2,Beta\n", encoding="utf-8")
+    store = PatientStore(path)
+    assert [p["name"] for p in store.all()] == ["Alpha", "Beta"]
+
+    path.write_text("patient_id,name\n1,Gamma\n2,Delta\n3,Omega\n", encoding="utf-8")
+    assert [p["name"] for p in store.all()] == ["Gamma", "Delta", "Omega"]
+    assert store.get("3")["name"] == "Omega"
+
+
+def test_columnar_store_round_trips_rows_exactly(tmp_path):
+    """Coded columns give back the CSV strings, odd values included."""
+    path = tmp_path / "patients.csv"
+    path.write_text(
+        "patient_id,name,age,gender,city,state,last_visit,present_disease,previous_diseases\n"
+        "7,Ämile Roy,40,Male,Pune,Maharashtra,2025-01-02,Fever,Cough|Headache\n"
+        "3,Out Of Order,forty,,,Kerala,02/01/2025,,\n"
+        "A-9,Text Id,,Female,Kochi,kerala,2025-13-01,Cough,Fever||Cough\n"
+        "7,Second Seven,70000,Male,Pune,Maharashtra,,fever, Cough\n",
+        encoding="utf-8",
+    )
+    store = PatientStore(path)
+    rows = store.all()
+    assert [dict(p) for p in rows] == [
+        {"patient_id": "7", "name": "Ämile Roy", "age": "40", "gender": "Male", "city": "Pune",
+         "state": "Maharashtra", "last_visit": "2025-01-02", "present_disease": "Fever",
+         "previous_diseases": "Cough|Headache"},
+        {"patient_id": "3", "name": "Out Of Order", "age": "forty", "gender": "", "city": "",
+         "state": "Kerala", "last_visit": "02/01/2025", "present_disease": "", "previous_diseases": ""},
+        {"patient_id": "A-9", "name": "Text Id", "age": "", "gender": "Female", "city": "Kochi",
+         "state": "kerala", "last_visit": "2025-13-01", "present_disease": "Cough",
+         "previous_diseases": "Fever||Cough"},
+        {"patient_id": "7", "name": "Second Seven", "age": "70000", "gender": "Male", "city": "Pune",
+         "state": "Maharashtra", "last_visit": "", "present_disease": "fever", "previous_diseases": "Cough"},
+    ]
+    assert rows[-1] == rows[3] and rows[1:3] == [rows[1], rows[2]]
+    assert store.get("7")["name"] == "Second Seven" and store.get("A-9")["age"] == ""
+    assert store.get("3")["name"] == "Out Of Order" and store.get("07") is None
+    assert store.max_patient_id() == 7
+
+    state_rows, _ = store.page(where={"state": "KERALA"})
+    assert [p["patient_id"] for p in state_rows] == ["3", "A-9"]
+    fever, next_start = store.page(0, 1, where={"present_disease": "Fever", "state": "maharashtra"})
+    assert [p["name"] for p in fever] == ["Ämile Roy"] and next_start == 3
+    assert store.page(where={"state": "Goa"}) == ([], None)
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("8,Late,50,Male,Pune,Goa,2025-02-01,Fever,\n")
+    assert len(rows) == 4 and len(store.all()) == 5
+    assert store.get("8")["state"] == "Goa"
+
+    # every column present, but the last field may still be growing
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("9,Torn,50,Male,Pune,Goa,2025-02-01,Fever,Cou")
+    assert store.get("9") is None and len(store.all()) == 5
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("gh|Asthma\n")
+    assert store.get("9")["previous_diseases"] == "Cough|Asthma"
+
+    # a file that simply lacks its final newline keeps its last row
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("10,Exported,33,Female,Pune,Goa,2025-02-01,Fever,Cough")
+    fresh = PatientStore(path)
+    assert fresh.get("10")["previous_diseases"] == "Cough" and fresh.max_patient_id() == 10
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("|Asthma\n11,Next,20,Male,Pune,Goa,2025-02-02,Fever,\n")
+    assert fresh.get("10")["previous_diseases"] == "Cough|Asthma"
+    assert [p["patient_id"] for p in fresh.all()][-3:] == ["9", "10", "11"]
+
+
+def test_history_log_point_lookup_and_compaction(runtime_dir):
+    """Latest history record wins and compaction drops superseded lines."""
+    data_loader.append_patient_history("7", {"auto_history": [], "report_history": []})
+    data_loader.append_patient_history("8", {"auto_history": [{"disease": "Asthma"}]})
+    data_loader.append_patient_history("7", {"auto_history": [{"disease": "Stroke"}]})
+
+    assert data_loader.get_patient_history("7") == {"auto_history": [{"disease": "Stroke"}]}
+    assert data_loader.get_patient_history("missing") == {}
+    assert set(data_loader.load_patient_history()) == {"7", "8"}
+
+    log = storage.get_backend().history_log()
+    assert log.garbage() == 1
+    log.compact()
+    assert log.garbage() == 0
+    assert len(runtime_dir.joinpath("patient_history.jsonl").read_text().splitlines()) == 2
+
+
+def test_history_log_compacts_only_superseded_records(runtime_dir):
+    """New patients never trigger compaction; rewritten histories do."""
+    log = storage.get_backend().history_log()
+    log.append_many({str(pid): {"auto_history": []} for pid in range(100, 110)})
+    assert log.garbage() == 0
+    assert not log.maybe_compact(interval=0, min_garbage=3)
+
+    log.append_many({str(pid): {"auto_history": [{"disease": "Asthma"}]} for pid in range(100, 103)})
+    assert log.maybe_compact(interval=0, min_garbage=3)
+    for _ in range(100):
+        if not log._compacting:
+            break
+        time.sleep(0.01)
+    assert log.garbage() == 0
+    assert log.get("101") == {"auto_history": [{"disease": "Asthma"}]}
+
+
+def test_history_log_reads_survive_compaction_by_another_worker(runtime_dir):
+    """A file replaced between indexing and reading is re-indexed, not misread."""
+    from backend.services.history_log import HistoryLog
+
+    path = runtime_dir / "patient_history.jsonl"
+    log = storage.get_backend().history_log()
+    log.append_many({"1": {"auto_history": []}, "2": {"auto_history": []}})
+    log.append("2", {"auto_history": [{"disease": "Stroke"}]})
+    log.append("3", {"auto_history": [{"disease": "Asthma"}]})
+    other = HistoryLog(path)  # another worker's view of the same file
+
+    refresh = log.refresh
+
+    def compact_after_next_refresh():
+        def refresh_then_compact():
+            refresh()
+            del log.refresh
+            other.compact()  # lands after this worker indexed the old file
+
+        log.refresh = refresh_then_compact
+
+    compact_after_next_refresh()
+    assert log.get("3") == {"auto_history": [{"disease": "Asthma"}]}
+    log.append("2", {"auto_history": [{"disease": "Fever"}]})
+    compact_after_next_refresh()
+    assert log.all() == {
+        "1": {"auto_history": []},
+        "2": {"auto_history": [{"disease": "Fever"}]},
+        "3": {"auto_history": [{"disease": "Asthma"}]},
+    }
+
+
+def test_history_log_skips_torn_tail(runtime_dir):
+    """A crash mid-append leaves earlier records readable."""
+    data_loader.append_patient_history("1", {"auto_history": []})
+    with open(runtime_dir / "patient_history.jsonl", "ab") as f:
+        f.write(b'{"patient_id": "2", "hist')
+
+    assert set(data_loader.load_patient_history()) == {"1"}
+    data_loader.append_patient_history("3", {"auto_history": []})
+    assert set(data_loader.load_patient_history()) == {"1", "3"}
+
+
+def test_legacy_history_json_is_converted(runtime_dir):
+    """An existing patient_history.json seeds the new log."""
+    (runtime_dir / "patient_history.json").write_text('{"42": {"auto_history": []}}', encoding="utf-8")
+    assert data_loader.get_patient_history("42") == {"auto_history": []}
+
+
+def test_sqlite_backend_migration_and_filters(runtime_dir, monkeypatch):
+    """Runtime files migrate into SQLite and serve the same reads."""
+    from config import settings
+
+    data_loader.append_patient(_row(6001, name="Migrated"))
+    data_loader.append_patient_history("6001", {"auto_history": [{"disease": "Asthma"}]})
+    file_patients = data_loader.load_patients()
+
+    counts = storage.migrate(storage.get_backend("file"), storage.get_backend("sqlite"))
+    assert counts["patients"] == len(file_patients)
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    assert data_loader.load_patients() == file_patients
+    assert data_loader.get_patient("6001")["name"] == "Migrated"
+    assert data_loader.get_patient_history("6001") == {"auto_history": [{"disease": "Asthma"}]}
+    assert all(p["state"] == "Maharashtra" for p in data_loader.find_patients(state="maharashtra"))
+    assert "6001" in {p["patient_id"] for p in data_loader.find_patients(present_disease="Fever")}
+
+
+def _allocate_many(n):
+    return [data_loader.allocate_patient_id() for _ in range(n)]
+
+
+def test_patient_ids_are_unique_across_processes(runtime_dir):
+    """Concurrent workers never receive the same patient ID."""
+    import multiprocessing
+
+    start = data_loader.allocate_patient_id()
+    assert start == max(int(p["patient_id"]) for p in data_loader.load_patients()) + 1
+
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(4) as pool:
+        batches = pool.map(_allocate_many, [25] * 4)
+    ids = [pid for batch in batches for pid in batch]
+    assert len(set(ids)) == 100
+    assert min(ids) == start + 1
+
+    block = data_loader.allocate_patient_ids(10)
+    assert block[0] == max(ids) + 1 and len(block) == 10
+
+
+def test_sqlite_patient_id_sequence(runtime_dir, monkeypatch):
+    """The SQLite sequence starts after the seeded rows."""
+    from config import settings
+
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "sqlite")
+    highest = max(int(p["patient_id"]) for p in data_loader.load_patients())
+    assert data_loader.allocate_patient_id() == highest + 1
+    assert list(data_loader.allocate_patient_ids(3)) == [highest + 2, highest + 3, highest + 4]
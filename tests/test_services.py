@@ -0,0 +1,509 @@
+# /tests/test_services.py
+import json
+
+import pytest
+
+from config import settings
+from backend.services.snapshots import registry
+
+
+def test_snapshot_swaps_when_file_changes(runtime_dir, monkeypatch):
+    """A changed reference file yields a new, immutable snapshot version."""
+    path = runtime_dir / "relations.json"
+    path.write_text(json.dumps({"Fever": {"Cough": {"probability": 0.5}}}), encoding="utf-8")
+    monkeypatch.setattr(settings, "RELATIONS_JSON", path)
+    monkeypatch.setattr(settings, "SNAPSHOT_CHECK_INTERVAL", 0)
+    registry.clear()
+
+    first = registry.get("relations")
+    assert first.data["Fever"]["Cough"]["probability"] == 0.5
+    with pytest.raises(TypeError):
+        first.data["Fever"]["Cough"]["probability"] = 1.0
+    assert registry.get("relations") is first
+
+    path.write_text(json.dumps({"Fever": {"Cough": {"probability": 0.9}}}), encoding="utf-8")
+    second = registry.get("relations")
+    assert second.version != first.version
+    assert second.data["Fever"]["Cough"]["probability"] == 0.9
+    assert first.data["Fever"]["Cough"]["probability"] == 0.5
+
+
+
+def test_translation_catalogs_fall_back_per_key(runtime_dir, monkeypatch):
+    """Every supported language gets the default language's missing keys."""
+    from backend.utils.i18n import translate
+
+    (runtime_dir / "en.json").write_text(json.dumps({"a": "A", "b": "B"}), encoding="utf-8")
+    (runtime_dir / "hi.json").write_text(json.dumps({"a": "अ"}), encoding="utf-8")
+    monkeypatch.setattr(settings, "TRANSLATIONS_DIR", runtime_dir)
+    monkeypatch.setattr(settings, "SNAPSHOT_CHECK_INTERVAL", 0)
+    registry.clear()
+
+    assert (translate("a", "hi"), translate("b", "hi")) == ("अ", "B")
+    assert translate("a", "ta") == "A" and translate("missing", "hi") == "missing"
+    (runtime_dir / "ta.json").write_text(json.dumps({"a": "அ"}), encoding="utf-8")
+    assert translate("a", "ta") == "அ"
+
+def test_registered_patients_reach_the_api(runtime_dir):
+    """Patients registered after startup are visible to /api/patients."""
+    from backend import create_app
+
+    client = create_app().test_client()
+    before = len(client.get("/api/patients").get_json()["patients"])
+    client.post("/register", data={"name": "Late", "state": "Goa", "present_disease": "Fever"})
+    assert len(client.get("/api/patients").get_json()["patients"]) == before + 1
+    assert b"Late" in client.get("/").data
+
+
+def test_disease_matcher_single_pass():
+    """Multi-word, overlapping and synonym terms match on word boundaries only."""
+    from backend.services.disease_matcher import DiseaseMatcher
+
+    matcher = DiseaseMatcher(
+        {
+            "Type 2 Diabetes": "Type 2 Diabetes",
+            "Diabetes": "Diabetes",
+            "Stroke": "Stroke",
+            "Heart Attack": "Myocardial Infarction",
+        }
+    )
+    text = "Known TYPE 2\n diabetes. Heatstroke last summer; heart attack 2019, Heart Attack again."
+    matches = matcher.find(text)
+
+    assert [text[m.start:m.end] for m in matches][:2] == ["TYPE 2\n diabetes", "diabetes"]
+    assert "Stroke" not in matcher.count(text)
+    assert matcher.count(text)["Myocardial Infarction"] == 2
+    assert matcher.diseases_in(text) == ["Type 2 Diabetes", "Diabetes", "Myocardial Infarction"]
+
+
+def test_pdf_extraction_budgets(tmp_path):
+    """Pages stream one by one and the page/byte budgets stop extraction."""
+    from conftest import build_pdf
+    from backend.services.pdf_extract import ExtractionBudget, ExtractionReport, iter_pdf_pages
+
+    path = tmp_path / "report.pdf"
+    path.write_bytes(build_pdf([f"Page {i} mentions Asthma" for i in range(1, 6)]))
+
+    report = ExtractionReport()
+    pages = list(iter_pdf_pages(path, ExtractionBudget(3, 10_000, 60.0), report))
+    assert [p.page for p in pages] == [1, 2, 3]
+    assert "Asthma" in pages[0].text
+    assert report.stopped == "page_limit"
+    assert report.to_dict()["pages_read"] == 3
+
+    report = ExtractionReport()
+    pages = list(iter_pdf_pages(path, ExtractionBudget(100, 30, 60.0), report))
+    assert report.stopped == "byte_limit"
+    assert report.text_bytes <= 30
+
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+    report = ExtractionReport()
+    assert list(iter_pdf_pages(tmp_path / "broken.pdf", report=report)) == []
+    assert report.stopped.startswith("unreadable")
+
+
+def test_ocr_results_are_cached_by_content_hash(runtime_dir, monkeypatch):
+    """Re-uploading the same image never runs Tesseract twice."""
+    from backend.services import ocr
+
+    calls = []
+
+    def fake_tesseract(path):
+        calls.append(path)
+        return "Scanned note: Tuberculosis"
+
+    monkeypatch.setattr(ocr, "ocr_available", lambda: True)
+    monkeypatch.setattr(ocr, "_ocr_image_file", fake_tesseract)
+
+    first = runtime_dir / "a.png"
+    second = runtime_dir / "b.png"
+    first.write_bytes(b"same-bytes")
+    second.write_bytes(b"same-bytes")
+
+    assert ocr.ocr_image(first) == "Scanned note: Tuberculosis"
+    assert ocr.ocr_image(second) == "Scanned note: Tuberculosis"
+    assert len(calls) == 1
+
+    # Text read with other OCR settings is not reused.
+    monkeypatch.setattr(settings, "OCR_LANG", "eng+hin")
+    ocr.ocr_image(first)
+    assert len(calls) == 2
+
+
+def test_ocr_runs_inline_inside_job_workers(monkeypatch):
+    """A job-pool process does not start its own Tesseract pool."""
+    import multiprocessing
+    from backend.services import ocr
+
+    monkeypatch.setattr(settings, "OCR_WORKERS", 4)
+    monkeypatch.setattr(multiprocessing, "parent_process", lambda: object())
+    assert ocr._get_pool() is None
+
+
+def test_ocr_pool_spawns_its_workers(monkeypatch):
+    """The web process's Tesseract pool is spawned, never forked from it."""
+    from backend.services import ocr
+
+    monkeypatch.setattr(settings, "OCR_WORKERS", 2)
+    monkeypatch.setattr(ocr, "_pool", None)
+    pool = ocr._get_pool()
+    try:
+        assert pool._mp_context.get_start_method() == "spawn"
+    finally:
+        pool.shutdown()
+
+
+def test_ocr_cache_evicts_least_recently_used(tmp_path):
+    """The cache stays under its byte limit by dropping the oldest entries."""
+    import os
+    from backend.services.ocr import OCRCache
+
+    cache = OCRCache(tmp_path, max_bytes=25)
+    cache.put("old", "x" * 10)
+    os.utime(tmp_path / "old.txt", (1, 1))
+    cache.put("mid", "y" * 10)
+    os.utime(tmp_path / "mid.txt", (2, 2))
+    assert cache.get("old") == "x" * 10  # touch: now most recent
+
+    cache.put("new", "z" * 10)
+    assert cache.get("mid") is None
+    assert cache.get("old") and cache.get("new")
+
+
+def test_disk_cache_scans_only_when_over_budget(tmp_path, monkeypatch):
+    """Writes keep a running byte total instead of listing the directory."""
+    from backend.utils.disk_cache import DiskCache
+
+    cache = DiskCache(tmp_path, max_bytes=100)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: (scans.append(1), evict()))
+
+    for i in range(9):
+        cache.put(f"k{i}", "x" * 10)
+    cache.put("k0", "y" * 10)  # overwrite: size unchanged
+    assert len(scans) == 1  # the first write learns the directory size
+
+    cache.put("k9", "x" * 10)
+    assert len(scans) == 1
+    cache.put("k10", "x" * 10)
+    assert len(scans) == 2
+    assert sum(f.stat().st_size for f in tmp_path.glob("*.txt")) <= 100
+
+
+def test_relation_index_resolves_aliases_and_case(runtime_dir):
+    """Synonyms and any casing resolve to the same disease and relation."""
+    from backend.services.relation_service import canonical_name, get_relation, get_relation_index
+
+    index = get_relation_index()
+    assert index.disease_id("Heart Attack") == index.disease_id("myocardial infarction")
+    assert canonical_name("heart attack") == "Myocardial Infarction"
+    assert canonical_name("copd") == "Chronic Obstructive Pulmonary Disease"
+
+    rel = get_relation("fever", "dyspnea")
+    assert rel["previous_disease"] == "Shortness of Breath"
+    assert rel["probability"] == get_relation("Fever", "Shortness of Breath")["probability"] > 0
+
+    # "Diabetes" is also listed in state_diseases.json; the alias still wins.
+    assert "Diabetes" in {d for ds in registry.get("state_diseases").data.values() for d in ds}
+    assert index.disease_id("Diabetes") == index.disease_id("Type 2 Diabetes")
+    assert canonical_name("diabetes") == "Type 2 Diabetes"
+
+
+def test_report_matcher_skips_short_aliases(runtime_dir):
+    """Abbreviations like MI or TB are not matched as free-text words."""
+    from backend.services.disease_matcher import get_disease_matcher
+
+    found = get_disease_matcher().diseases_in("Seen by Dr. CAD Rao; TB test pending. Coronary artery disease.")
+    assert found == ["Ischemic Heart Disease"]
+
+
+def test_mock_causal_probability_is_memoised(runtime_dir):
+    """Repeated lookups are served from the memo and counted as hits."""
+    from backend.services.relation_service import build_mock_causal_probability, relation_cache_stats
+
+    first = build_mock_causal_probability("Fever", "Cough", "7", "2024-01-01")
+    before = relation_cache_stats()["mock_probability"]
+    assert build_mock_causal_probability("Fever", "Cough", "7", "2024-01-01") == first
+    after = relation_cache_stats()["mock_probability"]
+    assert after["hits"] == before["hits"] + 1
+    assert 0.0 < after["hit_rate"] <= 1.0
+
+
+def test_batch_scores_match_per_patient_path(runtime_dir):
+    """score_patients reproduces the report page numbers exactly."""
+    from backend.services import data_loader
+    from backend.services.scoring import score_patient, score_patients
+
+    data_loader.append_patient_history(
+        "1001", {"auto_history": [{"disease": "Asthma", "diagnosed_on": "2024-03-01"}],
+              "report_history": [{"disease": "Cough", "diagnosed_on": "2024-05-01"}]},
+    )
+    patients = data_loader.load_patients()
+    histories = data_loader.load_patient_history()
+
+    batch = score_patients(patients, histories)
+    assert not batch["errors"]
+    assert batch["scores"] == [
+        score_patient(p, histories.get(str(p["patient_id"]), {})) for p in patients
+    ]
+
+
+def _patient(pid, state, present, previous):
+    return {
+        "patient_id": str(pid), "name": f"P{pid}", "age": "40", "gender": "Female", "city": "",
+        "state": state, "last_visit": "2025-01-01", "present_disease": present,
+        "previous_diseases": "|".join(previous),
+    }
+
+
+def test_cooccurrence_incremental_matches_rebuild(runtime_dir):
+    """Appends are folded in incrementally and agree with a full recount."""
+    from backend.services import data_loader
+    from backend.services.cooccurrence import CooccurrenceMatrix, get_cooccurrence
+
+    matrix = get_cooccurrence()
+    before = matrix.summary()["patients"]
+    data_loader.append_patients([
+        _patient(5001, "Goa", "Fever", ["Cough", "Heart Attack"]),
+        _patient(5002, "Goa", "fever", ["cough"]),
+        _patient(5003, "Punjab", "Fever", ["Myocardial Infarction"]),
+    ])
+    assert matrix.summary()["patients"] == before + 3  # via the append listener
+
+    goa = {r["previous"]: r for r in matrix.stats(state="goa", present="Fever")}
+    assert goa["Cough"]["count"] == 2 and goa["Cough"]["probability"] == 1.0
+    everywhere = {r["previous"]: r for r in matrix.stats(present="FEVER")}
+    assert everywhere["Myocardial Infarction"]["count"] == 2  # alias folded
+
+    fresh = CooccurrenceMatrix()
+    fresh.rebuild()
+    for state in (None, "Goa", "Punjab", "Kerala"):
+        assert sorted(map(str, fresh.stats(state=state))) == sorted(map(str, matrix.stats(state=state)))
+
+
+
+def test_search_index_prefix_and_incremental_appends(runtime_dir):
+    """Every query word must prefix-match; appends show up without a rebuild."""
+    from backend.services import data_loader
+    from backend.services.search_index import get_search_index
+
+    index = get_search_index()
+    assert index.search("").total == 6
+    assert index.search("kav kol").patient_ids == ["1004"]
+    assert set(index.search("fev").patient_ids) == {"1001", "1002", "1003", "1005", "1006"}
+    assert index.search("fever mumbai").patient_ids == ["1001"]
+    assert index.search("zzz").total == 0
+
+    data_loader.append_patients([_patient(5001, "Goa", "Fever", ["Cough"])])
+    assert index.stats()["patients"] == 7  # via the append listener
+    assert index.search("goa FEV").patient_ids == ["5001"]
+    page = index.search("fever", offset=2, limit=2)
+    assert page.total == 6 and page.patient_ids == ["1003", "1005"]
+    assert index.suggest("co")[0] == "cough"
+
+
+def test_linkage_blocks_and_scores_duplicates(runtime_dir):
+    """Typos and swapped names still meet in a block; strangers don't match."""
+    from backend.services import data_loader
+    from backend.services.linkage import MATCH, get_linkage_index, jaro_winkler, soundex
+
+    assert soundex("Robert") == soundex("Rupert") == "R163"
+    assert soundex("Ashcraft") == "A261"
+    assert round(jaro_winkler("martha", "marhta"), 3) == 0.961
+
+    index = get_linkage_index()
+    probe = {"name": "Rohan Sharmah", "age": "43", "gender": "Male", "city": "Mumbai", "state": "Maharashtra"}
+    (dup,) = index.find_duplicates(probe)
+    assert dup["patient_id"] == "1001" and dup["status"] == MATCH
+    swapped = dict(probe, name="Sharma Rohan")
+    assert index.find_duplicates(swapped)[0]["patient_id"] == "1001"
+    assert index.find_duplicates(dict(probe, name="Meera Iyer")) == []
+
+    data_loader.append_patients([dict(probe, patient_id="5001", last_visit="2025-01-01",
+                                      present_disease="Fever", previous_diseases="")])
+    assert index.find_duplicates(dict(probe, patient_id="5001"))[0]["patient_id"] == "1001"
+    result = index.dedupe()
+    assert [(p["patient_id"], p["duplicate_of"]) for p in result["pairs"]] == [("5001", "1001")]
+    assert result["compared"] < result["patients"] ** 2 / 2
+
+def test_interactions_mine_frequent_combinations(runtime_dir):
+    """Order-2/3 itemsets are mined above min_support; rare items are pruned."""
+    from backend.services import data_loader
+    from backend.services.interactions import get_interaction_index
+
+    index = get_interaction_index()
+    data_loader.append_patients(
+        [_patient(6000 + i, "Goa", "Stroke", ["Diabetes", "Hypertension", "Obesity"]) for i in range(3)]
+        + [_patient(6010, "Goa", "Stroke", ["Diabetes", "Hypertension", "Gout"])]
+        + [_patient(6020 + i, "Goa", "Fever", ["Diabetes"]) for i in range(4)]
+    )
+
+    rows = index.top("stroke", k=50, min_support=3, max_order=3)
+    combos = {tuple(sorted(r["diseases"])): r for r in rows}
+    # "Diabetes" is an alias and is counted as Type 2 Diabetes
+    assert ("Hypertension", "Obesity", "Type 2 Diabetes") in combos
+    pair = combos[("Hypertension", "Type 2 Diabetes")]
+    assert pair["support"] == 4 and pair["confidence"] == 1.0 and pair["lift"] > 1
+    assert not any("Gout" in c for c in combos)  # support 1 < 3
+    assert all(r["order"] >= 2 for r in rows)
+
+    mine = index.for_patient(_patient(6010, "Goa", "Stroke", ["Diabetes", "Hypertension", "Gout"]),
+                             k=50, min_support=3)
+    assert [tuple(sorted(r["diseases"])) for r in mine] == [("Hypertension", "Type 2 Diabetes")]
+
+
+def test_bulk_import_validates_and_writes_in_batches(runtime_dir):
+    """Valid rows get consecutive IDs and auto history; bad rows are reported."""
+    import io
+
+    from backend.services import data_loader, importer
+    from backend.services.importer import import_patients
+
+    text = (
+        "name,age,state,present_disease,last_visit,previous_diseases\n"
+        "Asha,34,Goa,Fever,2025-03-01,\n"
+        "Bad Age,abc,Goa,Fever,,\n"
+        "Ravi,51,Punjab,Cough,,Asthma|Diabetes\n"
+        ",20,Goa,Fever,,\n"
+        "Meera,60,Goa,Headache,2025-13-40,\n"
+        "Kiran,45,Goa,Fever,,\n"
+    )
+    batches = []
+    report = import_patients(io.StringIO(text), batch_size=2, workers=2, on_batch=lambda r: batches.append(r["imported"]))
+
+    assert report["imported"] == 3 and report["failed"] == 3
+    # auto history ran in spawned workers, never a fork of the web process
+    assert importer._pools[2]._mp_context.get_start_method() == "spawn"
+    assert [e["line"] for e in report["errors"]] == [3, 5, 6]
+    assert batches == [2, 3]
+    first, last = int(report["first_id"]), int(report["last_id"])
+    assert last - first == 2
+
+    ravi = data_loader.get_patient(first + 1)
+    assert ravi["previous_diseases"] == "Asthma|Diabetes" and ravi["last_visit"] == "2025-01-01"
+    asha = data_loader.get_patient(first)
+    auto = data_loader.get_patient_history(first)["auto_history"]
+    assert asha["previous_diseases"] == "|".join(h["disease"] for h in auto) and len(auto) == 5
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    """Buckets are cumulative, le-inclusive and end with +Inf, _sum and _count."""
+    from backend.utils.metrics import Histogram
+
+    hist = Histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value, 'a"b')
+    lines = hist.render()
+    assert lines[:2] == ["# HELP t_seconds Test.", "# TYPE t_seconds histogram"]
+    assert lines[2:] == [
+        't_seconds_bucket{route="a\\"b",le="0.1"} 2',
+        't_seconds_bucket{route="a\\"b",le="1.0"} 3',
+        't_seconds_bucket{route="a\\"b",le="+Inf"} 4',
+        't_seconds_sum{route="a\\"b"} 3.65',
+        't_seconds_count{route="a\\"b"} 4',
+    ]
+
+
+def test_create_app_defers_heavy_imports_and_runtime_dir(tmp_path):
+    """A cold create_app() loads neither numpy nor PyPDF2 and writes nothing."""
+    import os
+    import subprocess
+    import sys
+
+    runtime = tmp_path / "runtime"
+    probe = (
+        "import sys; from backend import create_app; create_app(); "
+        "print(sorted(m for m in ('numpy', 'PyPDF2', 'multiprocessing') "
+        "if type(sys.modules.get(m)).__name__ == 'module'))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=settings.BASE_DIR,
+        env=dict(os.environ, RUNTIME_DIR=str(runtime), WARMUP="off"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert proc.stdout.strip() == "[]"
+    assert not runtime.exists()
+
+
+def test_warm_up_runs_every_step(runtime_dir):
+    """Warm-up loads what the first report view needs and records timings."""
+    from flask import Flask
+
+    from backend.utils.startup import WARMUP_STEPS, warm_up
+
+    app = Flask(__name__)
+    timings = warm_up(app)
+    assert list(timings) == [name for name, _ in WARMUP_STEPS]
+    assert all(seconds >= 0 for seconds in timings.values())
+    assert app.extensions["warmup"] == timings
+
+    from backend.services.linkage import get_linkage_index
+    from backend.services.search_index import get_search_index
+
+    assert get_search_index().patient_ids and get_linkage_index().patient_ids
+
+
+def test_import_profile_report_ranks_packages_and_modules():
+    """-X importtime output is parsed into a per-package and per-module report."""
+    from backend.utils.startup import format_import_report, parse_importtime
+
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       300 |        300 |   json.decoder",
+        "import time:       100 |        400 | json",
+        "import time:      2000 |       2000 | numpy",
+        "unrelated line",
+    ])
+    rows = parse_importtime(stderr)
+    assert [(r.module, r.depth) for r in rows] == [("json.decoder", 1), ("json", 0), ("numpy", 0)]
+    report = format_import_report(rows, top=1).splitlines()
+    assert report[0] == "3 modules imported in 2.4 ms"
+    assert report[3].split() == ["2.0", "numpy"]
+    assert report[-1].split() == ["2.0", "numpy"]
+
+
+def test_reference_bundle_views_match_source_files(runtime_dir):
+    """The mapped bundle serves the same datasets and lookups as the files."""
+    from backend.services import data_loader
+    from backend.services.relation_service import get_relation_index
+
+    bundle = registry.get("reference").data
+    assert bundle.stats()["mapped"] and settings.REFERENCE_BUNDLE.exists()
+    assert get_relation_index() is bundle
+
+    assert [dict(d) for d in registry.get("diseases").data] == data_loader.load_diseases()
+    assert list(registry.get("mock_history_diseases").data) == data_loader.load_mock_history_diseases()
+    states = data_loader.load_state_diseases()
+    assert {k: list(v) for k, v in registry.get("state_diseases").data.items()} == states
+    assert registry.get("state_diseases").data.get("Atlantis") is None
+    aliases = data_loader.load_disease_aliases()
+    assert {k: list(v) for k, v in registry.get("disease_aliases").data.items()} == aliases
+
+    relations = data_loader.load_relations()
+    view = registry.get("relations").data
+    assert list(view) == list(relations)
+    assert view["Fever"]["Cough"] == relations["Fever"]["Cough"]
+    assert bundle.relation("FEVER", "cough") == (relations["Fever"]["Cough"]["probability"], relations["Fever"]["Cough"]["report"])
+    assert bundle.relation("Fever", "Unknown") is None and bundle.disease_id("") is None
+
+
+def test_reference_bundle_reloads_when_the_file_is_swapped(runtime_dir, monkeypatch):
+    """A recompiled bundle is mapped on the next check; stale bundles are rebuilt."""
+    from backend.services import reference_bundle
+
+    monkeypatch.setattr(settings, "SNAPSHOT_CHECK_INTERVAL", 0)
+    first = registry.get("reference")
+    reference_bundle.write_bundle(settings.REFERENCE_BUNDLE, reference_bundle.build_bundle())
+    second = registry.get("reference")
+    assert second is not first and second.data.digest == first.data.digest
+
+    # A bundle compiled from other data never outlives the files it came from.
+    stale = reference_bundle.compile_bundle({"Fever": {"Cough": {"probability": 0.1}}}, {}, [], [], {}, "stale")
+    registry.clear()
+    reference_bundle.write_bundle(settings.REFERENCE_BUNDLE, stale)
+    assert registry.get("reference").data.digest == reference_bundle.source_digest()
+    assert reference_bundle.bundle_digest(settings.REFERENCE_BUNDLE) == reference_bundle.source_digest()